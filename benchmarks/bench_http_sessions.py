@@ -0,0 +1,81 @@
+"""
+Бенчмарк задержки вызова API: новая aiohttp сессия на вызов против общего пула
+
+Поднимает локальный HTTP сервер, имитирующий GitLab API, и измеряет
+среднюю задержку get_current_user. На реальных хостах разница больше:
+без пула каждый вызов дополнительно платит за DNS и TLS handshake.
+
+Запуск:
+    python benchmarks/bench_http_sessions.py [URL GitLab]
+"""
+
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "benchmark")
+
+import aiohttp
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from loguru import logger
+
+from src.gitlab_api import GitLabClient
+from src.http_client import close_http_sessions
+
+CALLS = 200
+
+
+async def legacy_call(base_url: str) -> None:
+    """Прежняя схема: сессия создается и закрывается на каждый вызов"""
+    async with aiohttp.ClientSession(headers={"PRIVATE-TOKEN": "token"}) as session:
+        async with session.get(f"{base_url}/api/v4/user") as response:
+            await response.json()
+
+
+async def pooled_call(base_url: str) -> None:
+    async with GitLabClient(base_url, "token") as client:
+        await client.get_current_user()
+
+
+async def measure(func, base_url: str) -> float:
+    started = time.perf_counter()
+    for _ in range(CALLS):
+        await func(base_url)
+    return (time.perf_counter() - started) / CALLS * 1000
+
+
+async def main() -> None:
+    logger.remove()
+
+    server = None
+    if len(sys.argv) > 1:
+        base_url = sys.argv[1].rstrip("/")
+    else:
+        async def current_user(request):
+            return web.json_response({"username": "benchmark"})
+
+        app = web.Application()
+        app.router.add_get("/api/v4/user", current_user)
+        server = TestServer(app)
+        await server.start_server()
+        base_url = str(server.make_url("")).rstrip("/")
+
+    legacy_ms = await measure(legacy_call, base_url)
+    pooled_ms = await measure(pooled_call, base_url)
+    await close_http_sessions()
+
+    print(f"{'mode':>16} | {'ms per call':>11}")
+    print("-" * 31)
+    print(f"{'session per call':>16} | {legacy_ms:>11.3f}")
+    print(f"{'shared pool':>16} | {pooled_ms:>11.3f}")
+
+    if server:
+        await server.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
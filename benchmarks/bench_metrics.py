@@ -0,0 +1,66 @@
+"""
+Бенчмарк стоимости метрик на горячем пути
+
+Измеряет время одной записи счетчика и гистограммы, запрос к SQLite с
+обработчиками событий движка и без них, и отрисовку /metrics.
+
+Запуск:
+    python benchmarks/bench_metrics.py
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "benchmark")
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.metrics import MetricsRegistry, event_scope, instrument_engine, registry
+
+OPS = 200_000
+QUERIES = 2000
+
+
+def per_op_ns(stmt, number: int = OPS) -> float:
+    return min(timeit.repeat(stmt, number=number, repeat=3)) / number * 1e9
+
+
+async def query_us(instrumented: bool) -> float:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp}/bench.db")
+        if instrumented:
+            instrument_engine(engine)
+        async with engine.connect() as conn:
+            with event_scope("gitlab", "Merge Request Hook"):
+                started = time.perf_counter()
+                for _ in range(QUERIES):
+                    await conn.execute(text("SELECT 1"))
+                elapsed = time.perf_counter() - started
+        await engine.dispose()
+    return elapsed / QUERIES * 1e6
+
+
+async def main() -> None:
+    local = MetricsRegistry()
+    counter = local.counter("bench_total", "bench", ("platform", "event"))
+    histogram = local.histogram("bench_seconds", "bench", ("handler",))
+
+    print(f"Counter.inc:        {per_op_ns(lambda: counter.inc('gitlab', 'Merge Request Hook')):7.0f} нс")
+    print(f"Histogram.observe:  {per_op_ns(lambda: histogram.observe(0.0123, 'handle_gitlab_merge_request')):7.0f} нс")
+
+    plain = await query_us(instrumented=False)
+    instrumented = await query_us(instrumented=True)
+    print(f"SELECT 1 (SQLite):  {plain:7.1f} мкс без метрик, {instrumented:.1f} мкс с метриками")
+
+    print(f"Отрисовка /metrics: {per_op_ns(registry.render, number=1000) / 1000:7.1f} мкс")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,86 @@
+"""
+Бенчмарк записи истории уведомлений: коммит на сообщение против пакетного INSERT
+
+Имитирует fan-out события (например, упавший пайплайн в монорепозитории)
+на N подписчиков и сравнивает время сохранения истории в файловую SQLite.
+
+Запуск:
+    python benchmarks/bench_notification_history.py
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "benchmark")
+
+from loguru import logger
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from src.database import Base, Notification
+from src.webhook.notifier import NotificationHistoryWriter
+
+FAN_OUT = (10, 100, 300)
+
+
+def make_rows(count: int) -> list:
+    return [
+        {
+            "user_id": 1000 + i,
+            "platform": "gitlab",
+            "event_type": "pipeline_failed",
+            "project_name": "group/monorepo",
+            "message": "<b>Пайплайн упал</b>\n" * 5,
+            "telegram_message_id": i,
+            "meta_data": '{"pipeline_id": 1}',
+        }
+        for i in range(count)
+    ]
+
+
+async def per_message_commit(session_factory, rows) -> None:
+    """Прежняя схема: session.add + commit на каждое сообщение"""
+    async with session_factory() as session:
+        for row in rows:
+            session.add(Notification(**row))
+            await session.commit()
+
+
+async def bulk_insert(session_factory, rows) -> None:
+    writer = NotificationHistoryWriter(session_factory, flush_interval=0)
+    await writer.write(rows)
+    await writer.stop()
+
+
+async def measure(func, rows) -> float:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp}/bench.db")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+        started = time.perf_counter()
+        await func(session_factory, rows)
+        elapsed = time.perf_counter() - started
+        await engine.dispose()
+    return elapsed * 1000
+
+
+async def main() -> None:
+    logger.remove()
+    print(f"{'fan-out':>7} | {'per-message ms':>14} | {'bulk ms':>8} | {'speedup':>7}")
+    print("-" * 46)
+
+    for count in FAN_OUT:
+        rows = make_rows(count)
+        legacy_ms = await measure(per_message_commit, rows)
+        bulk_ms = await measure(bulk_insert, rows)
+        print(f"{count:>7} | {legacy_ms:>14.2f} | {bulk_ms:>8.2f} | {legacy_ms / bulk_ms:>6.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,101 @@
+"""
+Бенчмарк объема истории уведомлений: готовый HTML против полей шаблона
+
+Для каждого шаблона строится типичное уведомление и сохраняется двумя
+способами: как раньше (message с HTML + meta_data JSON) и полями шаблона
+(template, object_iid, title, url, status, payload). Сравниваются байты
+текстовых полей на строку и размер файла SQLite после вставки ROWS строк.
+
+Запуск:
+    python benchmarks/bench_notification_storage.py
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "benchmark")
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.database import Base, Notification
+from src.webhook.templates import build_notification
+
+ROWS = 5000
+PROJECT = "backend/payments-service"
+MR_URL = "https://gitlab.example.com/backend/payments-service/-/merge_requests/1342"
+
+SAMPLES = {
+    "gitlab_note": dict(
+        status=None, iid=1342, reason="Вас упомянули в комментарии", noteable_type="MergeRequest",
+        author="Ivan Petrov", text="@reviewer поправил ретраи, посмотри, пожалуйста, еще раз"
+    ),
+    "gitlab_mr_reviewer": dict(
+        status="open", iid=1342, author="ipetrov", source_branch="feature/retry-backoff", target_branch="main"
+    ),
+    "gitlab_mr_update": dict(status="update", iid=1342, author="ipetrov"),
+    "gitlab_pipeline": dict(status="failed", iid=1342, ref="feature/retry-backoff", pipeline_id=987654),
+    "github_workflow": dict(status="failure", iid=1342, workflow="CI", branch="feature/retry-backoff"),
+}
+
+# Метаданные, которые прежние обработчики писали рядом с HTML
+LEGACY_META = json.dumps({"mr_id": 55123, "mr_iid": 1342, "project_id": 4411, "url": MR_URL})
+
+
+def text_bytes(row: dict, columns) -> int:
+    return sum(len(str(row[column]).encode()) for column in columns if row.get(column) is not None)
+
+
+def make_rows(template_id: str, compact: bool) -> list:
+    sample = dict(SAMPLES[template_id])
+    notification = build_notification(
+        template_id, PROJECT, "Экспоненциальный backoff для ретраев платежного шлюза", MR_URL,
+        status=sample.pop("status"), iid=sample.pop("iid"), **sample
+    )
+    row = {"user_id": 1, "platform": "gitlab", "event_type": template_id, "project_name": PROJECT,
+           "telegram_message_id": 1}
+    if compact:
+        row.update({key: notification[key] for key in ("template", "object_iid", "title", "url", "status", "payload")})
+    else:
+        row.update(message=notification["message"], meta_data=LEGACY_META)
+    return [row] * ROWS
+
+
+async def file_size(rows: list) -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.db"
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(insert(Notification), rows)
+        await engine.dispose()
+        return path.stat().st_size
+
+
+async def main() -> None:
+    legacy_columns = ("message", "meta_data")
+    compact_columns = ("template", "title", "url", "status", "payload")
+
+    print(f"{'template':<20} | {'HTML B/row':>10} | {'fields B/row':>12} | {'saved':>6}")
+    print("-" * 58)
+    for template_id in SAMPLES:
+        legacy = text_bytes(make_rows(template_id, compact=False)[0], legacy_columns)
+        # object_iid - INTEGER, в SQLite до 4 байт для таких номеров
+        compact = text_bytes(make_rows(template_id, compact=True)[0], compact_columns) + 4
+        print(f"{template_id:<20} | {legacy:>10} | {compact:>12} | {1 - compact / legacy:>5.0%}")
+
+    legacy_size = await file_size(make_rows("gitlab_note", compact=False))
+    compact_size = await file_size(make_rows("gitlab_note", compact=True))
+    print(
+        f"\nSQLite, {ROWS} строк gitlab_note: {legacy_size / ROWS:.0f} -> {compact_size / ROWS:.0f} байт/строку "
+        f"({1 - compact_size / legacy_size:.0%} меньше)"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
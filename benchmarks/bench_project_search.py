@@ -0,0 +1,55 @@
+"""
+Бенчмарк inline-поиска проектов по локальному индексу
+
+Строит индекс для N проектов и измеряет время построения и среднее время
+запроса разной длины. Бюджет ответа на inline-запрос - 50 мс.
+
+Запуск:
+    python benchmarks/bench_project_search.py
+"""
+
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "benchmark")
+
+from src.bot.project_search import ProjectSearchIndex
+
+QUERIES = ["a", "pay", "service", "team-7 / api", "nonexistent"]
+ROUNDS = 200
+
+
+def make_projects(count: int):
+    words = ["api", "service", "payment", "gateway", "frontend", "backend", "infra", "docs", "bot", "worker"]
+    rng = random.Random(42)
+    return [
+        (str(i), f"team-{i % 50} / {rng.choice(words)}-{rng.choice(words)}-{i}")
+        for i in range(count)
+    ]
+
+
+def main() -> None:
+    print(f"{'projects':>9} {'build, ms':>10} " + " ".join(f"{q[:12]:>13}" for q in QUERIES))
+    for count in (500, 5_000, 20_000):
+        projects = make_projects(count)
+
+        started = time.perf_counter()
+        index = ProjectSearchIndex(projects)
+        build_ms = (time.perf_counter() - started) * 1000
+
+        timings = []
+        for query in QUERIES:
+            started = time.perf_counter()
+            for _ in range(ROUNDS):
+                index.search(query)
+            timings.append((time.perf_counter() - started) / ROUNDS * 1000)
+
+        print(f"{count:>9} {build_ms:>10.2f} " + " ".join(f"{t:>10.3f} ms" for t in timings))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Бенчмарк /status: количество загружаемых строк в зависимости от длины истории
+
+Раньше User.notifications загружался selectin при каждом select(User),
+поэтому /status читал всю историю уведомлений пользователя. Скрипт вызывает
+cmd_status и считает загруженные ORM объекты; для сравнения приводится
+загрузка с прежней стратегией.
+
+Запуск:
+    python benchmarks/bench_status_rows.py
+"""
+
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "benchmark")
+
+from loguru import logger
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import selectinload
+
+from src.database import Base, User, Subscription, Notification
+from src.bot.handlers import cmd_status
+
+HISTORY_SIZES = (0, 100, 1000, 10000)
+REPEATS = 20
+TELEGRAM_ID = 1000
+
+
+async def seed(session_factory, history: int) -> None:
+    async with session_factory() as session:
+        session.add(User(telegram_id=TELEGRAM_ID, first_name="user", gitlab_username="gl"))
+        for i in range(3):
+            session.add(Subscription(
+                user_id=TELEGRAM_ID,
+                platform="gitlab",
+                project_id=str(i),
+                project_name=f"group/project{i}",
+                event_types="merge_request,issue"
+            ))
+        session.add_all([
+            Notification(
+                user_id=TELEGRAM_ID,
+                platform="gitlab",
+                event_type="merge_request_general",
+                project_name="group/project0",
+                message="<b>Проект:</b> group/project0\n" * 5
+            )
+            for _ in range(history)
+        ])
+        await session.commit()
+
+
+async def legacy_status(session_factory) -> None:
+    """Загрузка пользователя с прежней стратегией (selectin для всех связей)"""
+    async with session_factory() as session:
+        result = await session.execute(
+            select(User)
+            .options(selectinload(User.subscriptions), selectinload(User.notifications))
+            .where(User.telegram_id == TELEGRAM_ID)
+        )
+        user = result.scalar_one()
+        len(user.subscriptions)
+
+
+async def current_status(session_factory) -> None:
+    """Вызов обработчика /status"""
+    async def get_session():
+        async with session_factory() as session:
+            yield session
+
+    message = SimpleNamespace(from_user=SimpleNamespace(id=TELEGRAM_ID), answer=AsyncMock())
+    with patch("src.bot.handlers.get_session", get_session):
+        await cmd_status(message)
+
+
+async def measure(func, session_factory) -> tuple:
+    loaded = 0
+
+    def count_instance(target, context):
+        nonlocal loaded
+        loaded += 1
+
+    event.listen(Base, "load", count_instance, propagate=True)
+    try:
+        started = time.perf_counter()
+        for _ in range(REPEATS):
+            await func(session_factory)
+        elapsed = (time.perf_counter() - started) / REPEATS
+    finally:
+        event.remove(Base, "load", count_instance)
+
+    return loaded // REPEATS, elapsed * 1000
+
+
+async def main() -> None:
+    logger.remove()
+    print(f"{'history':>7} | {'legacy rows':>11} | {'legacy ms':>9} | {'status rows':>11} | {'status ms':>9}")
+    print("-" * 60)
+
+    for history in HISTORY_SIZES:
+        engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+        await seed(session_factory, history)
+
+        legacy_rows, legacy_ms = await measure(legacy_status, session_factory)
+        status_rows, status_ms = await measure(current_status, session_factory)
+
+        print(f"{history:>7} | {legacy_rows:>11} | {legacy_ms:>9.2f} | {status_rows:>11} | {status_ms:>9.2f}")
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,123 @@
+"""
+Бенчмарк get_subscribed_users: количество запросов и задержка от числа подписчиков
+
+Сравнивается прежняя схема (запрос подписок + select(User) на каждую подписку
+с selectin загрузкой связей) и один запрос Subscription + User + NotificationSettings.
+
+Запуск:
+    python benchmarks/bench_subscribed_users.py
+"""
+
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "benchmark")
+
+from loguru import logger
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from src.database import Base, User, Subscription, Notification, NotificationSettings
+from src.webhook.personalized_handlers import get_subscribed_users
+
+SUBSCRIBER_COUNTS = (10, 50, 200)
+NOTIFICATIONS_PER_USER = 50
+REPEATS = 20
+PROJECT_ID = "42"
+
+
+async def legacy_get_subscribed_users(session: AsyncSession, project_id: str, platform: str = "gitlab"):
+    """Прежняя реализация: N+1 запросов"""
+    result = await session.execute(
+        select(Subscription).where(
+            Subscription.project_id == project_id,
+            Subscription.platform == platform,
+            Subscription.is_active == True
+        )
+    )
+    users = []
+    for sub in result.scalars().all():
+        result = await session.execute(select(User).where(User.telegram_id == sub.user_id))
+        user = result.scalar_one_or_none()
+        if user:
+            users.append(user)
+
+    for user in users:
+        result = await session.execute(
+            select(NotificationSettings).where(NotificationSettings.user_id == user.telegram_id)
+        )
+        result.scalar_one_or_none()
+    return users
+
+
+async def seed(session_factory, subscribers: int) -> None:
+    async with session_factory() as session:
+        for i in range(subscribers):
+            telegram_id = 1000 + i
+            session.add(User(telegram_id=telegram_id, first_name=f"user{i}", gitlab_username=f"gl{i}"))
+            session.add(Subscription(
+                user_id=telegram_id,
+                platform="gitlab",
+                project_id=PROJECT_ID,
+                project_name="group/project",
+                event_types="merge_request,issue,pipeline,note"
+            ))
+            if i % 2 == 0:
+                session.add(NotificationSettings(user_id=telegram_id))
+            for n in range(NOTIFICATIONS_PER_USER):
+                session.add(Notification(
+                    user_id=telegram_id,
+                    platform="gitlab",
+                    event_type="merge_request_general",
+                    project_name="group/project",
+                    message="<b>Проект:</b> group/project\n" * 5
+                ))
+        await session.commit()
+
+
+async def measure(session_factory, engine, func) -> tuple:
+    queries = 0
+
+    def count_query(*args, **kwargs):
+        nonlocal queries
+        queries += 1
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count_query)
+    try:
+        started = time.perf_counter()
+        for _ in range(REPEATS):
+            async with session_factory() as session:
+                await func(session, PROJECT_ID)
+        elapsed = (time.perf_counter() - started) / REPEATS
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", count_query)
+
+    return queries // REPEATS, elapsed * 1000
+
+
+async def main() -> None:
+    logger.remove()
+    print(f"{'subscribers':>11} | {'legacy queries':>14} | {'legacy ms':>9} | {'joined queries':>14} | {'joined ms':>9}")
+    print("-" * 70)
+
+    for subscribers in SUBSCRIBER_COUNTS:
+        engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+        await seed(session_factory, subscribers)
+
+        legacy_queries, legacy_ms = await measure(session_factory, engine, legacy_get_subscribed_users)
+        joined_queries, joined_ms = await measure(session_factory, engine, get_subscribed_users)
+
+        print(f"{subscribers:>11} | {legacy_queries:>14} | {legacy_ms:>9.2f} | {joined_queries:>14} | {joined_ms:>9.2f}")
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
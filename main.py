@@ -12,7 +12,9 @@ sys.path.insert(0, str(Path(__file__).parent))
 from loguru import logger
 from src.config import settings
 from src.bot import main as bot_main
-from src.webhook import WebhookServer
+from src.webhook import WebhookServer, stop_delivery_engine
+from src.http_client import close_http_sessions
+from src.database import dispose_db
 
 
 def setup_logging() -> None:
@@ -47,6 +49,7 @@ async def main() -> None:
     logger.info(f"Уровень логирования: {settings.log_level}")
     logger.info("=" * 60)
 
+    webhook_server = None
     try:
         # Создаем и запускаем webhook сервер
         webhook_server = WebhookServer(
@@ -61,6 +64,13 @@ async def main() -> None:
     except Exception as e:
         logger.exception(f"Критическая ошибка: {e}")
         sys.exit(1)
+    finally:
+        # Дорабатываем принятые события перед выходом
+        if webhook_server:
+            await webhook_server.stop()
+        await stop_delivery_engine()
+        await close_http_sessions()
+        await dispose_db()
 
 
 if __name__ == "__main__":
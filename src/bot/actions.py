@@ -9,7 +9,8 @@ from loguru import logger
 from sqlalchemy import select
 
 from src.database import get_session, User
-from src.gitlab_api import GitLabClient
+from src.gitlab_api import GitLabActions
+from src.config import settings
 
 router = Router()
 
@@ -69,8 +70,8 @@ async def handle_mr_approve(callback: CallbackQuery):
                 await callback.answer("GitLab токен не настроен", show_alert=True)
                 return
 
-            # Создаем клиент GitLab
-            client = GitLabClient(user.gitlab_token)
+            # Действия выполняются через общую HTTP сессию GitLab
+            client = GitLabActions(user.gitlab_token, base_url=f"{settings.gitlab_url.rstrip('/')}/api/v4")
 
             try:
                 # Approve MR
@@ -105,8 +106,8 @@ async def handle_mr_merge(callback: CallbackQuery):
                 await callback.answer("GitLab токен не настроен. Используйте /set_gitlab_token", show_alert=True)
                 return
 
-            # Создаем клиент GitLab
-            client = GitLabClient(user.gitlab_token)
+            # Действия выполняются через общую HTTP сессию GitLab
+            client = GitLabActions(user.gitlab_token, base_url=f"{settings.gitlab_url.rstrip('/')}/api/v4")
 
             try:
                 # Merge MR
@@ -141,8 +142,8 @@ async def handle_mr_restart_pipeline(callback: CallbackQuery):
                 await callback.answer("GitLab токен не настроен. Используйте /set_gitlab_token", show_alert=True)
                 return
 
-            # Создаем клиент GitLab
-            client = GitLabClient(user.gitlab_token)
+            # Действия выполняются через общую HTTP сессию GitLab
+            client = GitLabActions(user.gitlab_token, base_url=f"{settings.gitlab_url.rstrip('/')}/api/v4")
 
             try:
                 # Получаем информацию о MR
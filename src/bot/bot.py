@@ -4,7 +4,6 @@ from loguru import logger
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
-from aiogram.fsm.storage.memory import MemoryStorage
 
 from src.config import settings
 from src.database import init_db
@@ -13,7 +12,10 @@ from src.bot.subscription_handlers import router as subscription_router
 from src.bot.actions import router as actions_router
 from src.bot.notification_settings_handlers import router as notification_settings_router
 from src.bot.history_handlers import router as history_router
+from src.bot.storage import create_fsm_storage
 from src.webhook import set_bot_instance
+from src.webhook.routing import subscription_index
+from src.database.retention import notification_retention
 
 
 async def main() -> None:
@@ -23,12 +25,15 @@ async def main() -> None:
     await init_db()
     logger.success("База данных инициализирована")
 
+    await subscription_index.start(resync_interval=settings.subscription_index_resync_interval)
+    notification_retention.start(settings.notification_retention_interval)
+
     bot = Bot(
         token=settings.telegram_bot_token,
         default=DefaultBotProperties(parse_mode=ParseMode.MARKDOWN)
     )
 
-    storage = MemoryStorage()
+    storage = create_fsm_storage(settings.fsm_storage, settings.fsm_storage_url)
     dp = Dispatcher(storage=storage)
 
     dp.include_router(main_router)
@@ -48,6 +53,9 @@ async def main() -> None:
         # Запуск polling
         await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
     finally:
+        await subscription_index.stop()
+        await notification_retention.stop()
+        await storage.close()
         await bot.session.close()
 
 
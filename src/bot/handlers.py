@@ -6,6 +6,7 @@ from aiogram import Router, F
 from aiogram.filters import Command, CommandStart
 from aiogram.types import Message
 from sqlalchemy import select
+from sqlalchemy.orm import selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.gitlab_api import GitLabClient
 from src.github_api import GitHubClient
@@ -15,6 +16,7 @@ from src.github_api.client import GitHubClient
 from src.config import settings
 
 from src.database import User, get_session
+from src.webhook.routing import subscription_index
 
 router = Router()
 
@@ -99,7 +101,9 @@ async def cmd_status(message: Message) -> None:
 
     async for session in get_session():
         result = await session.execute(
-            select(User).where(User.telegram_id == telegram_id)
+            select(User)
+            .options(selectinload(User.subscriptions))
+            .where(User.telegram_id == telegram_id)
         )
         user = result.scalar_one_or_none()
 
@@ -163,6 +167,7 @@ async def cmd_set_gitlab_token(message: Message) -> None:
         user.gitlab_token = token
         user.gitlab_username = gitlab_username
         await session.commit()
+        await subscription_index.refresh_user(session, telegram_id)
 
 
         await message.delete()
@@ -214,6 +219,7 @@ async def cmd_set_github_token(message: Message) -> None:
         user.github_token = token
         user.github_username = github_username
         await session.commit()
+        await subscription_index.refresh_user(session, telegram_id)
 
         await message.delete()
         await message.answer(f"GitHub токен успешно установлен! Ваш GitHub username: <b>{github_username}</b>",
@@ -227,7 +233,9 @@ async def cmd_list_subscriptions(message: Message) -> None:
 
     async for session in get_session():
         result = await session.execute(
-            select(User).where(User.telegram_id == telegram_id)
+            select(User)
+            .options(selectinload(User.subscriptions))
+            .where(User.telegram_id == telegram_id)
         )
         user = result.scalar_one_or_none()
 
@@ -9,6 +9,7 @@ from sqlalchemy import select, desc
 from loguru import logger
 
 from src.database import Notification, get_session
+from src.webhook.templates import render_history
 
 router = Router()
 
@@ -53,11 +54,6 @@ async def cmd_history(message: Message) -> None:
                 time_str = notif.sent_at.strftime("%d.%m %H:%M")
                 event_type = notif.event_type.replace("_", " ").title()
 
-                # Краткое содержание
-                first_line = notif.message.split('\n')[0]
-                # Убираем HTML теги для краткого описания
-                summary = first_line.replace('<b>', '').replace('</b>', '')[:50]
-
                 history_text += f"  • [{time_str}] {event_type}\n"
             history_text += "\n"
 
@@ -89,8 +85,9 @@ async def show_history_detail(callback: CallbackQuery) -> None:
                 await callback.answer("Уведомление не найдено.", show_alert=True)
                 return
 
+            # HTML собирается из полей шаблона только здесь
             await callback.message.answer(
-                notification.message,
+                render_history(notification),
                 parse_mode="HTML",
                 disable_web_page_preview=True
             )
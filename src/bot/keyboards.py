@@ -2,7 +2,7 @@
 Клавиатуры для бота
 """
 
-from typing import List, Dict
+from typing import List, Dict, Sequence
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
@@ -21,27 +21,23 @@ def get_platform_keyboard() -> InlineKeyboardMarkup:
 
 
 def get_projects_keyboard(
-    projects: List[dict],
+    projects: Sequence[Sequence[str]],
     platform: str,
     page: int = 0,
     per_page: int = 10
 ) -> InlineKeyboardMarkup:
     """
     Клавиатура со списком проектов/репозиториев
+
+    Args:
+        projects: Пары (id проекта, отображаемое имя)
     """
     builder = InlineKeyboardBuilder()
     start_idx = page * per_page
     end_idx = start_idx + per_page
     page_projects = projects[start_idx:end_idx]
 
-    for project in page_projects:
-        if platform == "gitlab":
-            project_id = project.get("id")
-            project_name = project.get("name_with_namespace", project.get("name"))
-        else:
-            project_id = project.get("full_name")
-            project_name = project.get("full_name")
-
+    for project_id, project_name in page_projects:
         display_name = project_name[:50] + "..." if len(project_name) > 50 else project_name
         builder.button(text=display_name, callback_data=f"project:{platform}:{project_id}")
 
@@ -60,6 +56,8 @@ def get_projects_keyboard(
     if navigation_buttons:
         builder.row(*navigation_buttons)
 
+    # Inline-поиск по всем проектам вместо перелистывания
+    builder.row(InlineKeyboardButton(text="🔎 Поиск", switch_inline_query_current_chat=""))
     builder.row(InlineKeyboardButton(text="Отмена", callback_data="cancel"))
     return builder.as_markup()
 
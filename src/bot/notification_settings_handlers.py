@@ -9,6 +9,7 @@ from loguru import logger
 from sqlalchemy import select
 
 from src.database import get_session, User, NotificationSettings
+from src.webhook.routing import subscription_index
 
 router = Router()
 
@@ -164,6 +165,7 @@ async def handle_toggle_setting(callback: CallbackQuery):
                 current_value = getattr(settings, attr_name)
                 setattr(settings, attr_name, not current_value)
                 await session.commit()
+                await subscription_index.refresh_user(session, callback.from_user.id)
 
                 # Обновляем клавиатуру после переключений
                 await callback.message.edit_reply_markup(
@@ -206,6 +208,7 @@ async def handle_enable_all(callback: CallbackQuery):
             settings.thread_updates_enabled = True
 
             await session.commit()
+            await subscription_index.refresh_user(session, callback.from_user.id)
 
             await callback.message.edit_reply_markup(
                 reply_markup=create_settings_keyboard(settings)
@@ -244,6 +247,7 @@ async def handle_disable_all(callback: CallbackQuery):
             settings.thread_updates_enabled = False
 
             await session.commit()
+            await subscription_index.refresh_user(session, callback.from_user.id)
 
             await callback.message.edit_reply_markup(
                 reply_markup=create_settings_keyboard(settings)
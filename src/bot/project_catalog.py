@@ -0,0 +1,148 @@
+"""
+Кэш списков проектов пользователей для /subscribe
+
+Список хранится в сокращенном виде - пары (id, отображаемое имя), которые
+нужны клавиатуре и выбору проекта, - и отдается сразу. После истечения TTL устаревший список все равно
+показывается, а свежий загружается в фоне (stale-while-revalidate).
+"""
+
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from loguru import logger
+
+from src.bot.project_search import ProjectRef, ProjectSearchIndex
+from src.config import settings
+
+CatalogKey = Tuple[int, str, str]
+PageLoader = Callable[[], AsyncIterator[List[Dict[str, Any]]]]
+
+
+def project_ref(platform: str, project: Dict[str, Any]) -> ProjectRef:
+    """Ссылка на проект из ответа API: GitLab - id и имя с группой, GitHub - full_name"""
+    if platform == "gitlab":
+        return str(project.get("id")), project.get("name_with_namespace", project.get("name"))
+    return project.get("full_name"), project.get("full_name")
+
+
+class CatalogEntry(NamedTuple):
+    """Сохраненный список проектов"""
+    projects: List[ProjectRef]
+    fetched_at: float
+
+
+class ProjectCatalog:
+    """Списки проектов по пользователю, платформе и токену"""
+
+    def __init__(self, ttl: float = 300.0, stale_ttl: float = 86400.0, max_entries: int = 10_000):
+        """
+        Args:
+            ttl: Время, в течение которого список считается свежим (сек)
+            stale_ttl: Время, после которого устаревший список не показывается (сек)
+            max_entries: Максимум хранимых списков
+        """
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+
+        self._entries: "OrderedDict[CatalogKey, CatalogEntry]" = OrderedDict()
+        self._indexes: Dict[CatalogKey, ProjectSearchIndex] = {}
+        self._refreshing: Dict[CatalogKey, asyncio.Task] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+
+    @staticmethod
+    def make_key(telegram_id: int, platform: str, token: str) -> CatalogKey:
+        """Ключ включает хэш токена: после смены токена список загружается заново"""
+        return telegram_id, platform, hashlib.sha256(token.encode()).hexdigest()[:16]
+
+    def get(self, key: CatalogKey) -> Optional[CatalogEntry]:
+        """Список проектов, если он не старше stale_ttl"""
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry.fetched_at > self.stale_ttl:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        if self.is_fresh(entry):
+            self.hits += 1
+        else:
+            self.stale_hits += 1
+        return entry
+
+    def is_fresh(self, entry: CatalogEntry) -> bool:
+        return time.monotonic() - entry.fetched_at <= self.ttl
+
+    def store(self, key: CatalogKey, projects: List[ProjectRef]) -> None:
+        """Сохранение полного списка проектов"""
+        self._entries[key] = CatalogEntry(projects, time.monotonic())
+        self._entries.move_to_end(key)
+        self._indexes.pop(key, None)
+        while len(self._entries) > self.max_entries:
+            evicted, _ = self._entries.popitem(last=False)
+            self._indexes.pop(evicted, None)
+
+    def search(self, key: CatalogKey, query: str, limit: int = 50) -> Optional[List[ProjectRef]]:
+        """
+        Поиск по сохраненному списку проектов
+
+        Returns:
+            Найденные проекты или None, если списка в кэше нет
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        index = self._indexes.get(key)
+        if index is None:
+            index = self._indexes[key] = ProjectSearchIndex(entry.projects)
+        return index.search(query, limit)
+
+    def refresh_in_background(self, key: CatalogKey, loader: PageLoader) -> None:
+        """Фоновая загрузка свежего списка (не больше одной на ключ)"""
+        if key in self._refreshing:
+            return
+        task = asyncio.create_task(self._refresh(key, loader))
+        self._refreshing[key] = task
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _refresh(self, key: CatalogKey, loader: PageLoader) -> None:
+        platform = key[1]
+        projects: List[ProjectRef] = []
+        try:
+            async for page in loader():
+                projects.extend(project_ref(platform, project) for project in page)
+            self.store(key, projects)
+            self.refreshes += 1
+        except Exception as e:
+            logger.warning(f"Error refreshing project catalog: {e}")
+        finally:
+            self._refreshing.pop(key, None)
+
+    def clear(self) -> None:
+        """Очистка кэша"""
+        self._entries.clear()
+        self._indexes.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Статистика кэша"""
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "refreshing": len(self._refreshing),
+        }
+
+
+project_catalog = ProjectCatalog(
+    ttl=settings.project_catalog_ttl,
+    stale_ttl=settings.project_catalog_stale_ttl,
+    max_entries=settings.project_catalog_max_entries
+)
@@ -0,0 +1,92 @@
+"""
+Поиск проектов по локальному индексу для inline-запросов
+
+Индекс строится один раз для списка проектов из кэша: для запросов от трех
+символов кандидаты выбираются пересечением множеств триграмм, короткие
+запросы ищутся двоичным поиском по отсортированным словам пути. Поиск по нескольким тысячам
+проектов занимает доли миллисекунды.
+"""
+
+import bisect
+import re
+from typing import Dict, List, Sequence, Set, Tuple
+
+ProjectRef = Tuple[str, str]
+
+_SEGMENT_SPLIT = re.compile(r"[\s/._-]+")
+
+
+def _trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class ProjectSearchIndex:
+    """Индекс имен проектов одного пользователя"""
+
+    def __init__(self, projects: Sequence[ProjectRef]):
+        """
+        Args:
+            projects: Пары (id проекта, отображаемое имя)
+        """
+        self.projects = list(projects)
+        self._names = [name.lower() for _, name in self.projects]
+        self._basenames = [name.rsplit("/", 1)[-1].strip() for name in self._names]
+        self._segments = [[s for s in _SEGMENT_SPLIT.split(name) if s] for name in self._names]
+        # Отсортированные (слово, позиция) для коротких запросов по префиксу
+        self._words = sorted(
+            (segment, position) for position, segments in enumerate(self._segments) for segment in segments
+        )
+        self._trigrams: Dict[str, Set[int]] = {}
+        for position, name in enumerate(self._names):
+            for trigram in _trigrams(name):
+                self._trigrams.setdefault(trigram, set()).add(position)
+
+    def _prefix_candidates(self, query: str) -> Sequence[int]:
+        start = bisect.bisect_left(self._words, (query,))
+        positions = set()
+        for word, position in self._words[start:]:
+            if not word.startswith(query):
+                break
+            positions.add(position)
+        return sorted(positions)
+
+    def _candidates(self, query: str) -> Sequence[int]:
+        if len(query) < 3:
+            # Одна-две буквы ищутся только в начале слов
+            return self._prefix_candidates(query)
+        postings = sorted((self._trigrams.get(t, set()) for t in _trigrams(query)), key=len)
+        if not postings or not postings[0]:
+            return []
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates &= posting
+            if not candidates:
+                break
+        return sorted(candidates)
+
+    def search(self, query: str, limit: int = 50) -> List[ProjectRef]:
+        """
+        Проекты, в имени которых встречается запрос
+
+        Сначала идут совпадения с началом имени проекта (после последнего "/"),
+        затем с началом любого слова пути, затем остальные.
+        """
+        query = query.strip().lower()
+        if not query:
+            return self.projects[:limit]
+
+        ranked: List[Tuple[int, int, int]] = []
+        for position in self._candidates(query):
+            name = self._names[position]
+            if query not in name:
+                continue
+            if self._basenames[position].startswith(query):
+                rank = 0
+            elif any(segment.startswith(query) for segment in self._segments[position]):
+                rank = 1
+            else:
+                rank = 2
+            ranked.append((rank, len(name), position))
+
+        ranked.sort()
+        return [self.projects[position] for _, _, position in ranked[:limit]]
@@ -0,0 +1,128 @@
+"""
+Хранилища состояния FSM
+
+По умолчанию состояние диалогов хранится в SQLite на диске, а не в памяти
+процесса бота. Для нескольких экземпляров бота можно использовать Redis
+(нужен пакет redis).
+"""
+
+import asyncio
+import json
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from loguru import logger
+
+
+def _storage_key(key: StorageKey) -> str:
+    return ":".join(str(part) for part in (
+        key.bot_id, key.chat_id, key.user_id, key.thread_id, key.business_connection_id, key.destiny
+    ))
+
+
+class SQLiteStorage(BaseStorage):
+    """FSM хранилище в SQLite (WAL), одна строка на чат/пользователя"""
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Путь к файлу базы
+        """
+        self.path = path
+        # Все обращения к sqlite выполняются в одном потоке
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fsm-storage")
+        self._conn: Optional[sqlite3.Connection] = None
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS fsm ("
+                " key TEXT PRIMARY KEY,"
+                " state TEXT,"
+                " data TEXT"
+                ")"
+            )
+            self._conn = conn
+            logger.info(f"FSM storage opened: {self.path}")
+        return self._conn
+
+    def _read_sync(self, key: str, column: str) -> Optional[str]:
+        row = self._connection().execute(f"SELECT {column} FROM fsm WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _write_sync(self, key: str, column: str, value: Optional[str]) -> None:
+        conn = self._connection()
+        conn.execute(
+            f"INSERT INTO fsm (key, {column}) VALUES (?, ?) "
+            f"ON CONFLICT(key) DO UPDATE SET {column} = excluded.{column}",
+            (key, value)
+        )
+        # Пустые записи (нет состояния и данных) не храним
+        conn.execute("DELETE FROM fsm WHERE key = ? AND state IS NULL AND data IS NULL", (key,))
+
+    def _update_data_sync(self, key: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        raw = self._read_sync(key, "data")
+        current = json.loads(raw) if raw else {}
+        current.update(data)
+        self._write_sync(key, "data", json.dumps(current, ensure_ascii=False) if current else None)
+        return current
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        value = state.state if isinstance(state, State) else state
+        await self._run(self._write_sync, _storage_key(key), "state", value)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return await self._run(self._read_sync, _storage_key(key), "state")
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        value = json.dumps(data, ensure_ascii=False) if data else None
+        await self._run(self._write_sync, _storage_key(key), "data", value)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        raw = await self._run(self._read_sync, _storage_key(key), "data")
+        return json.loads(raw) if raw else {}
+
+    async def update_data(self, key: StorageKey, data: Dict[str, Any]) -> Dict[str, Any]:
+        # Чтение и запись в одном потоке sqlite - без гонок между обработчиками
+        current = await self._run(self._update_data_sync, _storage_key(key), data)
+        return current.copy()
+
+    async def close(self) -> None:
+        if self._conn is not None:
+            await self._run(self._conn.close)
+            self._conn = None
+        self._executor.shutdown(wait=False)
+
+
+def create_fsm_storage(backend: str, url: str) -> BaseStorage:
+    """
+    Хранилище FSM по настройкам
+
+    Args:
+        backend: memory, sqlite или redis
+        url: Путь к файлу SQLite или URL Redis
+    """
+    if backend == "memory":
+        return MemoryStorage()
+    if backend == "sqlite":
+        return SQLiteStorage(url)
+    if backend == "redis":
+        try:
+            from aiogram.fsm.storage.redis import RedisStorage
+        except ImportError as e:
+            raise RuntimeError("FSM_STORAGE=redis требует пакет redis (pip install redis)") from e
+        return RedisStorage.from_url(url)
+    raise ValueError(f"Unknown FSM storage backend: {backend}")
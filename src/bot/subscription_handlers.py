@@ -2,17 +2,27 @@
 Обработчики команд подписки на проекты
 """
 
-from typing import Dict, Any, List
+import asyncio
+import hashlib
+import itertools
+from typing import Dict, Any, List, AsyncIterator, Optional, Set
 from aiogram import Router, F
-from aiogram.filters import Command
-from aiogram.types import Message, CallbackQuery
+from aiogram.filters import Command, CommandObject
+from aiogram.types import (
+    Message,
+    CallbackQuery,
+    InlineQuery,
+    InlineQueryResultArticle,
+    InputTextMessageContent
+)
 from aiogram.fsm.context import FSMContext
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from loguru import logger
 
-from src.database import User, Subscription, get_session
+from src.database import User, Subscription, ProjectHook, get_session
 from src.bot.states import SubscriptionStates, UnsubscriptionStates
+from src.bot.project_catalog import CatalogKey, ProjectRef, project_catalog, project_ref
 from src.bot.keyboards import (
     get_platform_keyboard,
     get_projects_keyboard,
@@ -23,14 +33,34 @@ from src.bot.keyboards import (
 from src.gitlab_api import GitLabClient
 from src.github_api import GitHubClient
 from src.config import settings
-from src.webhook.manager import WebhookManager
+from src.webhook.hook_registry import sync_project_hook
+from src.webhook.routing import subscription_index
 
 router = Router()
 
+# Telegram показывает не больше 50 результатов inline-запроса
+INLINE_RESULTS_LIMIT = 50
+INLINE_CACHE_TIME = 5
+
+# Фоновые задачи догрузки проектов (ссылки не дают сборщику мусора их удалить)
+_background_tasks: Set[asyncio.Task] = set()
+
+# Номера показов списка проектов: догрузка пишет только в свой показ
+_project_loads = itertools.count(1)
+
+# Состояние перезаписывается целиком, поэтому догрузка пишет его раз в несколько страниц
+PROJECT_STATE_SYNC_PAGES = 5
+
 
 @router.message(Command("subscribe"))
-async def cmd_subscribe(message: Message, state: FSMContext) -> None:
-    """Запуск процесса подписки"""
+async def cmd_subscribe(message: Message, state: FSMContext, command: Optional[CommandObject] = None) -> None:
+    """
+    Запуск процесса подписки
+
+    С аргументами "/subscribe <платформа> <id проекта> [имя]" (их подставляет
+    inline-поиск) выбор платформы и проекта пропускается. Имя из команды не
+    используется: проект проверяется токеном пользователя.
+    """
     telegram_id = message.from_user.id
 
     async for session in get_session():
@@ -53,6 +83,10 @@ async def cmd_subscribe(message: Message, state: FSMContext) -> None:
             )
             return
 
+        if command and command.args:
+            await start_events_choice(message, state, user, command.args)
+            return
+
         await state.set_state(SubscriptionStates.choosing_platform)
 
         platforms_text = "Выберите платформу:\n\n"
@@ -74,13 +108,174 @@ async def cmd_subscribe(message: Message, state: FSMContext) -> None:
         )
 
 
+def events_prompt(project_name: str) -> str:
+    """Текст выбора типов событий для проекта"""
+    return (
+        f"Выбран проект: {project_name}\n\n"
+        f"Выберите типы событий для отслеживания:\n\n"
+        f"Нажмите на кнопки с событиями, которые хотите отслеживать.\n"
+        f"Когда закончите, нажмите Готово."
+    )
+
+
+async def start_events_choice(message: Message, state: FSMContext, user: User, args: str) -> None:
+    """Переход к выбору событий для проекта из аргументов /subscribe"""
+    parts = args.split(maxsplit=2)
+    platform = parts[0].lower()
+    if platform not in ("gitlab", "github") or len(parts) < 2:
+        await message.answer("Формат: /subscribe <gitlab|github> <id проекта>", parse_mode=None)
+        return
+
+    token = user.gitlab_token if platform == "gitlab" else user.github_token
+    if not token:
+        await message.answer(f"{platform_label(platform)} токен не установлен")
+        return
+
+    ref = await resolve_user_project(user, platform, token, parts[1])
+    if ref is None:
+        await message.answer(
+            f"Проект {parts[1]} не найден в {platform_label(platform)} или недоступен с вашим токеном",
+            parse_mode=None
+        )
+        return
+    project_id, project_name = ref
+
+    await state.set_state(SubscriptionStates.choosing_events)
+    await state.set_data({
+        "platform": platform,
+        "project_id": project_id,
+        "project_name": project_name,
+        "selected_events": []
+    })
+
+    await message.answer(
+        events_prompt(project_name),
+        reply_markup=get_events_keyboard(platform),
+        parse_mode="HTML"
+    )
+
+
+async def resolve_user_project(user: User, platform: str, token: str, project_id: str) -> Optional[ProjectRef]:
+    """
+    Проект из аргумента /subscribe, доступный токену пользователя
+
+    ID в команде можно ввести вручную, поэтому доступ проверяется: по свежему
+    списку проектов пользователя в кэше, иначе запросом проекта к API с его
+    токеном. ID и имя берутся из списка или ответа API.
+
+    Returns:
+        (id, имя) или None, если проект не найден или недоступен
+    """
+    key = project_catalog.make_key(user.telegram_id, platform, token)
+    entry = project_catalog.get(key)
+    if entry is not None and project_catalog.is_fresh(entry):
+        ref = next((ref for ref in entry.projects if ref[0] == project_id), None)
+        if ref is not None:
+            return ref
+
+    try:
+        if platform == "gitlab":
+            async with GitLabClient(settings.gitlab_url, token) as client:
+                project = await client.get_project(project_id)
+        else:
+            owner, _, repo = project_id.partition("/")
+            if not owner or not repo or "/" in repo:
+                return None
+            async with GitHubClient(token) as client:
+                project = await client.get_repository(owner, repo)
+    except Exception as e:
+        logger.warning(f"Project {platform} {project_id} is not accessible for user {user.telegram_id}: {e}")
+        return None
+
+    if not isinstance(project, dict) or not project.get("id"):
+        return None
+    return project_ref(platform, project)
+
+
+def platform_label(platform: str) -> str:
+    """Название платформы для сообщений"""
+    return "GitLab" if platform == "gitlab" else "GitHub"
+
+
+async def iter_project_pages(platform: str, token: str) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Страницы проектов пользователя на платформе"""
+    if platform == "gitlab":
+        async with GitLabClient(settings.gitlab_url, token) as client:
+            async for projects in client.iter_projects(per_page=100):
+                yield projects
+    else:
+        async with GitHubClient(token) as client:
+            async for repos in client.iter_repositories(per_page=100):
+                yield repos
+
+
+async def render_projects(message: Message, projects: List[ProjectRef], platform: str) -> None:
+    """Первая страница клавиатуры выбора проекта"""
+    await message.edit_text(
+        f"Выберите проект из {platform_label(platform)}:\n\n"
+        f"Найдено проектов: {len(projects)}",
+        reply_markup=get_projects_keyboard(projects, platform, page=0),
+        parse_mode="HTML"
+    )
+
+
+async def is_current_load(state: FSMContext, load_id: int) -> bool:
+    """Пользователь всё ещё выбирает проект из списка, который догружается"""
+    if await state.get_state() != SubscriptionStates.choosing_project.state:
+        return False
+    return (await state.get_data()).get("projects_load") == load_id
+
+
+async def load_remaining_projects(
+        pages: AsyncIterator[List[Dict[str, Any]]],
+        projects: List[ProjectRef],
+        message: Message,
+        state: FSMContext,
+        platform: str,
+        catalog_key: CatalogKey,
+        load_id: int
+) -> None:
+    """
+    Догрузка остальных страниц проектов после показа первой
+
+    Загруженная часть списка попадает в состояние каждые PROJECT_STATE_SYNC_PAGES
+    страниц, поэтому навигация и выбор проекта видят её до конца загрузки.
+    Полный список сохраняется в кэш и в состояние, а сообщение обновляется один
+    раз в конце, если пользователь всё ещё выбирает проект из этого показа и
+    не ушел с первой страницы. Новый /subscribe или выбор платформы меняет
+    projects_load, и догрузка перестает писать в состояние.
+    """
+    first_page_size = len(projects)
+    projects = list(projects)
+    try:
+        pages_loaded = 0
+        async for page in pages:
+            projects.extend(project_ref(platform, project) for project in page)
+            pages_loaded += 1
+            if pages_loaded % PROJECT_STATE_SYNC_PAGES == 0 and await is_current_load(state, load_id):
+                await state.update_data(projects=projects)
+
+        project_catalog.store(catalog_key, projects)
+
+        if len(projects) > first_page_size and await is_current_load(state, load_id):
+            await state.update_data(projects=projects)
+            if (await state.get_data()).get("projects_page", 0) == 0:
+                await render_projects(message, projects, platform)
+    except Exception as e:
+        logger.warning(f"Error loading remaining projects: {e}")
+    finally:
+        await pages.aclose()
+
+
 @router.callback_query(F.data.startswith("platform:"), SubscriptionStates.choosing_platform)
 async def process_platform_choice(callback: CallbackQuery, state: FSMContext) -> None:
     """Выбор платформы"""
     platform = callback.data.split(":")[1]
     telegram_id = callback.from_user.id
 
-    await state.update_data(platform=platform)
+    # Догрузка предыдущего показа больше не пишет в состояние
+    load_id = next(_project_loads)
+    await state.update_data(platform=platform, projects_load=load_id, projects_page=0)
 
     async for session in get_session():
         result = await session.execute(
@@ -92,25 +287,31 @@ async def process_platform_choice(callback: CallbackQuery, state: FSMContext) ->
             await callback.answer("Пользователь не найден", show_alert=True)
             return
 
-        # Список проектов
-        try:
-            if platform == "gitlab":
-                if not user.gitlab_token:
-                    await callback.answer("GitLab токен не установлен", show_alert=True)
-                    return
+        token = user.gitlab_token if platform == "gitlab" else user.github_token
+        if not token:
+            await callback.answer(f"{platform_label(platform)} токен не установлен", show_alert=True)
+            return
 
-                async with GitLabClient(settings.gitlab_url, user.gitlab_token) as client:
-                    projects = await client.get_projects(per_page=50)
+        # Список из кэша показывается сразу, устаревший обновляется в фоне
+        catalog_key = project_catalog.make_key(telegram_id, platform, token)
+        cached = project_catalog.get(catalog_key)
+        if cached is not None and cached.projects:
+            if not project_catalog.is_fresh(cached):
+                project_catalog.refresh_in_background(catalog_key, lambda: iter_project_pages(platform, token))
 
-            else:  # github
-                if not user.github_token:
-                    await callback.answer("GitHub токен не установлен", show_alert=True)
-                    return
+            await state.update_data(projects=cached.projects)
+            await state.set_state(SubscriptionStates.choosing_project)
+            await render_projects(callback.message, cached.projects, platform)
+            await callback.answer()
+            return
 
-                async with GitHubClient(user.github_token) as client:
-                    projects = await client.get_repositories(per_page=50)
+        # Первая страница проектов показывается сразу, остальные догружаются в фоне
+        pages = iter_project_pages(platform, token)
+        try:
+            first_page = await anext(pages, [])
 
-            if not projects:
+            if not first_page:
+                await pages.aclose()
                 await callback.message.edit_text(
                     f"У вас нет доступных проектов на {platform.upper()}.\n\n"
                     "Используйте /cancel для отмены."
@@ -118,21 +319,23 @@ async def process_platform_choice(callback: CallbackQuery, state: FSMContext) ->
                 return
 
             # Сохраняем проекты в состоянии
+            projects = [project_ref(platform, project) for project in first_page]
             await state.update_data(projects=projects)
             await state.set_state(SubscriptionStates.choosing_project)
 
-            platform_name = "GitLab" if platform == "gitlab" else "GitHub"
-            await callback.message.edit_text(
-                f"Выберите проект из {platform_name}:\n\n"
-                f"Найдено проектов: {len(projects)}",
-                reply_markup=get_projects_keyboard(projects, platform, page=0),
-                parse_mode="HTML"
-            )
+            await render_projects(callback.message, projects, platform)
 
             await callback.answer()
 
+            task = asyncio.create_task(
+                load_remaining_projects(pages, projects, callback.message, state, platform, catalog_key, load_id)
+            )
+            _background_tasks.add(task)
+            task.add_done_callback(_background_tasks.discard)
+
         except Exception as e:
             logger.error(f"Error fetching projects: {e}")
+            await pages.aclose()
             await callback.message.edit_text(
                 f"Ошибка при получении списка проектов:\n{str(e)}\n\n"
                 "Проверьте правильность токена и попробуйте снова."
@@ -140,6 +343,78 @@ async def process_platform_choice(callback: CallbackQuery, state: FSMContext) ->
             await state.clear()
 
 
+async def search_user_projects(user: User, platform: str, token: str, query: str) -> List[ProjectRef]:
+    """
+    Поиск проектов пользователя на платформе
+
+    Если список проектов есть в кэше, поиск идет по локальному индексу.
+    Иначе используется поиск на стороне GitLab/GitHub, а список загружается
+    в кэш в фоне для следующих запросов.
+    """
+    key = project_catalog.make_key(user.telegram_id, platform, token)
+    entry = project_catalog.get(key)
+    if entry is None or not project_catalog.is_fresh(entry):
+        project_catalog.refresh_in_background(key, lambda: iter_project_pages(platform, token))
+    if entry is not None:
+        return project_catalog.search(key, query, limit=INLINE_RESULTS_LIMIT)
+
+    if not query:
+        return []
+    try:
+        if platform == "gitlab":
+            async with GitLabClient(settings.gitlab_url, token) as client:
+                projects = await client.search_projects(query, per_page=INLINE_RESULTS_LIMIT)
+        else:
+            async with GitHubClient(token) as client:
+                projects = await client.search_repositories(
+                    query, owner=user.github_username, per_page=INLINE_RESULTS_LIMIT
+                )
+    except Exception as e:
+        logger.warning(f"Error searching projects on {platform}: {e}")
+        return []
+    return [project_ref(platform, project) for project in projects]
+
+
+def project_search_result(platform: str, ref: ProjectRef) -> InlineQueryResultArticle:
+    """Результат inline-поиска: при выборе отправляет команду подписки на проект"""
+    project_id, project_name = ref
+    return InlineQueryResultArticle(
+        id=hashlib.md5(f"{platform}:{project_id}".encode()).hexdigest(),
+        title=project_name,
+        description=platform_label(platform),
+        input_message_content=InputTextMessageContent(
+            message_text=f"/subscribe {platform} {project_id} {project_name}",
+            parse_mode=None
+        )
+    )
+
+
+@router.inline_query()
+async def process_project_search(inline_query: InlineQuery) -> None:
+    """Inline-поиск проекта для подписки"""
+    telegram_id = inline_query.from_user.id
+
+    user = None
+    async for session in get_session():
+        result = await session.execute(
+            select(User).where(User.telegram_id == telegram_id)
+        )
+        user = result.scalar_one_or_none()
+
+    results: List[InlineQueryResultArticle] = []
+    if user:
+        for platform, token in (("gitlab", user.gitlab_token), ("github", user.github_token)):
+            if token:
+                refs = await search_user_projects(user, platform, token, inline_query.query.strip())
+                results.extend(project_search_result(platform, ref) for ref in refs)
+
+    await inline_query.answer(
+        results[:INLINE_RESULTS_LIMIT],
+        is_personal=True,
+        cache_time=INLINE_CACHE_TIME
+    )
+
+
 @router.callback_query(F.data.startswith("page:"), SubscriptionStates.choosing_project)
 async def process_page_navigation(callback: CallbackQuery, state: FSMContext) -> None:
     """Навигация по страницам проектов"""
@@ -153,6 +428,7 @@ async def process_page_navigation(callback: CallbackQuery, state: FSMContext) ->
         await callback.answer("Список проектов пуст", show_alert=True)
         return
 
+    await state.update_data(projects_page=page)
     platform_name = "GitLab" if platform == "gitlab" else "GitHub"
     await callback.message.edit_text(
         f"Выберите проект из {platform_name}:\n\n"
@@ -174,38 +450,19 @@ async def process_project_choice(callback: CallbackQuery, state: FSMContext) ->
     projects = data.get("projects", [])
 
     # ищем проект ранее выбранный
-    selected_project = None
-    for project in projects:
-        if platform == "gitlab":
-            if str(project.get("id")) == project_id:
-                selected_project = project
-                break
-        else:
-            if project.get("full_name") == project_id:
-                selected_project = project
-                break
+    project_name = next((name for ref_id, name in projects if ref_id == project_id), None)
 
-    if not selected_project:
+    if project_name is None:
         await callback.answer("Проект не найден", show_alert=True)
         return
 
-    # сохраняем его
-    await state.update_data(
-        selected_project=selected_project,
-        project_id=project_id
-    )
+    # сохраняем его, список проектов больше не нужен
+    data.pop("projects", None)
+    await state.set_data({**data, "project_id": project_id, "project_name": project_name})
     await state.set_state(SubscriptionStates.choosing_events)
 
-    if platform == "gitlab":
-        project_name = selected_project.get("name_with_namespace", selected_project.get("name"))
-    else:
-        project_name = selected_project.get("full_name")
-
     await callback.message.edit_text(
-        f"Выбран проект: {project_name}\n\n"
-        f"Выберите типы событий для отслеживания:\n\n"
-        f"Нажмите на кнопки с событиями, которые хотите отслеживать.\n"
-        f"Когда закончите, нажмите Готово.",
+        events_prompt(project_name),
         reply_markup=get_events_keyboard(platform),
         parse_mode="HTML"
     )
@@ -267,12 +524,7 @@ async def process_events_done(callback: CallbackQuery, state: FSMContext) -> Non
         return
 
     platform = data.get("platform")
-    selected_project = data.get("selected_project")
-
-    if platform == "gitlab":
-        project_name = selected_project.get("name_with_namespace", selected_project.get("name"))
-    else:
-        project_name = selected_project.get("full_name")
+    project_name = data.get("project_name")
 
     events_text = ", ".join(selected_events)
 
@@ -295,6 +547,25 @@ async def process_events_done(callback: CallbackQuery, state: FSMContext) -> Non
     await callback.answer()
 
 
+async def sync_user_project_hook(
+        session: AsyncSession,
+        telegram_id: int,
+        platform: str,
+        project_id: str
+) -> Optional[ProjectHook]:
+    """Синхронизация webhook проекта с подписками от имени пользователя"""
+    result = await session.execute(
+        select(User).where(User.telegram_id == telegram_id)
+    )
+    user = result.scalar_one_or_none()
+    token = None
+    if user:
+        token = user.gitlab_token if platform == "gitlab" else user.github_token
+    if not token:
+        return None
+    return await sync_project_hook(session, platform, project_id, token)
+
+
 @router.callback_query(F.data == "confirm:subscribe", SubscriptionStates.confirming)
 async def process_subscribe_confirmation(callback: CallbackQuery, state: FSMContext) -> None:
     """Подтверждение подписки"""
@@ -303,14 +574,9 @@ async def process_subscribe_confirmation(callback: CallbackQuery, state: FSMCont
 
     platform = data.get("platform")
     project_id = data.get("project_id")
-    selected_project = data.get("selected_project")
+    project_name = data.get("project_name")
     selected_events = data.get("selected_events", [])
 
-    if platform == "gitlab":
-        project_name = selected_project.get("name_with_namespace", selected_project.get("name"))
-    else:
-        project_name = selected_project.get("full_name")
-
     events_str = ",".join(selected_events)
 
     async for session in get_session():
@@ -326,17 +592,10 @@ async def process_subscribe_confirmation(callback: CallbackQuery, state: FSMCont
 
         if existing_sub:
             # Обновляем существующую подписку
-            existing_sub.event_types = events_str
-            existing_sub.is_active = True
-            await session.commit()
-
-            await callback.message.edit_text(
-                f"Подписка обновлена!\n\n"
-                f"Проект: {project_name}\n"
-                f"События: {events_str}\n\n"
-                f"Вы будете получать уведомления о выбранных событиях.",
-                parse_mode="HTML"
-            )
+            subscription = existing_sub
+            subscription.event_types = events_str
+            subscription.is_active = True
+            header = "Подписка обновлена!"
         else:
             # Или создаем новую
             subscription = Subscription(
@@ -348,41 +607,24 @@ async def process_subscribe_confirmation(callback: CallbackQuery, state: FSMCont
                 is_active=True
             )
             session.add(subscription)
-            await session.commit()
+            header = "Подписка создана!"
 
-            # Настраиваем webhook
-            result = await session.execute(
-                select(User).where(User.telegram_id == telegram_id)
-            )
-            user = result.scalar_one_or_none()
-
-            if user:
-                if platform == "gitlab" and user.gitlab_token:
-                    webhook_id = await WebhookManager.setup_gitlab_webhook(
-                        project_id=str(project_id),
-                        gitlab_token=user.gitlab_token,
-                        event_types=selected_events
-                    )
-                    if webhook_id:
-                        subscription.webhook_id = str(webhook_id)
-                        await session.commit()
-                elif platform == "github" and user.github_token:
-                    webhook_id = await WebhookManager.setup_github_webhook(
-                        repo_full_name=project_id,
-                        github_token=user.github_token,
-                        event_types=selected_events
-                    )
-                    if webhook_id:
-                        subscription.webhook_id = str(webhook_id)
-                        await session.commit()
+        await session.commit()
+        await subscription_index.refresh_user(session, telegram_id)
 
-            await callback.message.edit_text(
-                f"Подписка создана!\n\n"
-                f"Проект: {project_name}\n"
-                f"События: {events_str}\n\n"
-                f"Вы будете получать уведомления о выбранных событиях.",
-                parse_mode="HTML"
-            )
+        # Общий webhook проекта: создается для первой подписки, иначе расширяются его события
+        hook = await sync_user_project_hook(session, telegram_id, platform, str(project_id))
+        if hook and hook.hook_id and subscription.webhook_id != hook.hook_id:
+            subscription.webhook_id = hook.hook_id
+            await session.commit()
+
+        await callback.message.edit_text(
+            f"{header}\n\n"
+            f"Проект: {project_name}\n"
+            f"События: {events_str}\n\n"
+            f"Вы будете получать уведомления о выбранных событиях.",
+            parse_mode="HTML"
+        )
 
     await state.clear()
     await callback.answer()
@@ -489,6 +731,10 @@ async def process_unsubscribe_confirmation(callback: CallbackQuery, state: FSMCo
         # Удаляем
         await session.delete(subscription)
         await session.commit()
+        await subscription_index.refresh_user(session, subscription.user_id)
+
+        # Последний подписчик удаляет webhook проекта, иначе сужаются его события
+        await sync_user_project_hook(session, subscription.user_id, subscription.platform, subscription.project_id)
 
         await callback.message.edit_text(
             f"Подписка удалена!\n\n"
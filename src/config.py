@@ -19,6 +19,14 @@ class Settings(BaseSettings):
 
     # Bot
     telegram_bot_token: str = Field(..., description="Telegram Bot API токен")
+    telegram_global_rate: float = Field(default=30.0, description="Лимит отправки сообщений ботом (сообщений/сек)")
+    telegram_chat_rate: float = Field(default=1.0, description="Лимит отправки сообщений в один чат (сообщений/сек)")
+    telegram_chat_burst: int = Field(default=1, description="Сколько сообщений подряд можно отправить в чат без ожидания")
+    telegram_send_concurrency: int = Field(default=30, description="Максимум одновременных запросов sendMessage")
+    telegram_max_retries: int = Field(default=5, description="Повторы отправки после 429 Too Many Requests")
+    telegram_delivery_queue_size: int = Field(default=10_000, description="Максимум сообщений в очереди отправки")
+    notification_flush_interval: float = Field(default=0.05, description="Время накопления истории уведомлений перед записью (сек)")
+    notification_flush_retries: int = Field(default=5, description="Повторы записи истории уведомлений при ошибке БД")
 
     # GitLab
     gitlab_url: str = Field(default="https://gitlab.com", description="URL GitLab инстанса")
@@ -27,16 +35,109 @@ class Settings(BaseSettings):
     # GitHub
     github_token: str = Field(default="", description="GitHub Personal Access Token")
 
+    # HTTP клиенты GitLab/GitHub API
+    http_limit_per_host: int = Field(default=20, description="Максимум соединений к одному хосту API")
+    http_keepalive_timeout: float = Field(default=60.0, description="Время жизни неиспользуемого соединения (сек)")
+    http_dns_cache_ttl: int = Field(default=300, description="Время кэширования DNS (сек)")
+    http_timeout: float = Field(default=30.0, description="Таймаут запроса к API (сек)")
+    http_concurrency_per_token: int = Field(default=8, description="Максимум одновременных запросов к API с одним токеном")
+    http_rate_limit_reserve: float = Field(
+        default=0.1,
+        description="Доля лимита API, недоступная фоновым запросам (резерв для действий пользователя)"
+    )
+    http_max_retries: int = Field(default=4, description="Повторы запроса к API после 429/5xx")
+    http_backoff_base: float = Field(default=0.5, description="Начальная задержка повтора запроса к API (сек)")
+    http_backoff_max: float = Field(default=30.0, description="Максимальная задержка повтора запроса к API (сек)")
+    http_cache_max_entries: int = Field(default=1024, description="Максимум ответов API в кэше (0 - отключить)")
+    http_cache_max_bytes: int = Field(default=16 * 1024 * 1024, description="Максимальный объем кэша ответов API (байт)")
+
+    # Состояние диалогов (FSM)
+    fsm_storage: str = Field(default="memory", description="Хранилище состояния диалогов: memory, sqlite или redis")
+    fsm_storage_url: str = Field(
+        default="./fsm_state.db",
+        description="Путь к файлу SQLite или URL Redis (redis://host:6379/0) для состояния диалогов"
+    )
+
+    # Кэш списков проектов для /subscribe
+    project_catalog_ttl: float = Field(default=300.0, description="Время, в течение которого список проектов свежий (сек)")
+    project_catalog_stale_ttl: float = Field(
+        default=86400.0,
+        description="Время, после которого устаревший список проектов не показывается (сек)"
+    )
+    project_catalog_max_entries: int = Field(default=10_000, description="Максимум списков проектов в кэше")
+
     # Database
     database_url: str = Field(
         default="sqlite+aiosqlite:///./gitlab_assistant.db",
         description="URL подключения к базе данных"
     )
+    db_pool_size: int = Field(default=5, description="Постоянных соединений в пуле БД")
+    db_max_overflow: int = Field(default=10, description="Дополнительных соединений сверх пула при пиковой нагрузке")
+    db_pool_timeout: float = Field(default=30.0, description="Ожидание свободного соединения из пула (сек)")
+    db_pool_recycle: int = Field(default=1800, description="Пересоздание соединения PostgreSQL после (сек), -1 - никогда")
+    db_pool_pre_ping: bool = Field(default=True, description="Проверять соединение PostgreSQL перед выдачей из пула")
+    db_statement_cache_size: int = Field(
+        default=500,
+        description="Размер кэша подготовленных запросов asyncpg (0 - отключить, нужно для pgbouncer)"
+    )
+    sqlite_synchronous: str = Field(default="NORMAL", description="PRAGMA synchronous для SQLite (NORMAL безопасен в WAL)")
+    sqlite_busy_timeout: int = Field(default=5000, description="Ожидание блокировки записи SQLite (мс)")
+    sqlite_cache_size_kb: int = Field(default=16384, description="Кэш страниц SQLite на соединение (КиБ)")
+    sqlite_mmap_size: int = Field(default=256 * 1024 * 1024, description="Объем файла SQLite, читаемый через mmap (байт)")
+
+    # Хранение истории уведомлений
+    notification_retention_max_age_days: int = Field(
+        default=90,
+        description="Удалять уведомления старше (дней), 0 - без ограничения"
+    )
+    notification_retention_max_per_user: int = Field(
+        default=1000,
+        description="Хранить не больше уведомлений на пользователя, 0 - без ограничения"
+    )
+    notification_retention_interval: float = Field(default=3600.0, description="Интервал очистки истории (сек), 0 - отключить")
+    notification_retention_batch_size: int = Field(default=500, description="Строк, удаляемых одной транзакцией")
+    notification_retention_batch_pause: float = Field(default=0.05, description="Пауза между пакетами удаления (сек)")
+    notification_archive_dir: str = Field(
+        default="",
+        description="Каталог архива удаленных уведомлений (пустая строка - не архивировать)"
+    )
 
     # Webhook
     webhook_host: str = Field(default="0.0.0.0", description="Хост для прослушивания webhook сервера")
     webhook_port: int = Field(default=8443, description="Порт для webhook сервера")
     webhook_public_url: str = Field(default="", description="Публичный URL для webhooks (https://your-domain.com)")
+    gitlab_webhook_secret: str = Field(default="", description="Секретный токен GitLab webhooks (X-Gitlab-Token)")
+    github_webhook_secret: str = Field(default="", description="Секрет подписи GitHub webhooks")
+    webhook_reconcile_concurrency: int = Field(
+        default=8,
+        description="Сколько проектов сверять с GitLab/GitHub одновременно"
+    )
+    webhook_prefilter_enabled: bool = Field(
+        default=True,
+        description="Отбрасывать события без уведомлений (pipeline в процессе и т.п.) до постановки в очередь"
+    )
+    metrics_enabled: bool = Field(default=True, description="Отдавать метрики Prometheus на /metrics webhook сервера")
+    webhook_queue_size: int = Field(default=1000, description="Максимальный размер очереди webhook событий")
+    webhook_workers: int = Field(default=4, description="Количество воркеров обработки webhook событий")
+    webhook_retry_after: int = Field(default=5, description="Значение Retry-After (сек) при переполнении очереди")
+    webhook_drain_timeout: float = Field(default=30.0, description="Время ожидания обработки очереди при остановке (сек)")
+    webhook_spool_path: str = Field(
+        default="./webhook_spool.db",
+        description="Файл журнала принятых webhook событий (пустая строка отключает журнал)"
+    )
+    webhook_spool_flush_interval: float = Field(default=0.005, description="Интервал группового коммита журнала (сек)")
+    webhook_spool_batch_size: int = Field(default=256, description="Максимум записей журнала в одном коммите")
+    webhook_spool_retention: float = Field(default=3600.0, description="Время хранения обработанных записей журнала (сек)")
+    webhook_dedup_ttl: float = Field(default=3600.0, description="Окно дедупликации повторных доставок (сек)")
+    webhook_dedup_max_entries: int = Field(default=100_000, description="Максимум ключей доставок в памяти")
+    webhook_dedup_persist: bool = Field(
+        default=True,
+        description="Восстанавливать окно дедупликации из журнала при запуске"
+    )
+    subscription_index_resync_interval: float = Field(
+        default=300.0,
+        description="Интервал полной пересборки индекса подписок в памяти (сек), 0 - отключить"
+    )
 
     # Logging
     log_level: str = Field(default="INFO", description="Уровень логирования")
@@ -1,14 +1,17 @@
-from src.database.database import init_db, get_session, AsyncSessionLocal
-from src.database.models import Base, User, Subscription, Notification
+from src.database.database import init_db, dispose_db, create_engine, get_session, AsyncSessionLocal
+from src.database.models import Base, User, Subscription, ProjectHook, Notification
 from src.database.notification_settings import NotificationSettings
 
 __all__ = [
     "init_db",
+    "dispose_db",
+    "create_engine",
     "get_session",
     "AsyncSessionLocal",
     "Base",
     "User",
     "Subscription",
+    "ProjectHook",
     "Notification",
     "NotificationSettings",
 ]
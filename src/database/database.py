@@ -1,18 +1,87 @@
-from typing import AsyncGenerator
+from typing import Any, AsyncGenerator, Dict, Optional
 
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
-from sqlalchemy.pool import NullPool
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine, async_sessionmaker
 
 from src.config import settings
-from src.database.models import Base
+from src.database.migrate import upgrade_schema
+from src.metrics import instrument_engine
+
+
+def _is_sqlite_memory(database: Optional[str]) -> bool:
+    return not database or database == ":memory:" or database.startswith("file::memory:")
+
+
+def create_engine(database_url: Optional[str] = None, echo: Optional[bool] = None) -> AsyncEngine:
+    """
+    Асинхронный движок с настройками под backend
+
+    SQLite: постоянный пул соединений, у каждого соединения WAL журнал,
+    synchronous=NORMAL, busy_timeout, кэш страниц и mmap. Без пула каждая
+    сессия заново открывала файл и теряла кэш страниц.
+
+    PostgreSQL (asyncpg): размер пула, overflow, pre-ping, recycle и кэш
+    подготовленных запросов из Settings.
+
+    Args:
+        database_url: URL БД (по умолчанию settings.database_url)
+        echo: Логирование SQL (по умолчанию settings.debug)
+    """
+    url = make_url(database_url or settings.database_url)
+    kwargs: Dict[str, Any] = {"echo": settings.debug if echo is None else echo}
+
+    if url.get_backend_name() == "sqlite":
+        if not _is_sqlite_memory(url.database):
+            # По умолчанию aiosqlite получает NullPool, для :memory: - StaticPool
+            kwargs.update(
+                poolclass=AsyncAdaptedQueuePool,
+                pool_size=settings.db_pool_size,
+                max_overflow=settings.db_max_overflow,
+                pool_timeout=settings.db_pool_timeout,
+            )
+        engine = create_async_engine(url, **kwargs)
+        _install_sqlite_pragmas(engine, memory=_is_sqlite_memory(url.database))
+        return engine
+
+    kwargs.update(
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+    )
+    if url.get_driver_name() == "asyncpg":
+        url = url.update_query_dict({"prepared_statement_cache_size": str(settings.db_statement_cache_size)})
+        kwargs["connect_args"] = {"statement_cache_size": settings.db_statement_cache_size}
+    return create_async_engine(url, **kwargs)
+
+
+def _install_sqlite_pragmas(engine: AsyncEngine, memory: bool) -> None:
+    """PRAGMA выполняются на каждом новом соединении пула"""
+    pragmas = [
+        f"PRAGMA synchronous={settings.sqlite_synchronous}",
+        f"PRAGMA busy_timeout={settings.sqlite_busy_timeout}",
+        f"PRAGMA cache_size=-{settings.sqlite_cache_size_kb}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+    if not memory:
+        pragmas = ["PRAGMA journal_mode=WAL", f"PRAGMA mmap_size={settings.sqlite_mmap_size}"] + pragmas
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
 
 
 # асинхронный движок
-engine = create_async_engine(
-    settings.database_url,
-    echo=settings.debug,
-    poolclass=NullPool if "sqlite" in settings.database_url else None,
-)
+engine = create_engine()
+instrument_engine(engine)
 
 AsyncSessionLocal = async_sessionmaker(
     engine,
@@ -24,9 +93,14 @@ AsyncSessionLocal = async_sessionmaker(
 
 
 async def init_db() -> None:
-    """Инициализация"""
+    """Инициализация: применение недостающих миграций"""
     async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(upgrade_schema)
+
+
+async def dispose_db() -> None:
+    """Закрытие соединений пула"""
+    await engine.dispose()
 
 
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
@@ -40,4 +114,3 @@ async def get_session() -> AsyncGenerator[AsyncSession, None]:
             raise
         finally:
             await session.close()
-
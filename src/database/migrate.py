@@ -0,0 +1,40 @@
+"""
+Применение миграций Alembic
+
+Базы, созданные до появления миграций (Base.metadata.create_all), не содержат
+таблицы alembic_version: они помечаются исходной ревизией и обновляются
+обычным путем.
+"""
+
+from pathlib import Path
+from typing import Optional
+
+from alembic import command
+from alembic.config import Config
+from loguru import logger
+from sqlalchemy import inspect
+from sqlalchemy.engine import Connection
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent / "migrations"
+BASELINE_REVISION = "0001"
+
+
+def alembic_config(connection: Optional[Connection] = None) -> Config:
+    """Конфигурация Alembic без alembic.ini, с переданным соединением"""
+    config = Config()
+    config.set_main_option("script_location", str(MIGRATIONS_DIR))
+    if connection is not None:
+        config.attributes["connection"] = connection
+    return config
+
+
+def upgrade_schema(connection: Connection, revision: str = "head") -> None:
+    """Применение недостающих миграций на синхронном соединении (conn.run_sync)"""
+    tables = set(inspect(connection).get_table_names())
+    config = alembic_config(connection)
+
+    if "alembic_version" not in tables and "users" in tables:
+        logger.info(f"База без истории миграций, помечается ревизией {BASELINE_REVISION}")
+        command.stamp(config, BASELINE_REVISION)
+
+    command.upgrade(config, revision)
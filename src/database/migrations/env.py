@@ -0,0 +1,56 @@
+"""
+Окружение Alembic
+
+Запускается двумя способами:
+    - из init_db(): соединение передается через config.attributes["connection"]
+    - из командной строки (alembic upgrade head): движок создается по settings.database_url
+"""
+
+import asyncio
+
+from alembic import context
+from sqlalchemy.engine import Connection
+
+from src.database.models import Base
+from src.database import notification_settings  # noqa: F401  регистрация таблицы в metadata
+
+target_metadata = Base.metadata
+
+
+def run_migrations(connection: Connection) -> None:
+    # batch режим нужен SQLite для изменения ограничений (пересоздание таблицы)
+    context.configure(connection=connection, target_metadata=target_metadata, render_as_batch=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+async def run_async_migrations() -> None:
+    from src.database.database import create_engine
+
+    engine = create_engine()
+    try:
+        async with engine.begin() as connection:
+            await connection.run_sync(run_migrations)
+    finally:
+        await engine.dispose()
+
+
+def run_migrations_offline() -> None:
+    from src.config import settings
+
+    context.configure(
+        url=settings.database_url,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        render_as_batch=True,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+elif context.config.attributes.get("connection") is not None:
+    run_migrations(context.config.attributes["connection"])
+else:
+    asyncio.run(run_async_migrations())
@@ -0,0 +1,90 @@
+"""Исходная схема (до миграций, создавалась Base.metadata.create_all)
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("telegram_id", sa.BigInteger(), nullable=False),
+        sa.Column("username", sa.String(255), nullable=True),
+        sa.Column("first_name", sa.String(255), nullable=True),
+        sa.Column("last_name", sa.String(255), nullable=True),
+        sa.Column("gitlab_token", sa.String(500), nullable=True),
+        sa.Column("github_token", sa.String(500), nullable=True),
+        sa.Column("gitlab_username", sa.String(255), nullable=True),
+        sa.Column("github_username", sa.String(255), nullable=True),
+        sa.Column("is_active", sa.Boolean(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_users_telegram_id", "users", ["telegram_id"], unique=True)
+    op.create_index("ix_users_gitlab_username", "users", ["gitlab_username"])
+    op.create_index("ix_users_github_username", "users", ["github_username"])
+
+    op.create_table(
+        "subscriptions",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("user_id", sa.BigInteger(), sa.ForeignKey("users.telegram_id"), nullable=False),
+        sa.Column("platform", sa.String(50), nullable=False),
+        sa.Column("project_id", sa.String(255), nullable=False),
+        sa.Column("project_name", sa.String(500), nullable=False),
+        sa.Column("event_types", sa.Text(), nullable=False),
+        sa.Column("webhook_id", sa.String(255), nullable=True),
+        sa.Column("is_active", sa.Boolean(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    )
+
+    op.create_table(
+        "notifications",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("user_id", sa.BigInteger(), sa.ForeignKey("users.telegram_id"), nullable=False),
+        sa.Column("platform", sa.String(50), nullable=False),
+        sa.Column("event_type", sa.String(100), nullable=False),
+        sa.Column("project_name", sa.String(500), nullable=False),
+        sa.Column("message", sa.Text(), nullable=False),
+        sa.Column("telegram_message_id", sa.Integer(), nullable=True),
+        sa.Column("parent_notification_id", sa.Integer(), sa.ForeignKey("notifications.id"), nullable=True),
+        sa.Column("meta_data", sa.Text(), nullable=True),
+        sa.Column("sent_at", sa.DateTime(), nullable=False),
+    )
+
+    op.create_table(
+        "notification_settings",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("user_id", sa.BigInteger(), sa.ForeignKey("users.telegram_id"), nullable=False, unique=True),
+        sa.Column("mentions_enabled", sa.Boolean(), nullable=False),
+        sa.Column("general_updates_enabled", sa.Boolean(), nullable=False),
+        sa.Column("reviewer_assignment_enabled", sa.Boolean(), nullable=False),
+        sa.Column("merge_enabled", sa.Boolean(), nullable=False),
+        sa.Column("pipeline_completion_enabled", sa.Boolean(), nullable=False),
+        sa.Column("issue_assignment_enabled", sa.Boolean(), nullable=False),
+        sa.Column("issue_mention_enabled", sa.Boolean(), nullable=False),
+        sa.Column("note_mention_enabled", sa.Boolean(), nullable=False),
+        sa.Column("label_changes_enabled", sa.Boolean(), nullable=False),
+        sa.Column("thread_updates_enabled", sa.Boolean(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("notification_settings")
+    op.drop_table("notifications")
+    op.drop_table("subscriptions")
+    op.drop_index("ix_users_github_username", table_name="users")
+    op.drop_index("ix_users_gitlab_username", table_name="users")
+    op.drop_index("ix_users_telegram_id", table_name="users")
+    op.drop_table("users")
@@ -0,0 +1,57 @@
+"""Ключ треда уведомлений, индекс подписчиков проекта и реестр webhooks
+
+Эти изменения появились до миграций, поэтому в базах, созданных
+Base.metadata.create_all более новой версией, они уже могут быть:
+каждый шаг проверяет наличие столбца/индекса/таблицы.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+
+    notification_columns = {column["name"] for column in inspector.get_columns("notifications")}
+    if "thread_key" not in notification_columns:
+        op.add_column("notifications", sa.Column("thread_key", sa.String(255), nullable=True))
+    if "ix_notifications_user_thread" not in {index["name"] for index in inspector.get_indexes("notifications")}:
+        op.create_index("ix_notifications_user_thread", "notifications", ["user_id", "thread_key"])
+
+    if "ix_subscriptions_platform_project_active" not in {
+        index["name"] for index in inspector.get_indexes("subscriptions")
+    }:
+        op.create_index(
+            "ix_subscriptions_platform_project_active", "subscriptions", ["platform", "project_id", "is_active"]
+        )
+
+    if not inspector.has_table("project_hooks"):
+        op.create_table(
+            "project_hooks",
+            sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column("platform", sa.String(50), nullable=False),
+            sa.Column("project_id", sa.String(255), nullable=False),
+            sa.Column("hook_id", sa.String(255), nullable=True),
+            sa.Column("event_types", sa.Text(), nullable=False),
+            sa.Column("ref_count", sa.Integer(), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+            sa.Column("updated_at", sa.DateTime(), nullable=False),
+            sa.UniqueConstraint("platform", "project_id", name="uq_project_hooks_platform_project"),
+        )
+
+
+def downgrade() -> None:
+    op.drop_table("project_hooks")
+    op.drop_index("ix_subscriptions_platform_project_active", table_name="subscriptions")
+    op.drop_index("ix_notifications_user_thread", table_name="notifications")
+    with op.batch_alter_table("notifications") as batch_op:
+        batch_op.drop_column("thread_key")
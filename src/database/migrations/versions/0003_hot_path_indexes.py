@@ -0,0 +1,44 @@
+"""Индексы горячих запросов и уникальность подписки
+
+- notifications (user_id, sent_at): последние уведомления пользователя в /history
+- subscriptions (user_id, platform, project_id): уникальность подписки, индекс
+  также обслуживает выборку подписок пользователя
+
+notification_settings.user_id уже уникален (и проиндексирован) с исходной схемы.
+Перед созданием ограничения удаляются дубли подписок, остается последняя.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_notifications_user_sent_at", "notifications", ["user_id", "sent_at"])
+
+    op.execute(
+        """
+        DELETE FROM subscriptions
+        WHERE id NOT IN (
+            SELECT MAX(id) FROM subscriptions GROUP BY user_id, platform, project_id
+        )
+        """
+    )
+    with op.batch_alter_table("subscriptions") as batch_op:
+        batch_op.create_unique_constraint(
+            "uq_subscriptions_user_platform_project", ["user_id", "platform", "project_id"]
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("subscriptions") as batch_op:
+        batch_op.drop_constraint("uq_subscriptions_user_platform_project", type_="unique")
+    op.drop_index("ix_notifications_user_sent_at", table_name="notifications")
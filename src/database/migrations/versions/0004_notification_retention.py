@@ -0,0 +1,21 @@
+"""Индекс по времени отправки для удаления старых уведомлений
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_notifications_sent_at", "notifications", ["sent_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_notifications_sent_at", table_name="notifications")
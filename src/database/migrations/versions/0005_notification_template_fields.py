@@ -0,0 +1,56 @@
+"""Поля шаблона уведомления вместо готового HTML
+
+Новые уведомления хранят ID шаблона, номер объекта, заголовок, ссылку,
+статус и компактный payload; message остается только у старых строк.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("notifications") as batch_op:
+        batch_op.alter_column("message", existing_type=sa.Text(), nullable=True)
+        batch_op.add_column(sa.Column("template", sa.String(50), nullable=True))
+        batch_op.add_column(sa.Column("object_iid", sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column("title", sa.String(500), nullable=True))
+        batch_op.add_column(sa.Column("url", sa.String(1000), nullable=True))
+        batch_op.add_column(sa.Column("status", sa.String(50), nullable=True))
+        batch_op.add_column(sa.Column("payload", sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    # Строкам без готового HTML нужен message: собираем его из полей шаблона
+    from src.webhook.templates import render
+
+    bind = op.get_bind()
+    rows = bind.execute(sa.text(
+        "SELECT id, template, project_name, title, url, status, object_iid, payload "
+        "FROM notifications WHERE message IS NULL AND template IS NOT NULL"
+    )).all()
+    for row in rows:
+        bind.execute(
+            sa.text("UPDATE notifications SET message = :message WHERE id = :id"),
+            {"id": row.id, "message": render(
+                row.template, row.project_name, row.title, row.url, row.status, row.object_iid, row.payload
+            )},
+        )
+    bind.execute(sa.text("UPDATE notifications SET message = '' WHERE message IS NULL"))
+
+    with op.batch_alter_table("notifications") as batch_op:
+        batch_op.drop_column("payload")
+        batch_op.drop_column("status")
+        batch_op.drop_column("url")
+        batch_op.drop_column("title")
+        batch_op.drop_column("object_iid")
+        batch_op.drop_column("template")
+        batch_op.alter_column("message", existing_type=sa.Text(), nullable=False)
@@ -5,7 +5,7 @@
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import String, Integer, BigInteger, Boolean, DateTime, Text, ForeignKey
+from sqlalchemy import String, Integer, BigInteger, Boolean, DateTime, Text, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
 
@@ -39,12 +39,13 @@ class User(Base):
         DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False
     )
 
-    # Связи
+    # Связи не загружаются вместе с User: нужные загружаются явно через options(selectinload(...)),
+    # история уведомлений читается отдельным запросом (/history)
     subscriptions: Mapped[list["Subscription"]] = relationship(
-        "Subscription", back_populates="user", cascade="all, delete-orphan", lazy="selectin"
+        "Subscription", back_populates="user", cascade="all, delete-orphan", lazy="raise"
     )
     notifications: Mapped[list["Notification"]] = relationship(
-        "Notification", back_populates="user", cascade="all, delete-orphan", lazy="selectin"
+        "Notification", back_populates="user", cascade="all, delete-orphan", lazy="raise"
     )
 
 
@@ -52,6 +53,12 @@ class Subscription(Base):
     """Модель подписки на события в репозиториях"""
 
     __tablename__ = "subscriptions"
+    __table_args__ = (
+        # Поиск подписчиков проекта при обработке каждого webhook
+        Index("ix_subscriptions_platform_project_active", "platform", "project_id", "is_active"),
+        # Одна подписка пользователя на проект; индекс также обслуживает выборку подписок пользователя
+        UniqueConstraint("user_id", "platform", "project_id", name="uq_subscriptions_user_platform_project"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     user_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("users.telegram_id"), nullable=False)
@@ -72,13 +79,46 @@ class Subscription(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
 
     # Связи
-    user: Mapped["User"] = relationship("User", back_populates="subscriptions", lazy="selectin")
+    user: Mapped["User"] = relationship("User", back_populates="subscriptions", lazy="raise")
+
+
+class ProjectHook(Base):
+    """Общий webhook проекта для всех подписчиков"""
+
+    __tablename__ = "project_hooks"
+    __table_args__ = (
+        UniqueConstraint("platform", "project_id", name="uq_project_hooks_platform_project"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    platform: Mapped[str] = mapped_column(String(50), nullable=False)
+    project_id: Mapped[str] = mapped_column(String(255), nullable=False)
+
+    # ID webhook в GitLab/GitHub (None, пока webhook не создан)
+    hook_id: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    # Объединение типов событий активных подписок, на которые настроен webhook
+    event_types: Mapped[str] = mapped_column(Text, default="", nullable=False)
+    # Количество активных подписок на проект
+    ref_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False
+    )
 
 
 class Notification(Base):
     """Модель истории уведомлений"""
 
     __tablename__ = "notifications"
+    __table_args__ = (
+        # Поиск родительского сообщения для ответа в треде
+        Index("ix_notifications_user_thread", "user_id", "thread_key"),
+        # Последние уведомления пользователя (/history)
+        Index("ix_notifications_user_sent_at", "user_id", "sent_at"),
+        # Пакетное удаление старых уведомлений (src/database/retention.py)
+        Index("ix_notifications_sent_at", "sent_at"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     user_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("users.telegram_id"), nullable=False)
@@ -87,17 +127,29 @@ class Notification(Base):
     event_type: Mapped[str] = mapped_column(String(100), nullable=False)
     project_name: Mapped[str] = mapped_column(String(500), nullable=False)
 
-    message: Mapped[str] = mapped_column(Text, nullable=False)
+    # Готовый HTML: только у старых строк и уведомлений без шаблона
+    message: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
+    # Поля шаблона (src/webhook/templates.py), HTML собирается при просмотре
+    template: Mapped[Optional[str]] = mapped_column(String(50), nullable=True)
+    object_iid: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    title: Mapped[Optional[str]] = mapped_column(String(500), nullable=True)
+    url: Mapped[Optional[str]] = mapped_column(String(1000), nullable=True)
+    status: Mapped[Optional[str]] = mapped_column(String(50), nullable=True)
+    # Остальные поля шаблона: JSON массив без ключей
+    payload: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
 
     # ID сообщения и уведомения родительского
     telegram_message_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
     parent_notification_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("notifications.id"),
                                                                   nullable=True)
+    # Ключ треда "<platform>:<project_id>:<kind>:<iid>" (одно MR/PR/Issue)
+    thread_key: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
     # Дополнительные данные в JSON
     meta_data: Mapped[Optional[str]] = mapped_column("meta_data", Text, nullable=True)
 
     sent_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
 
     # Связи
-    user: Mapped["User"] = relationship("User", back_populates="notifications", lazy="selectin")
+    user: Mapped["User"] = relationship("User", back_populates="notifications", lazy="raise")
     parent: Mapped[Optional["Notification"]] = relationship("Notification", remote_side=[id], backref="replies")
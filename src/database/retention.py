@@ -0,0 +1,293 @@
+"""
+Ограничение истории уведомлений
+
+Удаляются уведомления старше max_age_days и все, кроме последних
+max_per_user, у каждого пользователя. Удаление идет пакетами по batch_size
+строк: каждый пакет - отдельная короткая транзакция, между пакетами пауза,
+поэтому запись истории из notifier не ждет долго блокировку.
+
+Перед удалением строки можно сохранить в архив: JSONL по дням отправки,
+<archive_dir>/YYYY/MM/notifications-YYYY-MM-DD.jsonl.zst (zstandard, если
+установлен, иначе .jsonl.gz). Каждый пакет дописывается отдельным кадром
+сжатия, zstd и gzip читают такие файлы целиком.
+
+Запуск вручную:
+    python -m src.database.retention
+"""
+
+import asyncio
+import gzip
+import json
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from loguru import logger
+from sqlalchemy import delete, func, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.config import settings
+from src.database.database import AsyncSessionLocal
+from src.database.models import Notification
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - зависит от окружения
+    zstandard = None
+
+notifications = Notification.__table__
+
+# Оценка объема строки: текстовые поля, остальное считается фиксированным
+ROW_OVERHEAD = 64
+_row_bytes = (
+    func.coalesce(func.length(Notification.message), 0)
+    + func.coalesce(func.length(Notification.meta_data), 0)
+    + func.coalesce(func.length(Notification.template), 0)
+    + func.coalesce(func.length(Notification.title), 0)
+    + func.coalesce(func.length(Notification.url), 0)
+    + func.coalesce(func.length(Notification.status), 0)
+    + func.coalesce(func.length(Notification.payload), 0)
+    + func.coalesce(func.length(Notification.thread_key), 0)
+    + func.length(Notification.project_name)
+    + func.length(Notification.event_type)
+    + ROW_OVERHEAD
+)
+
+
+@dataclass
+class RetentionReport:
+    """Итог очистки истории"""
+    deleted_by_age: int = 0
+    deleted_by_cap: int = 0
+    archived: int = 0
+    batches: int = 0
+    # Оценка объема удаленных строк
+    row_bytes: int = 0
+    # Объем записанного архива (после сжатия)
+    archive_bytes: int = 0
+    # SQLite: прирост свободных страниц файла БД
+    freed_bytes: int = 0
+    duration: float = 0.0
+
+    @property
+    def deleted(self) -> int:
+        return self.deleted_by_age + self.deleted_by_cap
+
+    def format(self) -> str:
+        return (
+            f"Удалено уведомлений: {self.deleted} (по возрасту {self.deleted_by_age}, "
+            f"сверх лимита {self.deleted_by_cap}) за {self.batches} пакетов, {self.duration:.2f}с; "
+            f"освобождено ~{self.row_bytes} байт строк, {self.freed_bytes} байт страниц SQLite; "
+            f"в архив: {self.archived} строк, {self.archive_bytes} байт"
+        )
+
+
+class NotificationArchive:
+    """Запись удаляемых уведомлений в сжатые JSONL файлы по дням"""
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self.extension = ".jsonl.zst" if zstandard is not None else ".jsonl.gz"
+
+    def path_for(self, day: str) -> Path:
+        year, month, _ = day.split("-")
+        return self.directory / year / month / f"notifications-{day}{self.extension}"
+
+    def _compress(self, data: bytes) -> bytes:
+        if zstandard is not None:
+            return zstandard.ZstdCompressor(level=10).compress(data)
+        return gzip.compress(data, compresslevel=6)
+
+    def write(self, rows: Sequence[Dict[str, Any]]) -> int:
+        """Дописывание строк в файлы их дней; возвращает число записанных байт"""
+        by_day: Dict[str, List[bytes]] = defaultdict(list)
+        for row in rows:
+            record = {
+                key: value.isoformat() if isinstance(value, datetime) else value
+                for key, value in row.items()
+            }
+            by_day[record["sent_at"][:10]].append(json.dumps(record, ensure_ascii=False).encode())
+
+        written = 0
+        for day, lines in by_day.items():
+            path = self.path_for(day)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            frame = self._compress(b"\n".join(lines) + b"\n")
+            with open(path, "ab") as file:
+                file.write(frame)
+            written += len(frame)
+        return written
+
+
+class NotificationRetention:
+    """Пакетное удаление (и архивирование) старой истории уведомлений"""
+
+    def __init__(
+            self,
+            session_factory: async_sessionmaker = AsyncSessionLocal,
+            max_age_days: Optional[int] = None,
+            max_per_user: Optional[int] = None,
+            batch_size: Optional[int] = None,
+            batch_pause: Optional[float] = None,
+            archive_dir: Optional[str] = None
+    ):
+        """
+        Args:
+            session_factory: Фабрика сессий БД
+            max_age_days: Максимальный возраст уведомления (дней), 0 - без ограничения
+            max_per_user: Максимум уведомлений на пользователя, 0 - без ограничения
+            batch_size: Строк в одной транзакции удаления
+            batch_pause: Пауза между пакетами (сек)
+            archive_dir: Каталог архива, пустая строка - без архива
+        """
+        self.session_factory = session_factory
+        self.max_age_days = settings.notification_retention_max_age_days if max_age_days is None else max_age_days
+        self.max_per_user = settings.notification_retention_max_per_user if max_per_user is None else max_per_user
+        self.batch_size = batch_size or settings.notification_retention_batch_size
+        self.batch_pause = settings.notification_retention_batch_pause if batch_pause is None else batch_pause
+        archive_dir = settings.notification_archive_dir if archive_dir is None else archive_dir
+        self.archive = NotificationArchive(archive_dir) if archive_dir else None
+
+        self._task: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.last_report: Optional[RetentionReport] = None
+
+    async def run_once(self) -> RetentionReport:
+        """Один проход очистки"""
+        report = RetentionReport()
+        started = time.perf_counter()
+        free_before = await self._sqlite_free_bytes()
+
+        if self.max_age_days > 0:
+            cutoff = datetime.utcnow() - timedelta(days=self.max_age_days)
+            query = (
+                select(Notification.id)
+                .where(Notification.sent_at < cutoff)
+                .order_by(Notification.sent_at)
+                .limit(self.batch_size)
+            )
+            report.deleted_by_age = await self._delete_batches(query, report)
+
+        if self.max_per_user > 0:
+            async with self.session_factory() as session:
+                result = await session.execute(
+                    select(Notification.user_id)
+                    .group_by(Notification.user_id)
+                    .having(func.count() > self.max_per_user)
+                )
+                user_ids = result.scalars().all()
+
+            for user_id in user_ids:
+                # Все, кроме последних max_per_user, по индексу (user_id, sent_at)
+                query = (
+                    select(Notification.id)
+                    .where(Notification.user_id == user_id)
+                    .order_by(Notification.sent_at.desc(), Notification.id.desc())
+                    .offset(self.max_per_user)
+                    .limit(self.batch_size)
+                )
+                report.deleted_by_cap += await self._delete_batches(query, report)
+
+        free_after = await self._sqlite_free_bytes()
+        if free_before is not None and free_after is not None:
+            report.freed_bytes = max(0, free_after - free_before)
+        report.duration = time.perf_counter() - started
+
+        self.runs += 1
+        self.last_report = report
+        if report.deleted:
+            logger.info(report.format())
+        return report
+
+    async def _delete_batches(self, ids_query, report: RetentionReport) -> int:
+        """Удаление пакетами, пока запрос возвращает ID"""
+        deleted = 0
+        while True:
+            async with self.session_factory() as session:
+                ids = (await session.execute(ids_query)).scalars().all()
+                if not ids:
+                    return deleted
+
+                if self.archive:
+                    rows = (await session.execute(
+                        select(notifications).where(notifications.c.id.in_(ids))
+                    )).mappings().all()
+                    report.archive_bytes += await asyncio.to_thread(self.archive.write, [dict(row) for row in rows])
+                    report.archived += len(rows)
+
+                report.row_bytes += (await session.execute(
+                    select(func.coalesce(func.sum(_row_bytes), 0)).where(Notification.id.in_(ids))
+                )).scalar_one()
+                # Ответы в треде ссылаются на удаляемые уведомления
+                await session.execute(
+                    update(Notification)
+                    .where(Notification.parent_notification_id.in_(ids))
+                    .values(parent_notification_id=None)
+                )
+                await session.execute(delete(Notification).where(Notification.id.in_(ids)))
+                await session.commit()
+
+            deleted += len(ids)
+            report.batches += 1
+            if len(ids) < self.batch_size:
+                return deleted
+            await asyncio.sleep(self.batch_pause)
+
+    async def _sqlite_free_bytes(self) -> Optional[int]:
+        async with self.session_factory() as session:
+            if session.bind.dialect.name != "sqlite":
+                return None
+            return await self._pragma(session, "freelist_count") * await self._pragma(session, "page_size")
+
+    @staticmethod
+    async def _pragma(session: AsyncSession, name: str) -> int:
+        return (await session.execute(text(f"PRAGMA {name}"))).scalar_one()
+
+    async def _loop(self, interval: float) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Ошибка очистки истории уведомлений: {e}")
+            await asyncio.sleep(interval)
+
+    def start(self, interval: float) -> None:
+        """Запуск периодической очистки (interval <= 0 - не запускать)"""
+        if interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._loop(interval), name="notification-retention")
+
+    async def stop(self) -> None:
+        """Остановка периодической очистки"""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        report = self.last_report
+        return {
+            "runs": self.runs,
+            "last_deleted": report.deleted if report else 0,
+            "last_row_bytes": report.row_bytes if report else 0,
+            "last_duration": round(report.duration, 3) if report else 0.0,
+        }
+
+
+notification_retention = NotificationRetention()
+
+
+async def _main() -> None:
+    from src.database.database import dispose_db
+
+    try:
+        report = await notification_retention.run_once()
+    finally:
+        await dispose_db()
+    print(report.format())
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -2,40 +2,42 @@
 Клиент для работы с GitHub API
 """
 
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, AsyncIterator, Mapping, Tuple
 from loguru import logger
 
 import aiohttp
 from aiohttp import ClientSession
 
+from src.http_client import Priority, get_http_session, rate_limiter, response_cache, iter_offset_pages
+
 
 class GitHubClient:
 
-    def __init__(self, token: str):
+    def __init__(self, token: str, priority: Priority = Priority.DEFAULT):
         """
         Args:
             token: Personal Access Token для аутентификации
+            priority: Приоритет запросов клиента в планировщике лимитов
         """
         self.api_url = "https://api.github.com"
         self.token = token
+        self.priority = priority
+        self.headers = {
+            "Authorization": f"token {self.token}",
+            "Accept": "application/vnd.github.v3+json",
+            "Content-Type": "application/json"
+        }
         self.session: Optional[ClientSession] = None
 
     # Контекстные менеджеры
     async def __aenter__(self):
-        """Вход"""
-        self.session = aiohttp.ClientSession(
-            headers={
-                "Authorization": f"token {self.token}",
-                "Accept": "application/vnd.github.v3+json",
-                "Content-Type": "application/json"
-            }
-        )
+        """Вход: общая сессия с пулом соединений к api.github.com"""
+        self.session = get_http_session(self.api_url)
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        """Выход"""
-        if self.session:
-            await self.session.close()
+        """Выход: общая сессия не закрывается"""
+        self.session = None
 
     async def _request(
             self,
@@ -58,27 +60,72 @@ class GitHubClient:
         Raises:
             aiohttp.ClientError: При ошибке запроса
         """
+        data, _ = await self._request_with_headers(method, endpoint, params=params, json_data=json_data)
+        return data
+
+    async def _request_with_headers(
+            self,
+            method: str,
+            endpoint: str,
+            params: Optional[Dict[str, Any]] = None,
+            json_data: Optional[Dict[str, Any]] = None
+    ) -> Tuple[Any, Mapping[str, str]]:
+        """
+        HTTP запрос с заголовками ответа (нужны для пагинации по Link)
+
+        Args:
+            endpoint: Endpoint API или полный URL (ссылки из заголовка Link)
+
+        Returns:
+            (ответ от API, заголовки ответа)
+        """
         if not self.session:
             raise RuntimeError("Session not initialized. Use async with context manager.")
 
-        url = f"{self.api_url}/{endpoint.lstrip('/')}"
+        if endpoint.startswith(("http://", "https://")):
+            url = endpoint
+        else:
+            url = f"{self.api_url}/{endpoint.lstrip('/')}"
+
+        # GET запросы проверяются условно по ETag / Last-Modified из кэша
+        cache_key = None
+        request_headers = self.headers
+        if method == "GET" and response_cache.enabled:
+            cache_key = response_cache.make_key(self.token, url, params)
+            request_headers = {**self.headers, **response_cache.conditional_headers(cache_key)}
 
         try:
-            async with self.session.request(
-                    method=method,
-                    url=url,
+            async with rate_limiter.request(
+                    self.session,
+                    method,
+                    url,
+                    token=self.token,
+                    priority=self.priority,
                     params=params,
-                    json=json_data
+                    json=json_data,
+                    headers=request_headers
             ) as response:
-                response.raise_for_status()
-                if response.status == 204:
-                    return None
-
-                return await response.json()
+                if cache_key and response.status == 304:
+                    cached = response_cache.revalidated(cache_key)
+                    if cached is not None:
+                        return cached
+                else:
+                    response.raise_for_status()
+                    if response.status == 204:
+                        return None, response.headers
+
+                    if cache_key:
+                        return response_cache.store(cache_key, await response.read(), response.headers)
+                    return await response.json(), response.headers
         except aiohttp.ClientError as e:
             logger.error(f"GitHub API request failed: {method} {url} - {e}")
             raise
 
+        # 304, но запись вытеснена между запросом и ответом: повтор без условий.
+        # Только после выхода из контекста - иначе повтор ждет второй слот токена,
+        # удерживая первый
+        return await self._request_with_headers(method, endpoint, params=params)
+
     async def get_current_user(self) -> Dict[str, Any]:
         """
         Информация о текущем пользователе
@@ -114,6 +161,66 @@ class GitHubClient:
 
         return await self._request("GET", "/user/repos", params=params)
 
+    async def iter_repositories(
+            self,
+            visibility: str = "all",
+            affiliation: str = "owner,collaborator,organization_member",
+            sort: str = "updated",
+            per_page: int = 100,
+            max_pages: int = 20,
+            concurrency: int = 4
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Репозитории постранично, первая страница отдаётся сразу
+
+        Номер последней страницы берётся из ссылки rel="last", после чего
+        остальные страницы загружаются параллельно.
+
+        Args:
+            per_page: Количество репозиториев на странице (максимум 100)
+            max_pages: Максимум загружаемых страниц
+            concurrency: Сколько страниц загружать одновременно
+
+        Yields:
+            Списки репозиториев по страницам
+        """
+        params = {
+            "visibility": visibility,
+            "affiliation": affiliation,
+            "sort": sort,
+            "per_page": per_page
+        }
+
+        async def fetch(page: int):
+            return await self._request_with_headers("GET", "/user/repos", params={**params, "page": page})
+
+        async for repos in iter_offset_pages(fetch, concurrency=concurrency, max_pages=max_pages):
+            yield repos
+
+    async def search_repositories(
+            self,
+            query: str,
+            owner: Optional[str] = None,
+            per_page: int = 20
+    ) -> List[Dict[str, Any]]:
+        """
+        Поиск репозиториев по имени
+
+        Args:
+            query: Часть имени репозитория
+            owner: Ограничить поиск репозиториями пользователя или организации
+            per_page: Количество результатов
+
+        Returns:
+            Список репозиториев
+        """
+        q = f"{query} in:name fork:true"
+        if owner:
+            q += f" user:{owner}"
+
+        result = await self._request("GET", "/search/repositories", params={"q": q, "per_page": per_page})
+        return result.get("items", [])
+
     async def get_repository(self, owner: str, repo: str) -> Dict[str, Any]:
         """
         Args:
@@ -174,6 +281,37 @@ class GitHubClient:
 
         return await self._request("POST", f"/repos/{owner}/{repo}/hooks", json_data=data)
 
+    async def update_repository_hook(
+            self,
+            owner: str,
+            repo: str,
+            hook_id: int,
+            events: List[str],
+            url: Optional[str] = None,
+            secret: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Изменение событий (и при необходимости URL) webhook репозитория
+
+        Args:
+            owner: Владелец репозитория
+            repo: Название репозитория
+            hook_id: ID webhook
+            events: Список событий
+            url: Новый URL для отправки webhook
+            secret: Секретный токен для webhook
+
+        Returns:
+            Информация о webhook
+        """
+        data: Dict[str, Any] = {"events": events, "active": True}
+        if url:
+            data["config"] = {"url": url, "content_type": "json", "insecure_ssl": "0"}
+            if secret:
+                data["config"]["secret"] = secret
+
+        return await self._request("PATCH", f"/repos/{owner}/{repo}/hooks/{hook_id}", json_data=data)
+
     async def delete_repository_hook(self, owner: str, repo: str, hook_id: int) -> None:
         """
         Удаление webhook репозитория
@@ -3,15 +3,23 @@
 """
 
 from typing import Dict, Any, Optional, List
-import aiohttp
 from loguru import logger
 
+from src.http_client import Priority, get_http_session, rate_limiter
+
 
 class GitLabActions:
+    """Действия с MR и pipeline через общую HTTP сессию"""
 
-    def __init__(self, token: str, base_url: str = "https://gitlab.com/api/v4"):
+    def __init__(
+            self,
+            token: str,
+            base_url: str = "https://gitlab.com/api/v4",
+            priority: Priority = Priority.INTERACTIVE
+    ):
         self.token = token
         self.base_url = base_url
+        self.priority = priority
         self.headers = {"PRIVATE-TOKEN": token}
 
     async def approve_merge_request(self, project_id: str, mr_iid: int) -> Dict[str, Any]:
@@ -25,14 +33,17 @@ class GitLabActions:
         """
         url = f"{self.base_url}/projects/{project_id}/merge_requests/{mr_iid}/approve"
 
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, headers=self.headers) as response:
-                if response.status == 201:
-                    return await response.json()
-                else:
-                    error_text = await response.text()
-                    logger.error(f"Failed to approve MR: {error_text}")
-                    raise Exception(f"Failed to approve MR: {error_text}")
+        session = get_http_session(self.base_url)
+        async with rate_limiter.request(
+                session, "POST", url, token=self.token, priority=self.priority,
+                headers=self.headers
+        ) as response:
+            if response.status == 201:
+                return await response.json()
+            else:
+                error_text = await response.text()
+                logger.error(f"Failed to approve MR: {error_text}")
+                raise Exception(f"Failed to approve MR: {error_text}")
 
     async def merge_merge_request(
             self,
@@ -60,14 +71,17 @@ class GitLabActions:
         if merge_commit_message:
             data["merge_commit_message"] = merge_commit_message
 
-        async with aiohttp.ClientSession() as session:
-            async with session.put(url, headers=self.headers, json=data) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    error_text = await response.text()
-                    logger.error(f"Failed to merge MR: {error_text}")
-                    raise Exception(f"Failed to merge MR: {error_text}")
+        session = get_http_session(self.base_url)
+        async with rate_limiter.request(
+                session, "PUT", url, token=self.token, priority=self.priority,
+                headers=self.headers, json=data
+        ) as response:
+            if response.status == 200:
+                return await response.json()
+            else:
+                error_text = await response.text()
+                logger.error(f"Failed to merge MR: {error_text}")
+                raise Exception(f"Failed to merge MR: {error_text}")
 
     async def get_merge_request(self, project_id: str, mr_iid: int) -> Dict[str, Any]:
         """
@@ -80,14 +94,17 @@ class GitLabActions:
         """
         url = f"{self.base_url}/projects/{project_id}/merge_requests/{mr_iid}"
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, headers=self.headers) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    error_text = await response.text()
-                    logger.error(f"Failed to get MR: {error_text}")
-                    raise Exception(f"Failed to get MR: {error_text}")
+        session = get_http_session(self.base_url)
+        async with rate_limiter.request(
+                session, "GET", url, token=self.token, priority=self.priority,
+                headers=self.headers
+        ) as response:
+            if response.status == 200:
+                return await response.json()
+            else:
+                error_text = await response.text()
+                logger.error(f"Failed to get MR: {error_text}")
+                raise Exception(f"Failed to get MR: {error_text}")
 
     async def get_merge_request_pipelines(self, project_id: str, mr_iid: int) -> List[Dict[str, Any]]:
         """
@@ -100,14 +117,17 @@ class GitLabActions:
         """
         url = f"{self.base_url}/projects/{project_id}/merge_requests/{mr_iid}/pipelines"
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, headers=self.headers) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    error_text = await response.text()
-                    logger.error(f"Failed to get MR pipelines: {error_text}")
-                    return []
+        session = get_http_session(self.base_url)
+        async with rate_limiter.request(
+                session, "GET", url, token=self.token, priority=self.priority,
+                headers=self.headers
+        ) as response:
+            if response.status == 200:
+                return await response.json()
+            else:
+                error_text = await response.text()
+                logger.error(f"Failed to get MR pipelines: {error_text}")
+                return []
 
     async def retry_pipeline(self, project_id: str, pipeline_id: int) -> Dict[str, Any]:
         """
@@ -120,14 +140,17 @@ class GitLabActions:
         """
         url = f"{self.base_url}/projects/{project_id}/pipelines/{pipeline_id}/retry"
 
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, headers=self.headers) as response:
-                if response.status == 201:
-                    return await response.json()
-                else:
-                    error_text = await response.text()
-                    logger.error(f"Failed to retry pipeline: {error_text}")
-                    raise Exception(f"Failed to retry pipeline: {error_text}")
+        session = get_http_session(self.base_url)
+        async with rate_limiter.request(
+                session, "POST", url, token=self.token, priority=self.priority,
+                headers=self.headers
+        ) as response:
+            if response.status == 201:
+                return await response.json()
+            else:
+                error_text = await response.text()
+                logger.error(f"Failed to retry pipeline: {error_text}")
+                raise Exception(f"Failed to retry pipeline: {error_text}")
 
     async def assign_reviewer(
             self,
@@ -150,14 +173,17 @@ class GitLabActions:
             "reviewer_ids": reviewer_ids
         }
 
-        async with aiohttp.ClientSession() as session:
-            async with session.put(url, headers=self.headers, json=data) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    error_text = await response.text()
-                    logger.error(f"Failed to assign reviewers: {error_text}")
-                    raise Exception(f"Failed to assign reviewers: {error_text}")
+        session = get_http_session(self.base_url)
+        async with rate_limiter.request(
+                session, "PUT", url, token=self.token, priority=self.priority,
+                headers=self.headers, json=data
+        ) as response:
+            if response.status == 200:
+                return await response.json()
+            else:
+                error_text = await response.text()
+                logger.error(f"Failed to assign reviewers: {error_text}")
+                raise Exception(f"Failed to assign reviewers: {error_text}")
 
     async def get_project_members(self, project_id: str) -> List[Dict[str, Any]]:
         """
@@ -169,11 +195,14 @@ class GitLabActions:
         """
         url = f"{self.base_url}/projects/{project_id}/members"
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, headers=self.headers) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    error_text = await response.text()
-                    logger.error(f"Failed to get project members: {error_text}")
-                    return []
+        session = get_http_session(self.base_url)
+        async with rate_limiter.request(
+                session, "GET", url, token=self.token, priority=self.priority,
+                headers=self.headers
+        ) as response:
+            if response.status == 200:
+                return await response.json()
+            else:
+                error_text = await response.text()
+                logger.error(f"Failed to get project members: {error_text}")
+                return []
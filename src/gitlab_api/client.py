@@ -2,41 +2,44 @@
 Клиент для работы с GitLab API
 """
 
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, AsyncIterator, Mapping, Tuple
 from loguru import logger
 
 import aiohttp
 from aiohttp import ClientSession
+from yarl import URL
+
+from src.http_client import Priority, get_http_session, rate_limiter, response_cache, iter_offset_pages, iter_keyset_pages
 
 
 class GitLabClient:
 
-    def __init__(self, gitlab_url: str, private_token: str):
+    def __init__(self, gitlab_url: str, private_token: str, priority: Priority = Priority.DEFAULT):
         """
         Args:
             gitlab_url: URL GitLab инстанса (например, https://gitlab.com)
             private_token: Personal Access Token для аутентификации
+            priority: Приоритет запросов клиента в планировщике лимитов
         """
         self.gitlab_url = gitlab_url.rstrip('/')
         self.api_url = f"{self.gitlab_url}/api/v4"
         self.private_token = private_token
+        self.priority = priority
+        self.headers = {
+            "PRIVATE-TOKEN": self.private_token,
+            "Content-Type": "application/json"
+        }
         self.session: Optional[ClientSession] = None
 
     # Контекстный менеджеры
     async def __aenter__(self):
-        """Вход"""
-        self.session = aiohttp.ClientSession(
-            headers={
-                "PRIVATE-TOKEN": self.private_token,
-                "Content-Type": "application/json"
-            }
-        )
+        """Вход: общая сессия с пулом соединений к хосту GitLab"""
+        self.session = get_http_session(self.api_url)
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        """Выход"""
-        if self.session:
-            await self.session.close()
+        """Выход: общая сессия не закрывается"""
+        self.session = None
 
     async def _request(
             self,
@@ -60,24 +63,72 @@ class GitLabClient:
         Raises:
             aiohttp.ClientError: При ошибке запроса
         """
+        data, _ = await self._request_with_headers(method, endpoint, params=params, json_data=json_data)
+        return data
+
+    async def _request_with_headers(
+            self,
+            method: str,
+            endpoint: str,
+            params: Optional[Dict[str, Any]] = None,
+            json_data: Optional[Dict[str, Any]] = None
+    ) -> Tuple[Any, Mapping[str, str]]:
+        """
+        HTTP запрос с заголовками ответа (нужны для пагинации)
+
+        Args:
+            endpoint: Endpoint API или полный URL (ссылки из заголовка Link)
+
+        Returns:
+            (ответ от API, заголовки ответа)
+        """
         if not self.session:
             raise RuntimeError("Session not initialized. Use async with context manager.")
 
-        url = f"{self.api_url}/{endpoint.lstrip('/')}"
+        if endpoint.startswith(("http://", "https://")):
+            url = endpoint
+        else:
+            url = f"{self.api_url}/{endpoint.lstrip('/')}"
+
+        # GET запросы проверяются условно по ETag / Last-Modified из кэша
+        cache_key = None
+        request_headers = self.headers
+        if method == "GET" and response_cache.enabled:
+            cache_key = response_cache.make_key(self.private_token, url, params)
+            request_headers = {**self.headers, **response_cache.conditional_headers(cache_key)}
 
         try:
-            async with self.session.request(
-                    method=method,
-                    url=url,
+            async with rate_limiter.request(
+                    self.session,
+                    method,
+                    url,
+                    token=self.private_token,
+                    priority=self.priority,
                     params=params,
-                    json=json_data
+                    json=json_data,
+                    headers=request_headers
             ) as response:
-                response.raise_for_status()
-                return await response.json()
+                if cache_key and response.status == 304:
+                    cached = response_cache.revalidated(cache_key)
+                    if cached is not None:
+                        return cached
+                else:
+                    response.raise_for_status()
+                    if response.status == 204:
+                        return None, response.headers
+
+                    if cache_key:
+                        return response_cache.store(cache_key, await response.read(), response.headers)
+                    return await response.json(), response.headers
         except aiohttp.ClientError as e:
             logger.error(f"GitLab API request failed: {method} {url} - {e}")
             raise
 
+        # 304, но запись вытеснена между запросом и ответом: повтор без условий.
+        # Только после выхода из контекста - иначе повтор ждет второй слот токена,
+        # удерживая первый
+        return await self._request_with_headers(method, endpoint, params=params)
+
     async def get_current_user(self) -> Dict[str, Any]:
         """
         Информация о текущем пользователе
@@ -112,6 +163,81 @@ class GitLabClient:
 
         return await self._request("GET", "/projects", params=params)
 
+    async def iter_projects(
+            self,
+            owned: bool = True,
+            membership: bool = True,
+            per_page: int = 100,
+            keyset: bool = False,
+            max_pages: int = 20,
+            concurrency: int = 4
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Проекты постранично, первая страница отдаётся сразу
+
+        В offset-режиме остальные страницы загружаются параллельно, если GitLab
+        вернул X-Total-Pages, иначе последовательно по X-Next-Page. В keyset-режиме
+        (pagination=keyset, сортировка по id) страницы идут по ссылке rel="next":
+        так GitLab не считает общее число проектов и не сканирует большие смещения.
+
+        Args:
+            owned: Только проекты, которыми владеет пользователь
+            membership: Проекты, в которых пользователь является участником
+            per_page: Количество проектов на странице (максимум 100)
+            keyset: Использовать keyset-пагинацию
+            max_pages: Максимум загружаемых страниц
+            concurrency: Сколько страниц загружать одновременно
+
+        Yields:
+            Списки проектов по страницам
+        """
+        params = {
+            "owned": str(owned).lower(),
+            "membership": str(membership).lower(),
+            "per_page": per_page
+        }
+
+        if keyset:
+            params.update({"pagination": "keyset", "order_by": "id", "sort": "desc"})
+            first_url = str(URL(f"{self.api_url}/projects").with_query(params))
+
+            async def fetch_url(url: str):
+                return await self._request_with_headers("GET", url)
+
+            async for projects in iter_keyset_pages(fetch_url, first_url, max_pages=max_pages):
+                yield projects
+            return
+
+        params.update({"order_by": "last_activity_at", "sort": "desc"})
+
+        async def fetch(page: int):
+            return await self._request_with_headers("GET", "/projects", params={**params, "page": page})
+
+        async for projects in iter_offset_pages(fetch, concurrency=concurrency, max_pages=max_pages):
+            yield projects
+
+    async def search_projects(self, query: str, per_page: int = 20) -> List[Dict[str, Any]]:
+        """
+        Поиск среди проектов, доступных пользователю
+
+        Args:
+            query: Часть имени или пути проекта
+            per_page: Количество результатов
+
+        Returns:
+            Список проектов
+        """
+        params = {
+            "search": query,
+            "membership": "true",
+            "simple": "true",
+            "per_page": per_page,
+            "order_by": "last_activity_at",
+            "sort": "desc"
+        }
+
+        return await self._request("GET", "/projects", params=params)
+
     async def get_project(self, project_id: str) -> Dict[str, Any]:
         """
         Args:
@@ -149,6 +275,7 @@ class GitLabClient:
             wiki_page_events: bool = True,
             pipeline_events: bool = True,
             job_events: bool = False,
+            note_events: bool = False,
             token: Optional[str] = None
     ) -> Dict[str, Any]:
         """
@@ -163,6 +290,7 @@ class GitLabClient:
             wiki_page_events: События wiki
             pipeline_events: События pipeline
             job_events: События jobs
+            note_events: События комментариев
             token: Секретный токен для webhook
 
         Returns:
@@ -179,6 +307,7 @@ class GitLabClient:
             "wiki_page_events": wiki_page_events,
             "pipeline_events": pipeline_events,
             "job_events": job_events,
+            "note_events": note_events,
         }
 
         if token:
@@ -186,6 +315,36 @@ class GitLabClient:
 
         return await self._request("POST", f"/projects/{encoded_id}/hooks", json_data=data)
 
+    async def update_project_hook(
+            self,
+            project_id: str,
+            hook_id: int,
+            url: str,
+            token: Optional[str] = None,
+            **events: bool
+    ) -> Dict[str, Any]:
+        """
+        Изменение URL и событий webhook проекта
+
+        Args:
+            project_id: ID проекта
+            hook_id: ID webhook
+            url: URL для отправки webhook (обязателен в API)
+            token: Секретный токен для webhook
+            **events: Флаги событий (issues_events, merge_requests_events, ...)
+
+        Returns:
+            Информация о webhook
+        """
+        from urllib.parse import quote
+        encoded_id = quote(str(project_id), safe='')
+
+        data = {"url": url, **events}
+        if token:
+            data["token"] = token
+
+        return await self._request("PUT", f"/projects/{encoded_id}/hooks/{hook_id}", json_data=data)
+
     async def delete_project_hook(self, project_id: str, hook_id: int) -> None:
         """
         Args:
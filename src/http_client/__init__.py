@@ -0,0 +1,23 @@
+"""
+Общий HTTP слой для клиентов GitLab и GitHub API
+"""
+
+from src.http_client.pool import HttpSessionPool, http_sessions, get_http_session, close_http_sessions
+from src.http_client.cache import ResponseCache, response_cache
+from src.http_client.ratelimit import Priority, RateLimitScheduler, rate_limiter
+from src.http_client.pagination import iter_offset_pages, iter_keyset_pages, parse_link_header
+
+__all__ = [
+    "HttpSessionPool",
+    "http_sessions",
+    "get_http_session",
+    "close_http_sessions",
+    "ResponseCache",
+    "response_cache",
+    "Priority",
+    "RateLimitScheduler",
+    "rate_limiter",
+    "iter_offset_pages",
+    "iter_keyset_pages",
+    "parse_link_header",
+]
@@ -0,0 +1,141 @@
+"""
+Кэш ответов GitLab/GitHub API с условными запросами
+
+Ответы GET сохраняются вместе с ETag / Last-Modified. При повторном запросе
+отправляются If-None-Match / If-Modified-Since, и на 304 Not Modified тело
+берется из кэша: трафика меньше, а у GitHub такие ответы не расходуют лимит
+запросов. Ключ включает хэш токена, поэтому пользователи не видят чужие ответы.
+"""
+
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Mapping, NamedTuple, Optional, Tuple
+
+from multidict import CIMultiDict, CIMultiDictProxy
+
+from src.config import settings
+
+CacheKey = Tuple[str, str, Tuple[Tuple[str, str], ...]]
+
+
+class CachedResponse(NamedTuple):
+    """Сохраненный ответ API"""
+    body: bytes
+    headers: CIMultiDictProxy
+    etag: Optional[str]
+    last_modified: Optional[str]
+
+
+class ResponseCache:
+    """LRU кэш ответов с ограничением по числу записей и объему"""
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 16 * 1024 * 1024):
+        """
+        Args:
+            max_entries: Максимум записей (0 отключает кэш)
+            max_bytes: Максимальный суммарный размер тел ответов
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    @staticmethod
+    def make_key(token: str, url: str, params: Optional[Mapping[str, Any]] = None) -> CacheKey:
+        """Ключ: хэш токена, URL и отсортированные параметры"""
+        token_id = hashlib.sha256(token.encode()).hexdigest()[:16]
+        query = tuple(sorted((str(k), str(v)) for k, v in (params or {}).items()))
+        return token_id, url, query
+
+    def conditional_headers(self, key: CacheKey) -> Dict[str, str]:
+        """Заголовки If-None-Match / If-Modified-Since для сохраненного ответа"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return {}
+        headers = {}
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def revalidated(self, key: CacheKey) -> Optional[Tuple[Any, CIMultiDictProxy]]:
+        """
+        Ответ из кэша после 304 Not Modified
+
+        Returns:
+            (тело, заголовки) или None, если запись уже вытеснена
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return json.loads(entry.body), entry.headers
+
+    def store(self, key: CacheKey, body: bytes, headers: Mapping[str, str]) -> Tuple[Any, CIMultiDictProxy]:
+        """
+        Сохранение полного ответа, если у него есть валидаторы
+
+        Тело хранится в сыром виде и разбирается при каждой выдаче, чтобы
+        вызывающий код не мог изменить закэшированный объект.
+
+        Returns:
+            (разобранное тело, заголовки)
+        """
+        self.misses += 1
+        saved_headers = CIMultiDictProxy(CIMultiDict(headers))
+        data = json.loads(body) if body else None
+
+        self._discard(key)
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+        if (etag or last_modified) and len(body) <= self.max_bytes:
+            self._entries[key] = CachedResponse(body, saved_headers, etag, last_modified)
+            self.size_bytes += len(body)
+            self._evict()
+
+        return data, saved_headers
+
+    def _discard(self, key: CacheKey) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size_bytes -= len(entry.body)
+
+    def _evict(self) -> None:
+        while self._entries and (len(self._entries) > self.max_entries or self.size_bytes > self.max_bytes):
+            _, entry = self._entries.popitem(last=False)
+            self.size_bytes -= len(entry.body)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """Очистка кэша"""
+        self._entries.clear()
+        self.size_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Статистика кэша"""
+        requests = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.size_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / requests, 3) if requests else None,
+        }
+
+
+response_cache = ResponseCache(
+    max_entries=settings.http_cache_max_entries,
+    max_bytes=settings.http_cache_max_bytes
+)
@@ -0,0 +1,129 @@
+"""
+Постраничная загрузка списков GitLab/GitHub API
+
+Страницы отдаются асинхронным генератором по мере загрузки, поэтому первую
+страницу можно показать сразу. Если общее число страниц известно
+(X-Total-Pages у GitLab, rel="last" в Link у GitHub), остальные страницы
+запрашиваются параллельно, иначе - последовательно по X-Next-Page / rel="next".
+"""
+
+import asyncio
+import re
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Mapping, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+Page = Tuple[List[Dict[str, Any]], Mapping[str, str]]
+PageFetcher = Callable[[int], Awaitable[Page]]
+UrlFetcher = Callable[[str], Awaitable[Page]]
+
+_LINK_RE = re.compile(r'<([^>]+)>\s*;\s*rel="([^"]+)"')
+
+
+def parse_link_header(value: Optional[str]) -> Dict[str, str]:
+    """
+    Разбор заголовка Link (RFC 8288)
+
+    Returns:
+        rel -> URL
+    """
+    if not value:
+        return {}
+    return {rel: url for url, rel in _LINK_RE.findall(value)}
+
+
+def _page_from_url(url: Optional[str]) -> Optional[int]:
+    if not url:
+        return None
+    values = parse_qs(urlsplit(url).query).get("page")
+    return int(values[0]) if values and values[0].isdigit() else None
+
+
+def total_pages(headers: Mapping[str, str]) -> Optional[int]:
+    """Общее число страниц из X-Total-Pages или ссылки rel="last" """
+    value = headers.get("X-Total-Pages")
+    if value and value.isdigit():
+        return int(value)
+    return _page_from_url(parse_link_header(headers.get("Link")).get("last"))
+
+
+def next_page(headers: Mapping[str, str]) -> Optional[int]:
+    """Номер следующей страницы из X-Next-Page или ссылки rel="next" """
+    value = headers.get("X-Next-Page")
+    if value and value.isdigit():
+        return int(value)
+    return _page_from_url(parse_link_header(headers.get("Link")).get("next"))
+
+
+async def iter_offset_pages(
+        fetch: PageFetcher,
+        concurrency: int = 4,
+        max_pages: int = 20
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Страницы offset-пагинации (?page=N)
+
+    Args:
+        fetch: Корутина загрузки страницы по номеру, возвращает (элементы, заголовки)
+        concurrency: Сколько страниц загружать одновременно
+        max_pages: Максимум загружаемых страниц
+    """
+    items, headers = await fetch(1)
+
+    total = total_pages(headers)
+    if total is None:
+        # Общее число неизвестно (например, GitLab не считает его для больших выборок)
+        yield items
+        page = next_page(headers)
+        fetched = 1
+        while page and fetched < max_pages:
+            items, headers = await fetch(page)
+            fetched += 1
+            if not items:
+                break
+            yield items
+            page = next_page(headers)
+        return
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch_limited(page_number: int) -> Page:
+        async with semaphore:
+            return await fetch(page_number)
+
+    # Остальные страницы загружаются, пока потребитель обрабатывает первую
+    tasks = [asyncio.create_task(fetch_limited(page)) for page in range(2, min(total, max_pages) + 1)]
+    try:
+        yield items
+        # Страницы загружаются параллельно, а отдаются по порядку
+        for task in tasks:
+            items, _ = await task
+            if items:
+                yield items
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def iter_keyset_pages(
+        fetch: UrlFetcher,
+        first_url: str,
+        max_pages: int = 20
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Страницы keyset-пагинации: переход по ссылке rel="next"
+
+    Args:
+        fetch: Корутина загрузки страницы по URL
+        first_url: URL первой страницы со всеми параметрами
+        max_pages: Максимум загружаемых страниц
+    """
+    url: Optional[str] = first_url
+    fetched = 0
+    while url and fetched < max_pages:
+        items, headers = await fetch(url)
+        fetched += 1
+        if not items:
+            break
+        yield items
+        url = parse_link_header(headers.get("Link")).get("next")
@@ -0,0 +1,117 @@
+"""
+Пул aiohttp сессий на процесс
+
+Одна сессия (и один TCPConnector) на хост API: соединения переиспользуются
+между вызовами с keep-alive, DNS ответы кэшируются, число соединений к
+одному хосту ограничено. Токены пользователей передаются в заголовках
+каждого запроса, поэтому сессия общая для всех пользователей.
+"""
+
+import asyncio
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+from aiohttp import ClientSession, ClientTimeout, TCPConnector
+from loguru import logger
+
+from src.config import settings
+
+Origin = Tuple[str, str, Optional[int]]
+
+
+class HttpSessionPool:
+    """Общие aiohttp сессии, по одной на хост"""
+
+    def __init__(
+            self,
+            limit_per_host: int = 20,
+            keepalive_timeout: float = 60.0,
+            dns_cache_ttl: int = 300,
+            timeout: float = 30.0
+    ):
+        """
+        Args:
+            limit_per_host: Максимум одновременных соединений к одному хосту
+            keepalive_timeout: Время жизни неиспользуемого соединения (сек)
+            dns_cache_ttl: Время кэширования DNS ответов (сек)
+            timeout: Общий таймаут запроса (сек)
+        """
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self.timeout = timeout
+
+        self._sessions: Dict[Origin, ClientSession] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.created = 0
+
+    @staticmethod
+    def _origin(base_url: str) -> Origin:
+        parts = urlsplit(base_url)
+        return parts.scheme, parts.hostname or "", parts.port
+
+    def _create(self) -> ClientSession:
+        connector = TCPConnector(
+            limit=0,
+            limit_per_host=self.limit_per_host,
+            use_dns_cache=True,
+            ttl_dns_cache=self.dns_cache_ttl,
+            keepalive_timeout=self.keepalive_timeout,
+            enable_cleanup_closed=True
+        )
+        self.created += 1
+        return ClientSession(connector=connector, timeout=ClientTimeout(total=self.timeout))
+
+    def get(self, base_url: str) -> ClientSession:
+        """
+        Сессия для хоста из base_url
+
+        Args:
+            base_url: URL API (учитываются только схема, хост и порт)
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Сессии привязаны к циклу событий, в котором созданы
+            self._sessions = {}
+            self._loop = loop
+
+        origin = self._origin(base_url)
+        session = self._sessions.get(origin)
+        if session is None or session.closed:
+            session = self._sessions[origin] = self._create()
+            logger.debug(f"Created HTTP session for {origin[0]}://{origin[1]}")
+        return session
+
+    async def close(self) -> None:
+        """Закрытие всех сессий"""
+        sessions, self._sessions = self._sessions, {}
+        for session in sessions.values():
+            if not session.closed:
+                await session.close()
+        if sessions:
+            logger.info(f"Closed {len(sessions)} HTTP sessions")
+
+    def stats(self) -> Dict[str, Any]:
+        """Статистика пула"""
+        return {
+            "hosts": len(self._sessions),
+            "created": self.created,
+        }
+
+
+http_sessions = HttpSessionPool(
+    limit_per_host=settings.http_limit_per_host,
+    keepalive_timeout=settings.http_keepalive_timeout,
+    dns_cache_ttl=settings.http_dns_cache_ttl,
+    timeout=settings.http_timeout
+)
+
+
+def get_http_session(base_url: str) -> ClientSession:
+    """Общая сессия для хоста из base_url"""
+    return http_sessions.get(base_url)
+
+
+async def close_http_sessions() -> None:
+    """Закрытие общих сессий при остановке приложения"""
+    await http_sessions.close()
@@ -0,0 +1,335 @@
+"""
+Планировщик запросов к GitLab/GitHub API с учетом лимитов
+
+Остаток лимита токена берется из заголовков ответов (RateLimit-* у GitLab,
+X-RateLimit-* у GitHub). Когда остаток подходит к концу, фоновые запросы
+растягиваются до момента сброса лимита, а последняя часть бюджета остается
+интерактивным действиям (кнопки approve/merge). Ответы 429 и 5xx повторяются
+с экспоненциальной задержкой со случайным разбросом.
+"""
+
+import asyncio
+import hashlib
+import heapq
+import itertools
+import random
+import time
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import Any, AsyncIterator, Dict, List, Mapping, Optional, Tuple
+from urllib.parse import urlsplit
+
+from aiohttp import ClientResponse, ClientSession
+from loguru import logger
+
+from src.config import settings
+from src.metrics import API_REQUEST_DURATION, API_REQUESTS
+
+RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+# 5xx повторяются только для запросов, которые безопасно выполнить дважды
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "PUT", "DELETE"})
+
+
+class Priority(IntEnum):
+    """Приоритет запроса: меньше - важнее"""
+    INTERACTIVE = 0
+    DEFAULT = 1
+    BACKGROUND = 2
+
+
+class PrioritySemaphore:
+    """Семафор, пропускающий ожидающих в порядке приоритета"""
+
+    def __init__(self, value: int):
+        self._value = value
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._counter = itertools.count()
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self, priority: int) -> None:
+        if self._value > 0 and not self._waiters:
+            self._value -= 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._counter), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Слот уже передан этой задаче - отдаем следующему
+                self.release()
+            raise
+
+    def release(self) -> None:
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._value += 1
+
+
+class TokenBudget:
+    """Состояние лимита одного токена"""
+
+    def __init__(self, concurrency: int):
+        self.slots = PrioritySemaphore(concurrency)
+        self.limit: Optional[int] = None
+        self.remaining: Optional[int] = None
+        self.reset_at = 0.0
+        self.blocked_until = 0.0
+        self.next_paced = 0.0
+
+    def update(self, headers: Mapping[str, str]) -> None:
+        """Обновление остатка лимита по заголовкам ответа"""
+        remaining = _header_int(headers, "RateLimit-Remaining", "X-RateLimit-Remaining")
+        if remaining is None:
+            return
+        self.remaining = remaining
+        self.limit = _header_int(headers, "RateLimit-Limit", "X-RateLimit-Limit") or self.limit
+        reset = _header_int(headers, "RateLimit-Reset", "X-RateLimit-Reset")
+        if reset is not None:
+            # Сброс передается как unix-время
+            self.reset_at = time.monotonic() + max(0.0, reset - time.time())
+
+    def delay(self, priority: Priority, reserve: float) -> float:
+        """Сколько ждать, пока запрос с данным приоритетом вообще можно отправить"""
+        now = time.monotonic()
+        if self.blocked_until > now:
+            return self.blocked_until - now
+        if self.remaining is None or self.reset_at <= now:
+            return 0.0
+
+        window = self.reset_at - now
+        if self.remaining <= 0:
+            return window
+        reserved = int((self.limit or 0) * reserve)
+        if priority == Priority.BACKGROUND and self.remaining <= reserved:
+            # Остаток бюджета оставляем интерактивным действиям
+            return window
+        return 0.0
+
+    def pace(self, priority: Priority, reserve: float) -> float:
+        """
+        Задержка для равномерного расхода бюджета на исходе
+
+        Каждый вызов занимает следующий интервал, поэтому одновременные
+        запросы расходятся во времени, а не уходят пачкой.
+        """
+        now = time.monotonic()
+        if priority == Priority.INTERACTIVE or self.remaining is None or self.reset_at <= now:
+            return 0.0
+        reserved = int((self.limit or 0) * reserve)
+        if self.remaining > 2 * reserved:
+            return 0.0
+
+        interval = (self.reset_at - now) / max(self.remaining, 1)
+        self.next_paced = max(self.next_paced + interval, now)
+        return self.next_paced - now
+
+
+def _header_int(headers: Mapping[str, str], *names: str) -> Optional[int]:
+    for name in names:
+        value = headers.get(name)
+        if value is not None:
+            try:
+                return int(float(value))
+            except ValueError:
+                return None
+    return None
+
+
+class RateLimitScheduler:
+    """Планировщик запросов по токенам"""
+
+    def __init__(
+            self,
+            concurrency_per_token: int = 8,
+            reserve: float = 0.1,
+            max_retries: int = 4,
+            backoff_base: float = 0.5,
+            backoff_max: float = 30.0
+    ):
+        """
+        Args:
+            concurrency_per_token: Максимум одновременных запросов с одним токеном
+            reserve: Доля лимита, недоступная фоновым запросам
+            max_retries: Повторы после 429/5xx
+            backoff_base: Начальная задержка повтора (сек)
+            backoff_max: Максимальная задержка повтора (сек)
+        """
+        self.concurrency_per_token = concurrency_per_token
+        self.reserve = reserve
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._budgets: Dict[str, TokenBudget] = {}
+        self.retries = 0
+        self.throttled = 0
+        self.paced_seconds = 0.0
+
+    @staticmethod
+    def _token_id(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()[:16]
+
+    def budget(self, token: str) -> TokenBudget:
+        """Состояние лимита токена"""
+        token_id = self._token_id(token)
+        budget = self._budgets.get(token_id)
+        if budget is None:
+            budget = self._budgets[token_id] = TokenBudget(self.concurrency_per_token)
+        return budget
+
+    def backoff(self, attempt: int, retry_after: Optional[int] = None) -> float:
+        """Задержка перед повтором: Retry-After или экспонента с полным разбросом"""
+        if retry_after is not None:
+            return float(retry_after)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def _send(
+            self,
+            budget: TokenBudget,
+            session: ClientSession,
+            method: str,
+            url: str,
+            priority: Priority,
+            kwargs: Dict[str, Any]
+    ) -> ClientResponse:
+        """
+        Отправка одной попытки
+
+        Слот токена остается занятым, пока ответ не освобожден вызывающим
+        (_release): иначе чтение тела шло бы вне ограничения параллельности.
+        """
+        # Ожидание лимита - до занятия слота, чтобы не задерживать интерактивные запросы
+        delay = budget.delay(priority, self.reserve)
+        while delay > 0:
+            self.paced_seconds += delay
+            await asyncio.sleep(delay)
+            delay = budget.delay(priority, self.reserve)
+        delay = budget.pace(priority, self.reserve)
+        if delay > 0:
+            self.paced_seconds += delay
+            await asyncio.sleep(delay)
+
+        await budget.slots.acquire(priority)
+        host = urlsplit(url).hostname or ""
+        started = time.perf_counter()
+        try:
+            response = await session.request(method, url, **kwargs)
+        except Exception:
+            budget.slots.release()
+            API_REQUESTS.inc(host, method, "error")
+            raise
+        except asyncio.CancelledError:
+            budget.slots.release()
+            raise
+        finally:
+            API_REQUEST_DURATION.observe(time.perf_counter() - started, host, method)
+        API_REQUESTS.inc(host, method, str(response.status))
+        budget.update(response.headers)
+        return response
+
+    @staticmethod
+    def _release(budget: TokenBudget, response: ClientResponse) -> None:
+        """Освобождение ответа и слота токена"""
+        try:
+            response.release()
+        finally:
+            budget.slots.release()
+
+    @asynccontextmanager
+    async def request(
+            self,
+            session: ClientSession,
+            method: str,
+            url: str,
+            *,
+            token: str,
+            priority: Priority = Priority.DEFAULT,
+            **kwargs: Any
+    ) -> AsyncIterator[ClientResponse]:
+        """
+        Запрос с учетом лимита токена и повторами
+
+        Args:
+            session: Сессия aiohttp
+            method: HTTP метод
+            url: Полный URL
+            token: Токен, по которому считается лимит
+            priority: Приоритет запроса
+            **kwargs: Параметры session.request
+
+        Yields:
+            Ответ (последний, если повторы исчерпаны)
+        """
+        budget = self.budget(token)
+        attempt = 0
+        while True:
+            response = await self._send(budget, session, method, url, priority, kwargs)
+            retryable = response.status == 429 or (
+                response.status in RETRYABLE_STATUSES and method.upper() in IDEMPOTENT_METHODS
+            )
+            if not retryable or attempt >= self.max_retries:
+                break
+
+            retry_after = _header_int(response.headers, "Retry-After")
+            delay = self.backoff(attempt, retry_after)
+            if response.status == 429:
+                # Лимит исчерпан для всех запросов с этим токеном
+                self.throttled += 1
+                budget.blocked_until = max(budget.blocked_until, time.monotonic() + delay)
+            self._release(budget, response)
+
+            attempt += 1
+            self.retries += 1
+            logger.warning(f"API {method} {url} returned {response.status}, retry {attempt} in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+        try:
+            yield response
+        finally:
+            self._release(budget, response)
+
+    def headroom(self) -> Tuple[Optional[float], Optional[int]]:
+        """
+        Запас лимита самого загруженного токена
+
+        Returns:
+            (доля оставшегося лимита, остаток запросов); None, если лимит
+            ни одного токена не известен или уже сброшен
+        """
+        now = time.monotonic()
+        ratio, remaining = None, None
+        for budget in self._budgets.values():
+            if budget.remaining is None or budget.reset_at <= now:
+                continue
+            if budget.limit:
+                budget_ratio = budget.remaining / budget.limit
+                ratio = budget_ratio if ratio is None else min(ratio, budget_ratio)
+            remaining = budget.remaining if remaining is None else min(remaining, budget.remaining)
+        return ratio, remaining
+
+    def stats(self) -> Dict[str, Any]:
+        """Статистика планировщика"""
+        return {
+            "tokens": len(self._budgets),
+            "retries": self.retries,
+            "throttled": self.throttled,
+            "paced_seconds": round(self.paced_seconds, 3),
+            "waiting": sum(budget.slots.waiting for budget in self._budgets.values()),
+        }
+
+
+rate_limiter = RateLimitScheduler(
+    concurrency_per_token=settings.http_concurrency_per_token,
+    reserve=settings.http_rate_limit_reserve,
+    max_retries=settings.http_max_retries,
+    backoff_base=settings.http_backoff_base,
+    backoff_max=settings.http_backoff_max
+)
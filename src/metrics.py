@@ -0,0 +1,273 @@
+"""
+Метрики в формате Prometheus (text exposition 0.0.4)
+
+Без внешних зависимостей: значения хранятся в словарях по кортежу меток,
+запись - поиск в словаре и сложение (для гистограмм еще bisect по границам),
+поэтому метрики можно не выключать на горячем пути. Метки передаются
+позиционно в порядке labelnames. Значения, которые и так известны
+компонентам (глубина очередей, остаток лимитов API), не копятся, а
+выставляются в Gauge перед отдачей /metrics.
+"""
+
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Sequence, Tuple, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Границы по умолчанию (сек): от быстрых запросов к БД до медленных API
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Событие, которое сейчас обрабатывает задача (для меток запросов к БД)
+current_event: ContextVar[str] = ContextVar("current_event", default="none")
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Metric:
+    """Базовая метрика: имя, описание, имена меток"""
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _labels(self, values: Labels, extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(self.labelnames, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type}",
+            *self.samples(),
+        ]
+
+
+class Counter(Metric):
+    """Монотонно растущий счетчик"""
+
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def samples(self) -> Iterator[str]:
+        for labels, value in self._values.items():
+            yield f"{self.name}{self._labels(labels)} {_format_value(value)}"
+
+
+class Gauge(Counter):
+    """Текущее значение"""
+
+    type = "gauge"
+
+    def set(self, value: float, *labels: str) -> None:
+        self._values[labels] = value
+
+
+class Histogram(Metric):
+    """Распределение значений по корзинам"""
+
+    type = "histogram"
+
+    def __init__(
+            self,
+            name: str,
+            documentation: str,
+            labelnames: Sequence[str] = (),
+            buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        # Метки -> [счетчики корзин (не накопленные)..., +Inf, сумма]
+        self._values: Dict[Labels, List[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        state = self._values.get(labels)
+        if state is None:
+            state = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        state[bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def count(self, *labels: str) -> int:
+        state = self._values.get(labels)
+        return int(sum(state[:-1])) if state else 0
+
+    def samples(self) -> Iterator[str]:
+        for labels, state in self._values.items():
+            cumulative = 0
+            for bound, hits in zip(self.buckets + (float("inf"),), state[:-1]):
+                cumulative += hits
+                le = 'le="' + _format_value(bound) + '"'
+                yield f"{self.name}_bucket{self._labels(labels, le)} {cumulative}"
+            yield f"{self.name}_sum{self._labels(labels)} {_format_value(state[-1])}"
+            yield f"{self.name}_count{self._labels(labels)} {cumulative}"
+
+
+class MetricsRegistry:
+    """Набор метрик, отдаваемых одним /metrics"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+            self,
+            name: str,
+            documentation: str,
+            labelnames: Sequence[str] = (),
+            buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+WEBHOOKS_RECEIVED = registry.counter(
+    "webhooks_received_total", "Принятые webhook запросы", ("platform", "event", "result")
+)
+EVENT_QUEUE_WAIT = registry.histogram(
+    "webhook_queue_wait_seconds", "Время события в очереди до начала обработки", ("platform",)
+)
+HANDLER_DURATION = registry.histogram(
+    "webhook_handler_duration_seconds", "Время работы обработчика handle_*", ("handler",)
+)
+HANDLER_ERRORS = registry.counter(
+    "webhook_handler_errors_total", "Ошибки обработчиков handle_* (пойманные внутри и вышедшие наружу)", ("handler",)
+)
+DB_QUERIES = registry.counter("db_queries_total", "Запросы к БД по обрабатываемому событию", ("event",))
+DB_QUERY_DURATION = registry.histogram(
+    "db_query_duration_seconds", "Время выполнения запроса к БД по обрабатываемому событию", ("event",)
+)
+NOTIFICATIONS_GENERATED = registry.counter(
+    "notifications_generated_total", "Сформированные уведомления", ("platform", "event_type")
+)
+NOTIFICATIONS_SENT = registry.counter(
+    "notifications_sent_total", "Отправленные в Telegram уведомления", ("platform", "event_type")
+)
+TELEGRAM_ERRORS = registry.counter("telegram_errors_total", "Ошибки отправки в Telegram по типу", ("error",))
+API_REQUESTS = registry.counter(
+    "api_requests_total", "Запросы к GitLab/GitHub API", ("host", "method", "status")
+)
+API_REQUEST_DURATION = registry.histogram(
+    "api_request_duration_seconds", "Время ответа GitLab/GitHub API (одна попытка)", ("host", "method")
+)
+API_RATE_LIMIT_HEADROOM = registry.gauge(
+    "api_rate_limit_headroom_ratio", "Минимальная по токенам доля оставшегося лимита API (1 - лимит не тронут)"
+)
+API_RATE_LIMIT_REMAINING = registry.gauge(
+    "api_rate_limit_remaining_min", "Минимальный по токенам остаток запросов до сброса лимита"
+)
+QUEUE_DEPTH = registry.gauge("queue_depth", "Текущая глубина очередей", ("queue",))
+
+
+@contextmanager
+def event_scope(platform: str, event_type: str) -> Iterator[None]:
+    """Запросы к БД внутри блока помечаются событием "<platform>:<event_type>" """
+    token = current_event.set(f"{platform}:{event_type}")
+    try:
+        yield
+    finally:
+        current_event.reset(token)
+
+
+F = TypeVar("F", bound=Callable[..., Awaitable[List[Dict[str, Any]]]])
+
+
+def observe_handler(func: F) -> F:
+    """Время работы обработчика и число сформированных им уведомлений"""
+    name = func.__name__
+
+    @wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> List[Dict[str, Any]]:
+        started = time.perf_counter()
+        try:
+            notifications = await func(*args, **kwargs)
+        except Exception:
+            HANDLER_ERRORS.inc(name)
+            raise
+        finally:
+            HANDLER_DURATION.observe(time.perf_counter() - started, name)
+        for notification in notifications:
+            NOTIFICATIONS_GENERATED.inc(notification.get("platform", ""), notification.get("event_type", ""))
+        return notifications
+
+    return wrapper  # type: ignore[return-value]
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Счетчик и время запросов движка с меткой текущего события"""
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        label = current_event.get()
+        DB_QUERIES.inc(label)
+        DB_QUERY_DURATION.observe(time.perf_counter() - started, label)
+
+    @event.listens_for(engine.sync_engine, "handle_error")
+    def handle_error(exception_context):
+        # Незавершенный запрос не должен сдвигать стек времени соединения
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("query_started"):
+            connection.info["query_started"].pop()
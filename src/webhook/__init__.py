@@ -3,6 +3,6 @@
 """
 
 from src.webhook.server import WebhookServer
-from src.webhook.notifier import send_notification, set_bot_instance
+from src.webhook.notifier import send_notification, set_bot_instance, stop_delivery_engine
 
-__all__ = ["WebhookServer", "send_notification", "set_bot_instance"]
+__all__ = ["WebhookServer", "send_notification", "set_bot_instance", "stop_delivery_engine"]
@@ -0,0 +1,126 @@
+"""
+Дедупликация повторных доставок webhook
+
+GitLab повторяет доставку при таймаутах, GitHub позволяет переотправить
+событие вручную. Повторы отбрасываются на HTTP слое по ID доставки
+(X-Gitlab-Event-UUID / X-GitHub-Delivery), а при его отсутствии по хэшу тела.
+"""
+
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Mapping, Tuple
+
+DELIVERY_HEADERS = {
+    "gitlab": "X-Gitlab-Event-UUID",
+    "github": "X-GitHub-Delivery",
+}
+
+
+def delivery_key(platform: str, headers: Mapping[str, str], body: bytes) -> str:
+    """
+    Ключ доставки для дедупликации
+
+    Args:
+        platform: gitlab или github
+        headers: Заголовки запроса
+        body: Тело запроса
+
+    Returns:
+        Строка вида "<platform>:<delivery id>" или "<platform>:sha256:<hash>"
+    """
+    delivery_id = headers.get(DELIVERY_HEADERS.get(platform, ""))
+    if delivery_id:
+        return f"{platform}:{delivery_id}"
+    return f"{platform}:sha256:{hashlib.sha256(body).hexdigest()}"
+
+
+class DeliveryDeduplicator:
+    """Ограниченный по размеру TTL кэш уже принятых доставок"""
+
+    def __init__(self, ttl: float = 3600.0, max_entries: int = 100_000):
+        """
+        Args:
+            ttl: Время, в течение которого повтор считается дубликатом (сек)
+            max_entries: Максимальный размер кэша
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._seen: "OrderedDict[str, float]" = OrderedDict()
+
+        self.hits: Dict[str, int] = {}
+        self.misses = 0
+        self.hash_fallbacks = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def _expire(self, now: float) -> None:
+        # Записи упорядочены по времени добавления, старые всегда в начале
+        while self._seen:
+            key, seen_at = next(iter(self._seen.items()))
+            if now - seen_at < self.ttl:
+                break
+            self._seen.popitem(last=False)
+
+    def check_and_remember(self, key: str) -> bool:
+        """
+        Проверка и запоминание доставки
+
+        Returns:
+            True, если доставка уже была принята (дубликат)
+        """
+        now = time.time()
+        self._expire(now)
+
+        if key in self._seen:
+            platform = key.split(":", 1)[0]
+            self.hits[platform] = self.hits.get(platform, 0) + 1
+            return True
+
+        self.misses += 1
+        if ":sha256:" in key:
+            self.hash_fallbacks += 1
+
+        self._seen[key] = now
+        if len(self._seen) > self.max_entries:
+            self._seen.popitem(last=False)
+            self.evictions += 1
+        return False
+
+    def forget(self, key: str) -> None:
+        """Удаление ключа, если доставка не была принята (например, 503)"""
+        self._seen.pop(key, None)
+
+    def load(self, entries: Iterable[Tuple[str, float]]) -> int:
+        """
+        Загрузка сохраненного окна доставок (например, из журнала на диске)
+
+        Args:
+            entries: Пары (ключ, время приема) в порядке возрастания времени
+
+        Returns:
+            Количество загруженных ключей
+        """
+        now = time.time()
+        loaded = 0
+        for key, seen_at in entries:
+            if key and now - seen_at < self.ttl:
+                self._seen[key] = seen_at
+                loaded += 1
+
+        while len(self._seen) > self.max_entries:
+            self._seen.popitem(last=False)
+        return loaded
+
+    def stats(self) -> Dict[str, Any]:
+        """Счетчики дедупликации"""
+        return {
+            "size": len(self._seen),
+            "duplicates": dict(self.hits),
+            "duplicates_total": sum(self.hits.values()),
+            "unique": self.misses,
+            "hash_fallbacks": self.hash_fallbacks,
+            "evictions": self.evictions,
+        }
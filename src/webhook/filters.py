@@ -0,0 +1,133 @@
+"""
+Предварительная фильтрация webhook событий
+
+Большая часть трафика - Pipeline Hook / workflow_run в промежуточных
+статусах, по которым обработчики не отправляют уведомлений. Правила
+проверяют заголовок события и несколько полей верхнего уровня и отбрасывают
+такие события на HTTP слое: до журнала, очереди и сессии БД.
+
+Правила должны отбрасывать только то, что обработчики в
+personalized_handlers.py все равно пропускают.
+"""
+
+from typing import Any, Callable, Dict, FrozenSet, Iterable, NamedTuple, Optional, Tuple
+
+# Типы событий, для которых есть обработчики (src/webhook/handlers.py)
+HANDLED_EVENTS: Dict[str, FrozenSet[str]] = {
+    "gitlab": frozenset({"Note Hook", "Comment Hook", "Merge Request Hook", "Pipeline Hook", "Issue Hook"}),
+    "github": frozenset({"pull_request", "issues", "issue_comment", "workflow_run"}),
+}
+
+UNHANDLED_RULE = "unhandled_event"
+
+Predicate = Callable[[Dict[str, Any]], bool]
+
+
+class FilterRule(NamedTuple):
+    """Правило: событие отбрасывается, если predicate(data) истинно"""
+    name: str
+    platform: str
+    event_types: Tuple[str, ...]
+    predicate: Predicate
+
+
+def field_not_in(path: Tuple[str, ...], allowed: Iterable[str]) -> Predicate:
+    """Предикат: значение поля по пути path не входит в allowed"""
+    allowed = frozenset(allowed)
+
+    def predicate(data: Dict[str, Any]) -> bool:
+        value: Any = data
+        for key in path:
+            if not isinstance(value, dict):
+                return True
+            value = value.get(key)
+        return value not in allowed
+
+    return predicate
+
+
+def field_empty(key: str) -> Predicate:
+    """Предикат: поле верхнего уровня отсутствует или пустое"""
+    return lambda data: not data.get(key)
+
+
+DEFAULT_RULES: Tuple[FilterRule, ...] = (
+    FilterRule(
+        "gitlab_pipeline_in_progress", "gitlab", ("Pipeline Hook",),
+        field_not_in(("object_attributes", "status"), ("success", "failed", "canceled"))
+    ),
+    FilterRule("gitlab_pipeline_without_mr", "gitlab", ("Pipeline Hook",), field_empty("merge_requests")),
+    FilterRule(
+        "github_workflow_not_completed", "github", ("workflow_run",),
+        field_not_in(("action",), ("completed",))
+    ),
+    FilterRule(
+        "github_pull_request_action", "github", ("pull_request",),
+        field_not_in(("action",), ("opened", "synchronize", "closed"))
+    ),
+    FilterRule("github_issue_action", "github", ("issues",), field_not_in(("action",), ("opened", "assigned"))),
+    FilterRule("github_comment_action", "github", ("issue_comment",), field_not_in(("action",), ("created",))),
+)
+
+
+class EventFilter:
+    """Таблица правил, сгруппированная по (платформа, тип события), со счетчиками"""
+
+    def __init__(
+            self,
+            rules: Iterable[FilterRule] = DEFAULT_RULES,
+            handled_events: Optional[Dict[str, FrozenSet[str]]] = None,
+            enabled: bool = True
+    ):
+        """
+        Args:
+            rules: Правила фильтрации
+            handled_events: Типы событий с обработчиками по платформам
+            enabled: False - пропускать все события
+        """
+        self.enabled = enabled
+        self.handled_events = HANDLED_EVENTS if handled_events is None else handled_events
+        self._rules: Dict[Tuple[str, str], Tuple[FilterRule, ...]] = {}
+        for rule in rules:
+            for event_type in rule.event_types:
+                key = (rule.platform, event_type)
+                self._rules[key] = self._rules.get(key, ()) + (rule,)
+
+        self.passed = 0
+        self.dropped: Dict[str, int] = {}
+
+    def _drop(self, name: str) -> str:
+        self.dropped[name] = self.dropped.get(name, 0) + 1
+        return name
+
+    def check_event_type(self, platform: str, event_type: str) -> Optional[str]:
+        """
+        Проверка по заголовку, до разбора JSON
+
+        Returns:
+            Имя правила, отбросившего событие, или None
+        """
+        if self.enabled and event_type not in self.handled_events.get(platform, ()):
+            return self._drop(UNHANDLED_RULE)
+        return None
+
+    def check(self, platform: str, event_type: str, data: Dict[str, Any]) -> Optional[str]:
+        """
+        Проверка полей события
+
+        Returns:
+            Имя правила, отбросившего событие, или None
+        """
+        if self.enabled:
+            for rule in self._rules.get((platform, event_type), ()):
+                if rule.predicate(data):
+                    return self._drop(rule.name)
+        self.passed += 1
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "passed": self.passed,
+            "dropped": dict(self.dropped),
+        }
@@ -0,0 +1,134 @@
+"""
+Реестр webhooks проектов
+
+На проект (platform, project_id) создается один webhook для всех подписчиков.
+Его события - объединение событий активных подписок, ref_count - число этих
+подписок. После изменения подписок реестр приводит webhook к новому набору
+событий: создает его для первой подписки, обновляет флаги при изменении
+объединения и удаляет, когда подписок не осталось. Последний подписчик может
+не иметь прав на webhooks проекта, поэтому удаление повторяется токеном
+администратора.
+"""
+
+import asyncio
+from typing import List, Optional, Tuple
+from weakref import WeakValueDictionary
+
+from loguru import logger
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import settings
+from src.database import Subscription, ProjectHook
+from src.http_client import Priority
+from src.webhook.manager import WebhookManager
+
+# Синхронизация одного проекта не должна выполняться параллельно:
+# иначе два первых подписчика создадут два webhook
+_locks: "WeakValueDictionary[Tuple[str, str], asyncio.Lock]" = WeakValueDictionary()
+
+
+def _project_lock(platform: str, project_id: str) -> asyncio.Lock:
+    key = (platform, project_id)
+    lock = _locks.get(key)
+    if lock is None:
+        lock = _locks[key] = asyncio.Lock()
+    return lock
+
+
+def merge_event_types(event_types: List[str]) -> List[str]:
+    """Объединение типов событий подписок ("a,b", "b,c" -> [a, b, c])"""
+    merged = set()
+    for value in event_types:
+        merged.update(event for event in value.split(",") if event)
+    return sorted(merged)
+
+
+async def remove_project_hook(
+        platform: str,
+        project_id: str,
+        hook_id: int,
+        token: str,
+        priority: Priority = Priority.DEFAULT
+) -> bool:
+    """Удаление webhook токеном пользователя, при отказе - токеном администратора"""
+    if await WebhookManager.remove_webhook(platform, project_id, hook_id, token, priority):
+        return True
+    admin_token = settings.gitlab_private_token if platform == "gitlab" else settings.github_token
+    if not admin_token or admin_token == token:
+        return False
+    logger.info(f"Webhook {platform}:{project_id} удаляется токеном администратора")
+    return await WebhookManager.remove_webhook(platform, project_id, hook_id, admin_token, priority)
+
+
+async def sync_project_hook(
+        session: AsyncSession,
+        platform: str,
+        project_id: str,
+        token: str,
+        priority: Priority = Priority.DEFAULT
+) -> Optional[ProjectHook]:
+    """
+    Приведение webhook проекта к активным подпискам
+
+    Args:
+        session: Сессия БД (изменения подписок уже зафиксированы)
+        platform: gitlab или github
+        project_id: ID проекта или full_name репозитория
+        token: Токен пользователя, от имени которого меняется webhook
+        priority: Приоритет запросов к API
+
+    Returns:
+        Запись реестра или None, если webhook проекта больше не нужен
+    """
+    async with _project_lock(platform, project_id):
+        result = await session.execute(
+            select(Subscription.event_types).where(
+                Subscription.platform == platform,
+                Subscription.project_id == project_id,
+                Subscription.is_active == True
+            )
+        )
+        subscriptions = result.scalars().all()
+        events = merge_event_types(subscriptions)
+        events_str = ",".join(events)
+
+        result = await session.execute(
+            select(ProjectHook).where(
+                ProjectHook.platform == platform,
+                ProjectHook.project_id == project_id
+            )
+        )
+        hook = result.scalar_one_or_none()
+
+        if not subscriptions:
+            if hook is None:
+                return None
+            if hook.hook_id and not await remove_project_hook(
+                    platform, project_id, int(hook.hook_id), token, priority
+            ):
+                # Запись остается с ref_count=0, удаление повторит сверка
+                hook.ref_count = 0
+                await session.commit()
+                return hook
+            await session.delete(hook)
+            await session.commit()
+            logger.info(f"Webhook {platform}:{project_id} удален: подписок не осталось")
+            return None
+
+        if hook is None:
+            hook = ProjectHook(platform=platform, project_id=project_id, event_types="", ref_count=0)
+            session.add(hook)
+        hook.ref_count = len(subscriptions)
+
+        if hook.hook_id is None:
+            hook_id = await WebhookManager.setup_webhook(platform, project_id, token, events, priority)
+            if hook_id:
+                hook.hook_id = str(hook_id)
+                hook.event_types = events_str
+        elif hook.event_types != events_str:
+            if await WebhookManager.update_webhook(platform, project_id, int(hook.hook_id), token, events, priority):
+                hook.event_types = events_str
+
+        await session.commit()
+        return hook
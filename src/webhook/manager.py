@@ -1,53 +1,92 @@
 """
 Менеджер для автоматической настройки webhooks в GitLab и GitHub
+
+Сверка всех webhooks с подписками из БД:
+    python -m src.webhook.manager [--dry-run] [--rotate-secret]
 """
 
-from typing import Optional, List
+import argparse
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Optional, List, Dict, Set, Tuple
 from loguru import logger
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 from src.gitlab_api import GitLabClient
 from src.github_api import GitHubClient
+from src.http_client import Priority, close_http_sessions
 from src.config import settings
+from src.database import AsyncSessionLocal, ProjectHook, Subscription, User
 
 
 class WebhookManager:
     """Управление webhooks"""
 
+    @staticmethod
+    def gitlab_hook_flags(event_types: List[str]) -> Dict[str, bool]:
+        """Флаги событий GitLab webhook для типов событий подписок"""
+        return {
+            "push_events": False,
+            "issues_events": "issue" in event_types,
+            "merge_requests_events": "merge_request" in event_types,
+            "wiki_page_events": "wiki" in event_types,
+            "pipeline_events": "pipeline" in event_types,
+            "note_events": "note" in event_types,
+        }
+
+    @staticmethod
+    def github_hook_events(event_types: List[str]) -> List[str]:
+        """События GitHub webhook для типов событий подписок"""
+        github_events = []
+        if "workflow" in event_types:
+            github_events.append("workflow_run")
+        if "pull_request" in event_types:
+            github_events.append("pull_request")
+        if "issue" in event_types:
+            github_events.append("issues")
+        if "comment" in event_types:
+            github_events.extend(["issue_comment", "pull_request_review_comment"])
+        if "star" in event_types:
+            github_events.append("star")
+        return github_events or ["push"]
+
     @staticmethod
     async def setup_gitlab_webhook(
             project_id: str,
             gitlab_token: str,
-            event_types: List[str]
+            event_types: List[str],
+            priority: Priority = Priority.DEFAULT
     ) -> Optional[int]:
         """
         Настройка webhook для проекта GitLab
+
+        Уже существующий webhook с нашим URL переиспользуется, его события
+        приводятся к event_types.
         """
         if not settings.gitlab_webhook_url:
             logger.warning("GitLab webhook URL не настроен")
             return None
 
+        flags = WebhookManager.gitlab_hook_flags(event_types)
         try:
-            async with GitLabClient(settings.gitlab_url, gitlab_token) as client:
+            async with GitLabClient(settings.gitlab_url, gitlab_token, priority=priority) as client:
                 # существует ли уже webhook
                 existing_hooks = await client.get_project_hooks(project_id)
 
                 for hook in existing_hooks:
                     if hook.get("url") == settings.gitlab_webhook_url:
                         logger.info(f"Webhook для проекта {project_id} уже существует")
+                        await client.update_project_hook(project_id, hook["id"], settings.gitlab_webhook_url, **flags)
                         return hook.get("id")
 
                 # Создаем новый
-
                 webhook = await client.create_project_hook(
                     project_id=project_id,
                     url=settings.gitlab_webhook_url,
-                    push_events=False,
-                    issues_events="issue" in event_types,
-                    merge_requests_events="merge_request" in event_types,
-                    wiki_page_events="wiki" in event_types,
-                    pipeline_events="pipeline" in event_types,
-                    note_events="note" in event_types,  # Добавьте
-                    token=getattr(settings, 'gitlab_webhook_secret', None)
+                    token=getattr(settings, 'gitlab_webhook_secret', None),
+                    **flags
                 )
 
                 if webhook:
@@ -60,21 +99,50 @@ class WebhookManager:
             logger.error(f"Ошибка при создании GitLab webhook: {e}")
             return None
 
+    @staticmethod
+    async def update_gitlab_webhook(
+            project_id: str,
+            webhook_id: int,
+            gitlab_token: str,
+            event_types: List[str],
+            priority: Priority = Priority.DEFAULT
+    ) -> bool:
+        """
+        Изменение событий webhook проекта GitLab
+        """
+        try:
+            async with GitLabClient(settings.gitlab_url, gitlab_token, priority=priority) as client:
+                await client.update_project_hook(
+                    project_id, webhook_id, settings.gitlab_webhook_url,
+                    **WebhookManager.gitlab_hook_flags(event_types)
+                )
+                logger.info(f"События webhook {webhook_id} проекта {project_id} обновлены")
+                return True
+
+        except Exception as e:
+            logger.error(f"Ошибка при обновлении GitLab webhook: {e}")
+            return False
+
     @staticmethod
     async def setup_github_webhook(
             repo_full_name: str,
             github_token: str,
-            event_types: List[str]
+            event_types: List[str],
+            priority: Priority = Priority.DEFAULT
     ) -> Optional[int]:
         """
         Настройка webhook для репозитория GitHub
+
+        Уже существующий webhook с нашим URL переиспользуется, его события
+        приводятся к event_types.
         """
         if not settings.github_webhook_url:
             logger.warning("GitHub webhook URL не настроен")
             return None
 
+        github_events = WebhookManager.github_hook_events(event_types)
         try:
-            async with GitHubClient(github_token) as client:
+            async with GitHubClient(github_token, priority=priority) as client:
                 # Проверяем существование
                 owner, repo = repo_full_name.split("/", 1)
                 existing_hooks = await client.get_repository_hooks(owner, repo)
@@ -83,38 +151,15 @@ class WebhookManager:
                     hook_config = hook.get("config", {})
                     if hook_config.get("url") == settings.github_webhook_url:
                         logger.info(f"Webhook для репозитория {repo_full_name} уже существует")
+                        await client.update_repository_hook(owner, repo, hook["id"], github_events)
                         return hook.get("id")
 
-                # Маппинг типов событий
-                github_events = []
-                if "workflow" in event_types:
-                    github_events.append("workflow_run")
-                if "pull_request" in event_types:
-                    github_events.append("pull_request")
-                if "issue" in event_types:
-                    github_events.append("issues")
-                if "comment" in event_types:
-                    github_events.extend(["issue_comment", "pull_request_review_comment"])
-                if "star" in event_types:
-                    github_events.append("star")
-
                 # Создаем новый
-                webhook_config = {
-                    "name": "web",
-                    "active": True,
-                    "events": github_events if github_events else ["push"],
-                    "config": {
-                        "url": settings.github_webhook_url,
-                        "content_type": "json",
-                        "insecure_ssl": "0",
-                    }
-                }
-
                 webhook = await client.create_repository_hook(
                     owner=owner,
                     repo=repo,
                     url=settings.github_webhook_url,
-                    events=github_events if github_events else ["push"],
+                    events=github_events,
                     secret=getattr(settings, 'github_webhook_secret', None)
                 )
 
@@ -128,23 +173,45 @@ class WebhookManager:
             logger.error(f"Ошибка при создании GitHub webhook: {e}")
             return None
 
+    @staticmethod
+    async def update_github_webhook(
+            repo_full_name: str,
+            webhook_id: int,
+            github_token: str,
+            event_types: List[str],
+            priority: Priority = Priority.DEFAULT
+    ) -> bool:
+        """
+        Изменение событий webhook репозитория GitHub
+        """
+        try:
+            async with GitHubClient(github_token, priority=priority) as client:
+                owner, repo = repo_full_name.split("/", 1)
+                await client.update_repository_hook(
+                    owner, repo, webhook_id, WebhookManager.github_hook_events(event_types)
+                )
+                logger.info(f"События webhook {webhook_id} репозитория {repo_full_name} обновлены")
+                return True
+
+        except Exception as e:
+            logger.error(f"Ошибка при обновлении GitHub webhook: {e}")
+            return False
+
     @staticmethod
     async def remove_gitlab_webhook(
             project_id: str,
             webhook_id: int,
-            gitlab_token: str
+            gitlab_token: str,
+            priority: Priority = Priority.DEFAULT
     ) -> bool:
         """
         Удаление webhook из проекта GitLab
         """
         try:
-            async with GitLabClient(settings.gitlab_url, gitlab_token) as client:
-                success = await client.delete_project_hook(project_id, webhook_id)
-
-                if success:
-                    logger.success(f"Webhook {webhook_id} удален из проекта {project_id}")
-
-                return success
+            async with GitLabClient(settings.gitlab_url, gitlab_token, priority=priority) as client:
+                await client.delete_project_hook(project_id, webhook_id)
+                logger.success(f"Webhook {webhook_id} удален из проекта {project_id}")
+                return True
 
         except Exception as e:
             logger.error(f"Ошибка при удалении GitLab webhook: {e}")
@@ -154,20 +221,427 @@ class WebhookManager:
     async def remove_github_webhook(
             repo_full_name: str,
             webhook_id: int,
-            github_token: str
+            github_token: str,
+            priority: Priority = Priority.DEFAULT
     ) -> bool:
         """
         Удаление webhook из репозитория GitHub
         """
         try:
-            async with GitHubClient(github_token) as client:
-                success = await client.delete_repository_hook(repo_full_name, webhook_id)
-
-                if success:
-                    logger.success(f"Webhook {webhook_id} удален из репозитория {repo_full_name}")
-
-                return success
+            async with GitHubClient(github_token, priority=priority) as client:
+                owner, repo = repo_full_name.split("/", 1)
+                await client.delete_repository_hook(owner, repo, webhook_id)
+                logger.success(f"Webhook {webhook_id} удален из репозитория {repo_full_name}")
+                return True
 
         except Exception as e:
             logger.error(f"Ошибка при удалении GitHub webhook: {e}")
             return False
+
+    @staticmethod
+    async def setup_webhook(
+            platform: str,
+            project_id: str,
+            token: str,
+            event_types: List[str],
+            priority: Priority = Priority.DEFAULT
+    ) -> Optional[int]:
+        """Создание webhook на платформе"""
+        if platform == "gitlab":
+            return await WebhookManager.setup_gitlab_webhook(project_id, token, event_types, priority)
+        return await WebhookManager.setup_github_webhook(project_id, token, event_types, priority)
+
+    @staticmethod
+    async def update_webhook(
+            platform: str,
+            project_id: str,
+            webhook_id: int,
+            token: str,
+            event_types: List[str],
+            priority: Priority = Priority.DEFAULT
+    ) -> bool:
+        """Изменение событий webhook на платформе"""
+        if platform == "gitlab":
+            return await WebhookManager.update_gitlab_webhook(project_id, webhook_id, token, event_types, priority)
+        return await WebhookManager.update_github_webhook(project_id, webhook_id, token, event_types, priority)
+
+    @staticmethod
+    async def remove_webhook(
+            platform: str,
+            project_id: str,
+            webhook_id: int,
+            token: str,
+            priority: Priority = Priority.DEFAULT
+    ) -> bool:
+        """Удаление webhook на платформе"""
+        if platform == "gitlab":
+            return await WebhookManager.remove_gitlab_webhook(project_id, webhook_id, token, priority)
+        return await WebhookManager.remove_github_webhook(project_id, webhook_id, token, priority)
+
+
+@dataclass
+class ReconcileReport:
+    """Итог сверки webhooks"""
+    projects: int = 0
+    unchanged: int = 0
+    created: int = 0
+    updated: int = 0
+    deleted: int = 0
+    failed: int = 0
+    api_calls: int = 0
+    fetch_time: float = 0.0
+    apply_time: float = 0.0
+    duration: float = 0.0
+    errors: List[str] = field(default_factory=list)
+
+    def format(self) -> str:
+        """Текстовый отчет для лога/консоли"""
+        lines = [
+            f"Проектов: {self.projects}, без изменений: {self.unchanged}",
+            f"Создано: {self.created}, обновлено: {self.updated}, удалено: {self.deleted}, ошибок: {self.failed}",
+            f"Запросов к API: {self.api_calls}",
+            f"Время: {self.duration:.2f}с (чтение {self.fetch_time:.2f}с, изменения {self.apply_time:.2f}с)",
+        ]
+        lines.extend(f"  {error}" for error in self.errors)
+        return "\n".join(lines)
+
+
+@dataclass
+class ProjectPlan:
+    """Желаемое и фактическое состояние webhooks одного проекта"""
+    platform: str
+    project_id: str
+    event_types: List[str]
+    # Токены подписчиков, затем токен администратора
+    tokens: List[str] = field(default_factory=list)
+    # ID webhooks, известные по реестру и подпискам
+    known_ids: Set[str] = field(default_factory=set)
+    has_registry: bool = False
+    token: Optional[str] = None
+    hooks: Optional[List[Dict[str, Any]]] = None
+    keep_id: Optional[str] = None
+    create: bool = False
+    update: bool = False
+    delete_ids: List[str] = field(default_factory=list)
+    update_failed: bool = False
+    delete_failed: bool = False
+
+    @property
+    def changed(self) -> bool:
+        return self.create or self.update or bool(self.delete_ids)
+
+
+class HookReconciler:
+    """
+    Сверка webhooks всех проектов, на которые есть подписки или записи реестра
+
+    Webhooks читаются параллельно фоновыми запросами (Priority.BACKGROUND),
+    поэтому сверка не расходует резерв лимита API, оставленный для действий
+    пользователей. Наш webhook определяется по URL или по ID из БД; лишние
+    (дубли и webhooks проектов без подписок) удаляются, отсутствующие
+    создаются, отличающиеся URL или событиями - обновляются. Секрет API не
+    возвращает, поэтому он передается при каждом обновлении, а rotate_secret
+    обновляет все webhooks.
+    """
+
+    def __init__(
+            self,
+            session_factory: async_sessionmaker = AsyncSessionLocal,
+            concurrency: Optional[int] = None,
+            dry_run: bool = False,
+            rotate_secret: bool = False
+    ):
+        self.session_factory = session_factory
+        self.concurrency = concurrency or settings.webhook_reconcile_concurrency
+        self.dry_run = dry_run
+        self.rotate_secret = rotate_secret
+        self.report = ReconcileReport()
+
+    @staticmethod
+    def desired_url(platform: str) -> str:
+        return settings.gitlab_webhook_url if platform == "gitlab" else settings.github_webhook_url
+
+    @staticmethod
+    def desired_secret(platform: str) -> Optional[str]:
+        secret = settings.gitlab_webhook_secret if platform == "gitlab" else settings.github_webhook_secret
+        return secret or None
+
+    @staticmethod
+    def desired_events(platform: str, event_types: List[str]) -> Any:
+        """События в том виде, в котором их возвращает API"""
+        if platform == "gitlab":
+            return WebhookManager.gitlab_hook_flags(event_types)
+        return sorted(WebhookManager.github_hook_events(event_types))
+
+    async def run(self) -> ReconcileReport:
+        """Полная сверка: чтение БД, чтение webhooks, изменения, запись в БД"""
+        started = time.perf_counter()
+        async with self.session_factory() as session:
+            plans = await self._load_plans(session)
+        self.report.projects = len(plans)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def limited(coro_func, plan: ProjectPlan):
+            async with semaphore:
+                await coro_func(plan)
+
+        fetch_started = time.perf_counter()
+        await asyncio.gather(*(limited(self._fetch, plan) for plan in plans))
+        self.report.fetch_time = time.perf_counter() - fetch_started
+
+        for plan in plans:
+            if plan.hooks is not None:
+                self._diff(plan)
+        fetched = [plan for plan in plans if plan.hooks is not None]
+        self.report.unchanged = sum(1 for plan in fetched if not plan.changed)
+
+        if not self.dry_run:
+            apply_started = time.perf_counter()
+            await asyncio.gather(*(limited(self._apply, plan) for plan in fetched if plan.changed))
+            self.report.apply_time = time.perf_counter() - apply_started
+            async with self.session_factory() as session:
+                await self._store(session, fetched)
+        else:
+            for plan in fetched:
+                self.report.created += plan.create
+                self.report.updated += plan.update
+                self.report.deleted += len(plan.delete_ids)
+
+        self.report.duration = time.perf_counter() - started
+        logger.info(f"Сверка webhooks{' (dry-run)' if self.dry_run else ''}:\n{self.report.format()}")
+        return self.report
+
+    async def _load_plans(self, session: AsyncSession) -> List[ProjectPlan]:
+        """Проекты с активными подписками и записями реестра"""
+        plans: Dict[Tuple[str, str], ProjectPlan] = {}
+        rows = await session.execute(
+            select(
+                Subscription.platform, Subscription.project_id, Subscription.event_types,
+                Subscription.webhook_id, User.gitlab_token, User.github_token
+            )
+            .join(User, User.telegram_id == Subscription.user_id)
+            .where(Subscription.is_active == True)
+        )
+        merged: Dict[Tuple[str, str], Set[str]] = {}
+        for platform, project_id, event_types, webhook_id, gitlab_token, github_token in rows:
+            key = (platform, project_id)
+            plan = plans.get(key)
+            if plan is None:
+                plan = plans[key] = ProjectPlan(platform, project_id, [])
+                merged[key] = set()
+            merged[key].update(event for event in event_types.split(",") if event)
+            token = gitlab_token if platform == "gitlab" else github_token
+            if token and token not in plan.tokens:
+                plan.tokens.append(token)
+            if webhook_id:
+                plan.known_ids.add(webhook_id)
+        for key, events in merged.items():
+            plans[key].event_types = sorted(events)
+
+        for hook in (await session.execute(select(ProjectHook))).scalars():
+            key = (hook.platform, hook.project_id)
+            plan = plans.get(key)
+            if plan is None:
+                # Webhook проекта без подписок: подлежит удалению
+                plan = plans[key] = ProjectPlan(hook.platform, hook.project_id, [])
+            plan.has_registry = True
+            if hook.hook_id:
+                plan.known_ids.add(hook.hook_id)
+
+        for plan in plans.values():
+            admin_token = settings.gitlab_private_token if plan.platform == "gitlab" else settings.github_token
+            if admin_token and admin_token not in plan.tokens:
+                plan.tokens.append(admin_token)
+        return list(plans.values())
+
+    def _client(self, platform: str, token: str):
+        if platform == "gitlab":
+            return GitLabClient(settings.gitlab_url, token, priority=Priority.BACKGROUND)
+        return GitHubClient(token, priority=Priority.BACKGROUND)
+
+    async def _fetch(self, plan: ProjectPlan) -> None:
+        """Webhooks проекта: первым токеном, у которого есть доступ"""
+        if not plan.tokens:
+            self._fail(plan, "нет токена с доступом к проекту")
+            return
+        last_error: Optional[Exception] = None
+        for token in plan.tokens:
+            self.report.api_calls += 1
+            try:
+                async with self._client(plan.platform, token) as client:
+                    if plan.platform == "gitlab":
+                        hooks = await client.get_project_hooks(plan.project_id)
+                    else:
+                        owner, repo = plan.project_id.split("/", 1)
+                        hooks = await client.get_repository_hooks(owner, repo)
+            except Exception as e:
+                last_error = e
+                continue
+            plan.token = token
+            plan.hooks = [self._normalize(plan.platform, hook) for hook in hooks or []]
+            return
+        self._fail(plan, f"не удалось получить webhooks: {last_error}")
+
+    def _normalize(self, platform: str, hook: Dict[str, Any]) -> Dict[str, Any]:
+        """ID, URL и события webhook в сравнимом виде"""
+        if platform == "gitlab":
+            flags = WebhookManager.gitlab_hook_flags([])
+            return {
+                "id": str(hook["id"]),
+                "url": hook.get("url"),
+                "events": {name: bool(hook.get(name)) for name in flags},
+            }
+        return {
+            "id": str(hook["id"]),
+            "url": hook.get("config", {}).get("url"),
+            "events": sorted(hook.get("events", [])),
+        }
+
+    def _diff(self, plan: ProjectPlan) -> None:
+        """Действия, приводящие webhooks проекта к желаемому состоянию"""
+        url = self.desired_url(plan.platform)
+        ours = [hook for hook in plan.hooks if hook["url"] == url or hook["id"] in plan.known_ids]
+        if not plan.event_types:
+            plan.delete_ids = [hook["id"] for hook in ours]
+            return
+
+        # Предпочтение webhook с нужным URL, остальные наши - дубли
+        ours.sort(key=lambda hook: hook["url"] != url)
+        if not ours:
+            plan.create = True
+            return
+        keep, duplicates = ours[0], ours[1:]
+        plan.keep_id = keep["id"]
+        plan.delete_ids = [hook["id"] for hook in duplicates]
+        plan.update = (
+            self.rotate_secret
+            or keep["url"] != url
+            or keep["events"] != self.desired_events(plan.platform, plan.event_types)
+        )
+
+    async def _apply(self, plan: ProjectPlan) -> None:
+        """Создание, изменение и удаление webhooks проекта"""
+        url = self.desired_url(plan.platform)
+        secret = self.desired_secret(plan.platform)
+        events = self.desired_events(plan.platform, plan.event_types)
+        async with self._client(plan.platform, plan.token) as client:
+            if plan.platform == "github":
+                owner, repo = plan.project_id.split("/", 1)
+
+            if plan.create:
+                self.report.api_calls += 1
+                try:
+                    if plan.platform == "gitlab":
+                        hook = await client.create_project_hook(plan.project_id, url, token=secret, **events)
+                    else:
+                        hook = await client.create_repository_hook(owner, repo, url, events, secret)
+                    plan.keep_id = str(hook["id"])
+                    self.report.created += 1
+                except Exception as e:
+                    plan.create = False
+                    self._fail(plan, f"создание: {e}")
+
+            if plan.update:
+                self.report.api_calls += 1
+                try:
+                    if plan.platform == "gitlab":
+                        await client.update_project_hook(plan.project_id, int(plan.keep_id), url, secret, **events)
+                    else:
+                        await client.update_repository_hook(
+                            owner, repo, int(plan.keep_id), events, url=url, secret=secret
+                        )
+                    self.report.updated += 1
+                except Exception as e:
+                    plan.update_failed = True
+                    self._fail(plan, f"обновление {plan.keep_id}: {e}")
+
+            deleted = []
+            for hook_id in plan.delete_ids:
+                self.report.api_calls += 1
+                try:
+                    if plan.platform == "gitlab":
+                        await client.delete_project_hook(plan.project_id, int(hook_id))
+                    else:
+                        await client.delete_repository_hook(owner, repo, int(hook_id))
+                    deleted.append(hook_id)
+                    self.report.deleted += 1
+                except Exception as e:
+                    plan.delete_failed = True
+                    self._fail(plan, f"удаление {hook_id}: {e}")
+            plan.delete_ids = deleted
+
+    async def _store(self, session: AsyncSession, plans: List[ProjectPlan]) -> None:
+        """Запись итоговых ID webhooks в реестр и подписки одной транзакцией"""
+        for plan in plans:
+            result = await session.execute(
+                select(ProjectHook).where(
+                    ProjectHook.platform == plan.platform,
+                    ProjectHook.project_id == plan.project_id
+                )
+            )
+            hook = result.scalar_one_or_none()
+
+            if not plan.event_types:
+                # При ошибке удаления запись остается до следующей сверки
+                if hook is not None and not plan.delete_failed:
+                    await session.delete(hook)
+                continue
+
+            if plan.keep_id is None:
+                continue
+            if hook is None:
+                hook = ProjectHook(platform=plan.platform, project_id=plan.project_id)
+                session.add(hook)
+            hook.hook_id = plan.keep_id
+            # События не подтверждены: следующая синхронизация обновит webhook
+            hook.event_types = "" if plan.update_failed else ",".join(plan.event_types)
+            hook.ref_count = await self._count_subscriptions(session, plan)
+
+            await session.execute(
+                update(Subscription)
+                .where(
+                    Subscription.platform == plan.platform,
+                    Subscription.project_id == plan.project_id,
+                    Subscription.is_active == True
+                )
+                .values(webhook_id=plan.keep_id)
+            )
+        await session.commit()
+
+    @staticmethod
+    async def _count_subscriptions(session: AsyncSession, plan: ProjectPlan) -> int:
+        result = await session.execute(
+            select(Subscription.id).where(
+                Subscription.platform == plan.platform,
+                Subscription.project_id == plan.project_id,
+                Subscription.is_active == True
+            )
+        )
+        return len(result.all())
+
+    def _fail(self, plan: ProjectPlan, message: str) -> None:
+        self.report.failed += 1
+        error = f"{plan.platform}:{plan.project_id}: {message}"
+        self.report.errors.append(error)
+        logger.error(f"Сверка webhooks, {error}")
+
+
+async def reconcile_webhooks(dry_run: bool = False, rotate_secret: bool = False) -> ReconcileReport:
+    """Сверка webhooks всех подписанных проектов"""
+    return await HookReconciler(dry_run=dry_run, rotate_secret=rotate_secret).run()
+
+
+async def _main() -> None:
+    parser = argparse.ArgumentParser(description="Сверка webhooks GitLab/GitHub с подписками")
+    parser.add_argument("--dry-run", action="store_true", help="только показать изменения")
+    parser.add_argument("--rotate-secret", action="store_true", help="заново записать секрет во все webhooks")
+    args = parser.parse_args()
+    try:
+        report = await reconcile_webhooks(dry_run=args.dry_run, rotate_secret=args.rotate_secret)
+    finally:
+        await close_http_sessions()
+    print(report.format())
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
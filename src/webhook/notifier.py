@@ -1,25 +1,620 @@
 """
 Модуль для отправки уведомлений пользователям с поддержкой тредов
+
+Сообщения отправляются через DeliveryEngine: параллельно в пределах общего
+лимита Telegram (~30 сообщений/сек), не чаще ~1 сообщения/сек в один чат,
+с повтором после 429 (TelegramRetryAfter) через указанное сервером время.
 """
 
+import asyncio
+import heapq
 import json
-from typing import Dict, List, Any, Optional
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
 from loguru import logger
 from aiogram import Bot
-from aiogram.exceptions import TelegramAPIError
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
+from aiogram.exceptions import TelegramAPIError, TelegramRetryAfter
+from aiogram.types import Message
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.config import settings
+from src.database import AsyncSessionLocal, Notification
+from src.metrics import NOTIFICATIONS_SENT, TELEGRAM_ERRORS, current_event
+
+# Окно расчета пропускной способности (сек)
+THROUGHPUT_WINDOW = 10.0
+
+# События-комментарии, которые отправляются ответом в тред
+THREADED_EVENT_TYPES = ("note", "issue_comment")
+
+
+class DeliveryDropped(Exception):
+    """Сообщение не отправлено: очередь переполнена или исчерпаны повторы"""
+
+
+class TokenBucket:
+    """Корзина токенов: rate токенов в секунду, не больше capacity подряд"""
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Время до появления свободного токена (сек)"""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self, now: float) -> None:
+        self._refill(now)
+        self.tokens -= 1
+
+    def is_full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+@dataclass
+class Delivery:
+    """Сообщение в очереди отправки"""
+
+    chat_id: int
+    kwargs: Dict[str, Any]
+    future: asyncio.Future
+    attempts: int = 0
+    submitted_at: float = field(default_factory=time.monotonic)
+
+
+class DeliveryEngine:
+    """
+    Отправка сообщений Telegram с глобальным и per-chat ограничением скорости
+
+    Сообщения одного чата отправляются по порядку, разные чаты - параллельно.
+    """
+
+    def __init__(
+            self,
+            bot: Bot,
+            global_rate: float = 30.0,
+            chat_rate: float = 1.0,
+            chat_burst: int = 1,
+            concurrency: int = 30,
+            max_retries: int = 5,
+            max_pending: int = 10_000
+    ):
+        """
+        Args:
+            bot: Экземпляр бота
+            global_rate: Сообщений в секунду для всего бота
+            chat_rate: Сообщений в секунду в один чат
+            chat_burst: Сообщений подряд в один чат без ожидания
+            concurrency: Максимум одновременных запросов
+            max_retries: Повторы после TelegramRetryAfter
+            max_pending: Максимум сообщений в очереди
+        """
+        self.bot = bot
+        self.global_rate = global_rate
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.max_pending = max_pending
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.dropped = 0
+        self._sent_times: Deque[float] = deque()
+
+    def _reset(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+        self._global = TokenBucket(self.global_rate, capacity=max(1.0, self.global_rate))
+        self._chat_buckets: Dict[int, TokenBucket] = {}
+        self._chats: Dict[int, Deque[Delivery]] = {}
+        # (время, порядковый номер, chat_id); чат в куче не больше одного раза
+        self._ready: List[Tuple[float, int, int]] = []
+        self._seq = 0
+        self._pending = 0
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._wakeup = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._last_prune = time.monotonic()
+        self._dispatcher = loop.create_task(self._dispatch_loop(), name="telegram-delivery")
+
+    def _ensure_started(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._dispatcher is None or self._dispatcher.done():
+            self._reset(loop)
+
+    @property
+    def pending(self) -> int:
+        """Сообщения, ожидающие отправки (включая отправляемые)"""
+        return self._pending if self._loop else 0
+
+    def submit(self, chat_id: int, **kwargs: Any) -> asyncio.Future:
+        """
+        Постановка сообщения в очередь
+
+        Args:
+            chat_id: ID чата
+            **kwargs: Параметры Bot.send_message
+
+        Returns:
+            Future с отправленным Message
+        """
+        self._ensure_started()
+
+        if self._pending >= self.max_pending:
+            self.dropped += 1
+            raise DeliveryDropped(f"Delivery queue is full ({self._pending})")
+
+        delivery = Delivery(chat_id=chat_id, kwargs=kwargs, future=self._loop.create_future())
+        queue = self._chats.get(chat_id)
+        if queue is None:
+            queue = self._chats[chat_id] = deque()
+            self._schedule(chat_id, time.monotonic())
+        queue.append(delivery)
+
+        self._pending += 1
+        self._idle.clear()
+        return delivery.future
+
+    async def send_message(self, chat_id: int, text: str, **kwargs: Any) -> Message:
+        """Отправка сообщения с учетом ограничений"""
+        return await self.submit(chat_id, text=text, **kwargs)
+
+    def _schedule(self, chat_id: int, at: float) -> None:
+        self._seq += 1
+        heapq.heappush(self._ready, (at, self._seq, chat_id))
+        self._wakeup.set()
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = self._chat_buckets[chat_id] = TokenBucket(self.chat_rate, capacity=self.chat_burst)
+        return bucket
+
+    def _prune_buckets(self, now: float) -> None:
+        # Полная корзина неактивного чата ничем не отличается от новой
+        if now - self._last_prune < 60.0:
+            return
+        self._last_prune = now
+        for chat_id in [c for c, b in self._chat_buckets.items() if c not in self._chats and b.is_full(now)]:
+            del self._chat_buckets[chat_id]
+
+    async def _next_ready(self) -> int:
+        """Ожидание чата, в который уже можно отправить сообщение"""
+        while True:
+            if not self._ready:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            at, _, chat_id = self._ready[0]
+            now = time.monotonic()
+            chat_delay = self._chat_bucket(chat_id).delay(now)
+            if chat_delay > 0 and at <= now:
+                # Чат упирается в свой лимит: переносим его, чтобы не задерживать другие чаты
+                self._seq += 1
+                heapq.heapreplace(self._ready, (now + chat_delay, self._seq, chat_id))
+                continue
+
+            wait = max(at - now, chat_delay, self._global.delay(now))
+            if wait <= 0:
+                heapq.heappop(self._ready)
+                return chat_id
+
+            # Новое сообщение в другой чат может быть готово раньше
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _dispatch_loop(self) -> None:
+        while True:
+            await self._slots.acquire()
+            chat_id = await self._next_ready()
+
+            now = time.monotonic()
+            self._global.take(now)
+            self._chat_bucket(chat_id).take(now)
+            self._prune_buckets(now)
+
+            task = asyncio.create_task(self._send(self._chats[chat_id][0]))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, delivery: Delivery) -> None:
+        try:
+            try:
+                message = await self.bot.send_message(chat_id=delivery.chat_id, **delivery.kwargs)
+            except TelegramRetryAfter as e:
+                TELEGRAM_ERRORS.inc("TelegramRetryAfter")
+                delivery.attempts += 1
+                if delivery.attempts > self.max_retries:
+                    self.dropped += 1
+                    logger.error(f"Dropping message to chat {delivery.chat_id} after {delivery.attempts} attempts: {e}")
+                    self._finish(delivery, exception=DeliveryDropped(str(e)))
+                    return
+
+                self.retried += 1
+                logger.warning(f"Telegram flood control for chat {delivery.chat_id}, retry in {e.retry_after}s")
+                # Сообщение остается первым в очереди чата
+                self._schedule(delivery.chat_id, time.monotonic() + e.retry_after)
+                return
+            except Exception as e:
+                self.failed += 1
+                TELEGRAM_ERRORS.inc(type(e).__name__)
+                self._finish(delivery, exception=e)
+                return
+
+            self.sent += 1
+            self._sent_times.append(time.monotonic())
+            self._finish(delivery, result=message)
+        finally:
+            self._slots.release()
+
+    def _finish(self, delivery: Delivery, result: Any = None, exception: Optional[BaseException] = None) -> None:
+        queue = self._chats[delivery.chat_id]
+        queue.popleft()
+        if queue:
+            # Следующее сообщение чата - не раньше, чем позволит его корзина
+            now = time.monotonic()
+            self._schedule(delivery.chat_id, now + self._chat_bucket(delivery.chat_id).delay(now))
+        else:
+            del self._chats[delivery.chat_id]
+
+        self._pending -= 1
+        if not self._pending:
+            self._idle.set()
+
+        if not delivery.future.done():
+            if exception is not None:
+                delivery.future.set_exception(exception)
+            else:
+                delivery.future.set_result(result)
+
+    async def stop(self, timeout: float = 30.0) -> None:
+        """
+        Остановка с дожиданием отправки очереди
+
+        Args:
+            timeout: Максимальное время ожидания
+        """
+        if self._dispatcher is None:
+            return
+
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Telegram delivery queue drain timed out, {self._pending} messages dropped")
+
+        self._dispatcher.cancel()
+        await asyncio.gather(self._dispatcher, *self._tasks, return_exceptions=True)
+        self._dispatcher = None
+
+        for queue in self._chats.values():
+            for delivery in queue:
+                self.dropped += 1
+                if not delivery.future.done():
+                    delivery.future.set_exception(DeliveryDropped("Delivery engine stopped"))
+        self._chats.clear()
+        self._ready.clear()
+        self._pending = 0
+
+    def throughput(self) -> float:
+        """Отправлено сообщений в секунду за последние THROUGHPUT_WINDOW секунд"""
+        border = time.monotonic() - THROUGHPUT_WINDOW
+        while self._sent_times and self._sent_times[0] < border:
+            self._sent_times.popleft()
+        return len(self._sent_times) / THROUGHPUT_WINDOW
+
+    def stats(self) -> Dict[str, Any]:
+        """Статистика отправки"""
+        return {
+            "pending": self.pending,
+            "inflight": len(self._tasks),
+            "chats": len(self._chats) if self._loop else 0,
+            "sent": self.sent,
+            "retried": self.retried,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "throughput_per_sec": round(self.throughput(), 2),
+        }
+
+
+class NotificationHistoryWriter:
+    """
+    Пакетная запись истории отправленных уведомлений
+
+    Строки одного или нескольких событий, пришедшие в пределах flush_interval,
+    сохраняются одним многострочным INSERT в одной транзакции. При ошибке
+    запись повторяется без повторной отправки сообщений.
+    """
 
-from src.database import Notification
+    def __init__(
+            self,
+            session_factory: async_sessionmaker,
+            flush_interval: float = 0.05,
+            batch_size: int = 500,
+            max_retries: int = 5,
+            retry_delay: float = 0.5
+    ):
+        """
+        Args:
+            session_factory: Фабрика сессий БД
+            flush_interval: Время накопления пакета (сек)
+            batch_size: Размер пакета, при котором запись начинается без ожидания
+            max_retries: Повторы записи при ошибке БД
+            retry_delay: Начальная задержка между повторами (сек), удваивается
+        """
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._pending: List[Tuple[List[Dict[str, Any]], asyncio.Future]] = []
+        self._pending_rows = 0
+        self._closing = False
+
+        self.written = 0
+        self.flushes = 0
+        self.retries = 0
+        self.dropped = 0
+
+    def _ensure_started(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._flusher is None or self._flusher.done():
+            self._loop = loop
+            self._pending = []
+            self._pending_rows = 0
+            self._closing = False
+            self._wakeup = asyncio.Event()
+            self._flusher = loop.create_task(self._flush_loop(), name="notification-history-writer")
+
+    async def write(self, rows: List[Dict[str, Any]]) -> bool:
+        """
+        Сохранение строк истории
+
+        Возвращает управление после коммита пакета, в который попали строки.
+
+        Args:
+            rows: Значения колонок Notification
+
+        Returns:
+            False, если строки не удалось сохранить после всех повторов
+        """
+        if not rows:
+            return True
+
+        self._ensure_started()
+        future = self._loop.create_future()
+        self._pending.append((rows, future))
+        self._pending_rows += len(rows)
+        self._wakeup.set()
+        return await future
+
+    async def _flush_loop(self) -> None:
+        # Задача создается внутри обработки первого события и унаследовала бы его метку
+        current_event.set("notification_history")
+        while True:
+            await self._wakeup.wait()
+            # Копим пакет, если он еще не набрался
+            if self._pending_rows < self.batch_size and not self._closing:
+                await asyncio.sleep(self.flush_interval)
+            self._wakeup.clear()
+            await self._flush()
+            # Выход только после записи всего, что пришло до и во время остановки
+            if self._closing and not self._pending:
+                return
+
+    async def _flush(self) -> None:
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, []
+        self._pending_rows = 0
+        rows = [row for batch_rows, _ in batch for row in batch_rows]
+
+        persisted = False
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self.session_factory() as session:
+                    await session.execute(insert(Notification), rows)
+                    await session.commit()
+                persisted = True
+                break
+            except Exception as e:
+                if attempt == self.max_retries:
+                    logger.error(f"Failed to save {len(rows)} notifications after {attempt + 1} attempts: {e}")
+                    break
+                self.retries += 1
+                logger.warning(f"Failed to save {len(rows)} notifications, retrying: {e}")
+                await asyncio.sleep(self.retry_delay * 2 ** attempt)
+
+        if persisted:
+            self.flushes += 1
+            self.written += len(rows)
+        else:
+            self.dropped += len(rows)
+
+        for _, future in batch:
+            if not future.done():
+                future.set_result(persisted)
+
+    async def stop(self) -> None:
+        """
+        Запись накопленных строк и остановка
+
+        Задача записи не отменяется: отмена посреди _flush теряла пакет,
+        уже снятый с _pending, и его write() не завершались. Вместо этого
+        задача дописывает очередь и завершается сама.
+        """
+        if self._flusher is None:
+            return
+
+        self._closing = True
+        self._wakeup.set()
+        await asyncio.gather(self._flusher, return_exceptions=True)
+        self._flusher = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Статистика записи истории"""
+        return {
+            "pending": self._pending_rows,
+            "written": self.written,
+            "flushes": self.flushes,
+            "retries": self.retries,
+            "dropped": self.dropped,
+        }
+
+
+history_writer = NotificationHistoryWriter(
+    AsyncSessionLocal,
+    flush_interval=settings.notification_flush_interval,
+    max_retries=settings.notification_flush_retries
+)
 
 # Хранит экземпляр бота
 _bot_instance: Optional[Bot] = None
+_delivery_engine: Optional[DeliveryEngine] = None
 
 
 def set_bot_instance(bot: Bot):
     """Установка экземпляра бота"""
-    global _bot_instance
+    global _bot_instance, _delivery_engine
     _bot_instance = bot
+    _delivery_engine = DeliveryEngine(
+        bot,
+        global_rate=settings.telegram_global_rate,
+        chat_rate=settings.telegram_chat_rate,
+        chat_burst=settings.telegram_chat_burst,
+        concurrency=settings.telegram_send_concurrency,
+        max_retries=settings.telegram_max_retries,
+        max_pending=settings.telegram_delivery_queue_size
+    )
+
+
+def get_delivery_engine() -> Optional[DeliveryEngine]:
+    """Текущий DeliveryEngine или None, если бот не установлен"""
+    return _delivery_engine
+
+
+async def stop_delivery_engine(timeout: float = 30.0) -> None:
+    """Отправка оставшихся сообщений и запись истории перед выходом"""
+    if _delivery_engine:
+        await _delivery_engine.stop(timeout=timeout)
+    await history_writer.stop()
+
+
+async def find_thread_parents(
+        session: AsyncSession,
+        keys: List[Tuple[int, str]]
+) -> Dict[Tuple[int, str], Tuple[int, int]]:
+    """
+    Последние отправленные уведомления по ключам тредов
+
+    Один запрос по индексу (user_id, thread_key) для всех получателей события.
+
+    Args:
+        keys: Пары (user_id, thread_key)
+
+    Returns:
+        (user_id, thread_key) -> (telegram_message_id, id уведомления)
+    """
+    if not keys:
+        return {}
+
+    user_ids = {user_id for user_id, _ in keys}
+    thread_keys = {key for _, key in keys}
+
+    latest = (
+        select(func.max(Notification.id))
+        .where(
+            Notification.user_id.in_(user_ids),
+            Notification.thread_key.in_(thread_keys),
+            Notification.telegram_message_id.isnot(None)
+        )
+        .group_by(Notification.user_id, Notification.thread_key)
+    )
+    result = await session.execute(
+        select(
+            Notification.id,
+            Notification.user_id,
+            Notification.thread_key,
+            Notification.telegram_message_id
+        ).where(Notification.id.in_(latest))
+    )
+    return {
+        (row.user_id, row.thread_key): (row.telegram_message_id, row.id)
+        for row in result.all()
+    }
+
+
+async def _deliver(
+        engine: DeliveryEngine,
+        user_id: int,
+        message: str,
+        reply_to_message_id: Optional[int]
+) -> Tuple[Optional[Message], bool]:
+    """
+    Отправка одного уведомления
+
+    Returns:
+        (отправленное сообщение или None, отправлено ли в треде)
+    """
+    try:
+        sent_message = await engine.send_message(
+            user_id,
+            message,
+            parse_mode="HTML",
+            reply_to_message_id=reply_to_message_id,
+            disable_web_page_preview=True
+        )
+        return sent_message, reply_to_message_id is not None
+
+    except TelegramAPIError as e:
+        logger.error(f"Failed to send message to user {user_id}: {e}")
+
+        # Если не удалось ответить в треде, отправляем как обычное сообщение
+        if reply_to_message_id:
+            try:
+                sent_message = await engine.send_message(
+                    user_id,
+                    message,
+                    parse_mode="HTML",
+                    disable_web_page_preview=True
+                )
+                logger.info(f"Sent notification without thread to user {user_id}")
+                return sent_message, False
+
+            except (TelegramAPIError, DeliveryDropped) as e2:
+                logger.error(f"Failed to send message without thread to user {user_id}: {e2}")
+
+    except DeliveryDropped as e:
+        logger.error(f"Message to user {user_id} dropped: {e}")
+
+    return None, False
 
 
 async def send_personalized_notifications(
@@ -28,133 +623,102 @@ async def send_personalized_notifications(
 ) -> None:
     """
     Отправка персонализированных уведомлений с поддержкой тредов
+
+    Треды определяются одним запросом по ключам тредов, затем все сообщения
+    отправляются параллельно через DeliveryEngine, и отправленные
+    уведомления сохраняются в историю одним многострочным INSERT.
     """
-    if not _bot_instance:
+    if not _delivery_engine:
         logger.error("Bot instance not set. Call set_bot_instance() first.")
         return
 
+    # Комментарии отправляются ответом на предыдущее сообщение того же MR/PR/Issue
+    thread_lookups = [
+        (notif_data["user_id"], notif_data["thread_key"])
+        for notif_data in notifications
+        if notif_data.get("event_type") in THREADED_EVENT_TYPES and notif_data.get("thread_key")
+    ]
+    try:
+        parents = await find_thread_parents(session, thread_lookups)
+    except Exception as e:
+        logger.error(f"Error looking up thread parents: {e}")
+        parents = {}
+
+    prepared = []
     for notif_data in notifications:
         try:
-            user_id = notif_data["user_id"]
-            message = notif_data["message"]
-            platform = notif_data["platform"]
-            event_type = notif_data["event_type"]
-            project_name = notif_data["project_name"]
             metadata = notif_data.get("metadata", "{}")
+            thread_key = notif_data.get("thread_key")
 
-            # Парсим метаданные
-            meta = json.loads(metadata) if isinstance(metadata, str) else metadata
-
-            # Определяем, нужно ли отвечать в треде
-            reply_to_message_id = None
-            parent_notification_id = None
-
-            # Для комментариев ищем родительское уведомление
-            if event_type == "note":
-                noteable_id = meta.get("noteable_id")
-                noteable_type = meta.get("noteable_type")
-
-                if noteable_id and noteable_type:
-                    result = await session.execute(
-                        select(Notification).where(
-                            Notification.user_id == user_id,
-                            Notification.platform == platform,
-                            Notification.project_name == project_name
-                        ).order_by(Notification.sent_at.desc()).limit(10)
-                    )
-                    previous_notifications = result.scalars().all()
-
-                    # Ищем предыдущее уведомление по этому MR/Issue
-                    for prev_notif in previous_notifications:
-                        if prev_notif.meta_data:
-                            prev_meta = json.loads(prev_notif.meta_data)
-
-                            # Проверяем, относится ли к тому же MR/Issue
-                            if (prev_meta.get("noteable_id") == noteable_id or
-                                    prev_meta.get("mr_iid") == meta.get("mr_iid") or
-                                    prev_meta.get("issue_iid") == meta.get("issue_iid")):
-                                reply_to_message_id = prev_notif.telegram_message_id
-                                parent_notification_id = prev_notif.id
-                                break
-
-            # Отправляем сообщение
-            try:
-                sent_message = await _bot_instance.send_message(
-                    chat_id=user_id,
-                    text=message,
-                    parse_mode="HTML",
-                    reply_to_message_id=reply_to_message_id,
-                    disable_web_page_preview=True
-                )
-
-                # Сохраняем в БД
-                notification = Notification(
-                    user_id=user_id,
-                    platform=platform,
-                    event_type=event_type,
-                    project_name=project_name,
-                    message=message,
-                    telegram_message_id=sent_message.message_id,
-                    parent_notification_id=parent_notification_id,
-                    metadata=metadata if isinstance(metadata, str) else json.dumps(metadata)
+            reply_to_message_id, parent_notification_id = None, None
+            if notif_data["event_type"] in THREADED_EVENT_TYPES and thread_key:
+                reply_to_message_id, parent_notification_id = parents.get(
+                    (notif_data["user_id"], thread_key), (None, None)
                 )
 
-                session.add(notification)
-                await session.commit()
+            prepared.append((notif_data, metadata, reply_to_message_id, parent_notification_id))
 
-                logger.info(f"Sent personalized notification to user {user_id}, event: {event_type}")
-
-            except TelegramAPIError as e:
-                logger.error(f"Failed to send message to user {user_id}: {e}")
+        except Exception as e:
+            logger.error(f"Error preparing personalized notification: {e}")
 
-                # Если не удалось ответить в треде, отправляем как обычное сообщение
-                if reply_to_message_id:
-                    try:
-                        sent_message = await _bot_instance.send_message(
-                            chat_id=user_id,
-                            text=message,
-                            parse_mode="HTML",
-                            disable_web_page_preview=True
-                        )
+    results = await asyncio.gather(*[
+        _deliver(_delivery_engine, notif_data["user_id"], notif_data["message"], reply_to_message_id)
+        for notif_data, _, reply_to_message_id, _ in prepared
+    ], return_exceptions=True)
 
-                        notification = Notification(
-                            user_id=user_id,
-                            platform=platform,
-                            event_type=event_type,
-                            project_name=project_name,
-                            message=message,
-                            telegram_message_id=sent_message.message_id,
-                            metadata=metadata if isinstance(metadata, str) else json.dumps(metadata)
-                        )
+    rows = []
+    for (notif_data, metadata, _, parent_notification_id), result in zip(prepared, results):
+        if isinstance(result, BaseException):
+            logger.error(f"Error sending personalized notification: {result}")
+            continue
 
-                        session.add(notification)
-                        await session.commit()
+        sent_message, in_thread = result
+        if sent_message is None:
+            continue
 
-                        logger.info(f"Sent notification without thread to user {user_id}")
+        template = notif_data.get("template")
 
-                    except TelegramAPIError as e2:
-                        logger.error(f"Failed to send message without thread to user {user_id}: {e2}")
+        rows.append({
+            "user_id": notif_data["user_id"],
+            "platform": notif_data["platform"],
+            "event_type": notif_data["event_type"],
+            "project_name": notif_data["project_name"],
+            # Уведомления по шаблону хранят поля, HTML собирается при просмотре истории
+            "message": None if template else notif_data["message"],
+            "template": template,
+            "object_iid": notif_data.get("object_iid"),
+            "title": notif_data.get("title"),
+            "url": notif_data.get("url"),
+            "status": notif_data.get("status"),
+            "payload": notif_data.get("payload"),
+            "telegram_message_id": sent_message.message_id,
+            "parent_notification_id": parent_notification_id if in_thread else None,
+            "thread_key": notif_data.get("thread_key"),
+            "meta_data": None if template else metadata if isinstance(metadata, str) else json.dumps(metadata),
+        })
+        NOTIFICATIONS_SENT.inc(notif_data["platform"], notif_data["event_type"])
+        logger.info(f"Sent personalized notification to user {notif_data['user_id']}, event: {notif_data['event_type']}")
 
-        except Exception as e:
-            logger.error(f"Error sending personalized notification: {e}")
+    # Сообщения уже отправлены, при ошибке БД writer повторяет только запись
+    await history_writer.write(rows)
 
 
 async def send_notification(user_id: int, message: str, session: AsyncSession) -> None:
     """
     Отправка простого уведомления (для обратной совместимости)
     """
-    if not _bot_instance:
+    if not _delivery_engine:
         logger.error("Bot instance not set. Call set_bot_instance() first.")
         return
 
     try:
-        await _bot_instance.send_message(
-            chat_id=user_id,
-            text=message,
+        await _delivery_engine.send_message(
+            user_id,
+            message,
             parse_mode="HTML",
             disable_web_page_preview=True
         )
         logger.info(f"Sent simple notification to user {user_id}")
 
-    except TelegramAPIError as e:
+    except (TelegramAPIError, DeliveryDropped) as e:
         logger.error(f"Failed to send message to user {user_id}: {e}")
@@ -2,16 +2,38 @@
 Персонализированные обработчики webhook событий GitLab/GitHub
 """
 
-import json
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Union
 from loguru import logger
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.database import User, Subscription, NotificationSettings
+from src.database import User, Subscription
+from src.metrics import HANDLER_ERRORS, observe_handler
+from src.webhook.templates import build_notification
+from src.webhook.routing import (
+    Subscriber,
+    subscriber_from_row,
+    subscribers_query,
+    subscription_index,
+)
+
+
+def make_thread_key(platform: str, project_id: Any, kind: str, iid: Any) -> Optional[str]:
+    """
+    Ключ треда уведомлений: одно MR/PR/Issue проекта
+
+    Args:
+        platform: gitlab или github
+        project_id: ID проекта или репозитория
+        kind: merge_request, pull_request или issue
+        iid: Номер MR/PR/Issue внутри проекта
+    """
+    if project_id is None or iid is None:
+        return None
+    return f"{platform}:{project_id}:{kind}:{iid}"
+
 
 # GitLab Handlers
-async def check_user_mentioned(text: str, user: User) -> bool:
+async def check_user_mentioned(text: str, user: Union[User, Subscriber]) -> bool:
     """Проверка, упомянут ли пользователь в тексте"""
     if not text:
         return False
@@ -28,47 +50,31 @@ async def check_user_mentioned(text: str, user: User) -> bool:
     return False
 
 
-async def get_subscribed_users(session: AsyncSession, project_id: str, platform: str = "gitlab") -> List[User]:
-    """Пользователи, подписанные на проект"""
+async def get_subscribed_users(session: AsyncSession, project_id: str, platform: str = "gitlab") -> List[Subscriber]:
+    """
+    Пользователи, подписанные на проект
+
+    Берутся из индекса маршрутизации в памяти. Пока индекс не построен,
+    выполняется один запрос по индексу (platform, project_id, is_active)
+    вместе с настройками уведомлений, без загрузки связей User
+    """
+    users = subscription_index.get(platform, project_id)
+    if users is not None:
+        return users
+
     result = await session.execute(
-        select(Subscription).where(
-            Subscription.project_id == project_id,
+        subscribers_query().where(
             Subscription.platform == platform,
-            Subscription.is_active == True
+            Subscription.project_id == project_id
         )
     )
-    subscriptions = result.scalars().all()
-
-    users = []
-    for sub in subscriptions:
-        result = await session.execute(
-            select(User).where(User.telegram_id == sub.user_id)
-        )
-        user = result.scalar_one_or_none()
-        if user:
-            users.append(user)
+    users = [subscriber_from_row(row) for row in result.all()]
 
     logger.debug(f"Found {len(users)} subscribed users for project {project_id}")
     return users
 
 
-async def get_or_create_settings(session: AsyncSession, user_telegram_id: int) -> NotificationSettings:
-    """Получение или создание настроек уведомлений"""
-    result = await session.execute(
-        select(NotificationSettings).where(
-            NotificationSettings.user_id == user_telegram_id
-        )
-    )
-    settings = result.scalar_one_or_none()
-
-    if not settings:
-        settings = NotificationSettings(user_id=user_telegram_id)
-        session.add(settings)
-        await session.commit()
-
-    return settings
-
-
+@observe_handler
 async def handle_gitlab_note(data: Dict[str, Any], session: AsyncSession) -> List[Dict[str, Any]]:
     """Комментарии-заметки в GitLab"""
     notifications = []
@@ -97,6 +103,8 @@ async def handle_gitlab_note(data: Dict[str, Any], session: AsyncSession) -> Lis
         reviewers = mr_or_issue.get("reviewers", [])
 
         project_id = str(project.get("id"))
+        thread_kind = "merge_request" if data.get("merge_request") else "issue"
+        thread_key = make_thread_key("gitlab", project_id, thread_kind, mr_or_issue.get("iid"))
         users = await get_subscribed_users(session, project_id)
 
         for user in users:
@@ -109,7 +117,7 @@ async def handle_gitlab_note(data: Dict[str, Any], session: AsyncSession) -> Lis
             if user.gitlab_username == comment_author_username:
                 continue
 
-            settings = await get_or_create_settings(session, user.telegram_id)
+            settings = user.settings
 
             should_notify = False
             notification_reason = ""
@@ -141,40 +149,33 @@ async def handle_gitlab_note(data: Dict[str, Any], session: AsyncSession) -> Lis
                         break
 
             if should_notify:
-                message = (
-                    f"{notification_reason}\n\n"
-                    f"<b>Проект:</b> {project.get('name')}\n"
-                    f"<b>{noteable_type}:</b> {mr_title}\n"
-                    f"<b>Автор комментария:</b> {author.get('name', 'Unknown')}\n\n"
-                    f"<b>Комментарий:</b>\n"
-                    f"<code>{note_text[:500]}</code>\n\n"
-                    f" <a href='{note_url}'>Перейти к обсуждению</a>"
-                )
-
                 notifications.append({
                     "user_id": user.telegram_id,
                     "platform": "gitlab",
                     "event_type": "note",
                     "project_name": project.get("name", ""),
-                    "message": message,
-                    "metadata": json.dumps({
-                        "note_id": note.get("id"),
-                        "noteable_type": noteable_type,
-                        "noteable_id": noteable_id,
-                        "project_id": project.get("id"),
-                        "url": note_url
-                    })
+                    "thread_key": thread_key,
+                    **build_notification(
+                        "gitlab_note", project.get("name"), mr_title, note_url,
+                        iid=mr_or_issue.get("iid"),
+                        reason=notification_reason,
+                        noteable_type=noteable_type,
+                        author=author.get("name", "Unknown"),
+                        text=note_text[:500]
+                    )
                 })
                 logger.info(f"Created note notification for user {user.telegram_id} (@{user.gitlab_username})")
 
     except Exception as e:
         logger.error(f"Ошибка при обработке GitLab Note: {e}")
+        HANDLER_ERRORS.inc("handle_gitlab_note")
         import traceback
         logger.error(traceback.format_exc())
 
     return notifications
 
 
+@observe_handler
 async def handle_gitlab_merge_request(data: Dict[str, Any], session: AsyncSession) -> List[Dict[str, Any]]:
     """ Merge Request в GitLab"""
     notifications = []
@@ -194,6 +195,7 @@ async def handle_gitlab_merge_request(data: Dict[str, Any], session: AsyncSessio
         reviewers = data.get("reviewers", [])
 
         project_id = str(project.get("id"))
+        thread_key = make_thread_key("gitlab", project_id, "merge_request", mr.get("iid"))
 
         logger.debug(f"MR Hook: action={action}, author={mr_author_username}, reviewers={len(reviewers)}")
 
@@ -208,14 +210,11 @@ async def handle_gitlab_merge_request(data: Dict[str, Any], session: AsyncSessio
             notification_created = False
 
             # Подписан ли пользователь на событие 'merge_request'
-
-            user_subscriptions = [sub for sub in user.subscriptions if
-                                  sub.project_id == project_id and sub.platform == "gitlab"]
-            # if not user_subscriptions or "merge_request" not in user_subscriptions[0].event_types:
+            # if "merge_request" not in user.event_types:
             #     logger.debug(f"User {user.telegram_id} is not subscribed to 'merge_request' event")
             #     continue
 
-            settings = await get_or_create_settings(session, user.telegram_id)
+            settings = user.settings
 
             # Назначение ревьюером
             if settings.reviewer_assignment_enabled and action in ["open", "update"]:
@@ -224,28 +223,19 @@ async def handle_gitlab_merge_request(data: Dict[str, Any], session: AsyncSessio
                         if user.gitlab_username == mr_author_username:
                             continue
 
-                        message = (
-                            f"Вас назначили ревьюером\n\n"
-                            f"<b>Проект:</b> {project.get('name')}\n"
-                            f"<b>MR:</b> {mr_title}\n"
-                            f"<b>Автор:</b> {mr_author_username}\n"
-                            f"<b>Ветка:</b> {source_branch} → {target_branch}\n\n"
-                            f" <a href='{mr_url}'>Перейти к MR</a>"
-                        )
-
                         notifications.append({
                             "user_id": user.telegram_id,
                             "platform": "gitlab",
                             "event_type": "reviewer_assigned",
                             "project_name": project.get("name", ""),
-                            "message": message,
-                            "metadata": json.dumps({
-                                "mr_id": mr.get("id"),
-                                "mr_iid": mr.get("iid"),
-                                "project_id": project.get("id"),
-                                "url": mr_url,
-                                "action": "reviewer_assigned"
-                            })
+                            "thread_key": thread_key,
+                            **build_notification(
+                                "gitlab_mr_reviewer", project.get("name"), mr_title, mr_url,
+                                iid=mr.get("iid"),
+                                author=mr_author_username,
+                                source_branch=source_branch,
+                                target_branch=target_branch
+                            )
                         })
                         logger.info(
                             f"Created reviewer notification for user {user.telegram_id} (@{user.gitlab_username})")
@@ -254,27 +244,19 @@ async def handle_gitlab_merge_request(data: Dict[str, Any], session: AsyncSessio
 
             # Мердж своего MR
             if settings.merge_enabled and action == "merge" and user.gitlab_username == mr_author_username:
-                message = (
-                    f"Ваш MR был вмерджен!\n\n"
-                    f"<b>Проект:</b> {project.get('name')}\n"
-                    f"<b>MR:</b> {mr_title}\n"
-                    f"<b>Ветка:</b> {source_branch} → {target_branch}\n\n"
-                    f" <a href='{mr_url}'>Перейти к MR</a>"
-                )
-
                 notifications.append({
                     "user_id": user.telegram_id,
                     "platform": "gitlab",
                     "event_type": "merge_request_merged",
                     "project_name": project.get("name", ""),
-                    "message": message,
-                    "metadata": json.dumps({
-                        "mr_id": mr.get("id"),
-                        "mr_iid": mr.get("iid"),
-                        "project_id": project.get("id"),
-                        "url": mr_url,
-                        "target_branch": target_branch
-                    })
+                    "thread_key": thread_key,
+                    **build_notification(
+                        "gitlab_mr_merged", project.get("name"), mr_title, mr_url,
+                        status=action,
+                        iid=mr.get("iid"),
+                        source_branch=source_branch,
+                        target_branch=target_branch
+                    )
                 })
                 logger.info(f"Created merge notification for user {user.telegram_id} (@{user.gitlab_username})")
 
@@ -284,40 +266,32 @@ async def handle_gitlab_merge_request(data: Dict[str, Any], session: AsyncSessio
             # Если пользователь подписан на 'merge_request' и не попал в персонализированные фильтры
             if not notification_created and settings.general_updates_enabled:
 
-                message = (
-                    f"Обновление Merge Request\n\n"
-                    f"<b>Проект:</b> {project.get('name')}\n"
-                    f"<b>MR:</b> {mr_title}\n"
-                    f"<b>Действие:</b> {action}\n"
-                    f"<b>Автор:</b> {mr_author_username}\n\n"
-                    f" <a href='{mr_url}'>Перейти к MR</a>"
-                )
-
                 notifications.append({
                     "user_id": user.telegram_id,
                     "platform": "gitlab",
                     "event_type": "merge_request_general",
                     "project_name": project.get("name", ""),
-                    "message": message,
-                    "metadata": json.dumps({
-                        "mr_id": mr.get("id"),
-                        "mr_iid": mr.get("iid"),
-                        "project_id": project.get("id"),
-                        "url": mr_url,
-                        "action": action
-                    })
+                    "thread_key": thread_key,
+                    **build_notification(
+                        "gitlab_mr_update", project.get("name"), mr_title, mr_url,
+                        status=action,
+                        iid=mr.get("iid"),
+                        author=mr_author_username
+                    )
                 })
                 logger.info(
                     f"Created general MR notification for user {user.telegram_id} (@{user.gitlab_username})")
 
     except Exception as e:
         logger.error(f"Ошибка при обработке GitLab MR: {e}")
+        HANDLER_ERRORS.inc("handle_gitlab_merge_request")
         import traceback
         logger.error(traceback.format_exc())
 
     return notifications
 
 
+@observe_handler
 async def handle_gitlab_pipeline(data: Dict[str, Any], session: AsyncSession) -> List[Dict[str, Any]]:
     """Pipeline в GitLab"""
     notifications = []
@@ -341,6 +315,7 @@ async def handle_gitlab_pipeline(data: Dict[str, Any], session: AsyncSession) ->
             return notifications
 
         project_id = str(project.get("id"))
+        users = await get_subscribed_users(session, project_id)
 
         for mr_data in merge_requests:
             mr_iid = mr_data.get("iid")
@@ -348,8 +323,6 @@ async def handle_gitlab_pipeline(data: Dict[str, Any], session: AsyncSession) ->
             mr_title = mr_data.get("title", "")
             mr_url = mr_data.get("url", "")
 
-            users = await get_subscribed_users(session, project_id)
-
             for user in users:
                 if not user.gitlab_username:
                     continue
@@ -357,47 +330,37 @@ async def handle_gitlab_pipeline(data: Dict[str, Any], session: AsyncSession) ->
                 if user.gitlab_username != mr_author_username:
                     continue
 
-                settings = await get_or_create_settings(session, user.telegram_id)
+                settings = user.settings
 
                 if not settings.pipeline_completion_enabled:
                     continue
 
-                status_text = {"success": "успешно завершен", "failed": "завершен с ошибкой",
-                               "canceled": "отменен"}.get(status, status)
-
-                message = (
-                    f"Pipeline {status_text}\n\n"
-                    f"<b>Проект:</b> {project.get('name')}\n"
-                    f"<b>MR:</b> {mr_title}\n"
-                    f"<b>Ветка:</b> {ref}\n"
-                    f"<b>Pipeline ID:</b> #{pipeline_id}\n\n"
-                    f"<a href='{mr_url}'>Перейти к MR</a>"
-                )
-
                 notifications.append({
                     "user_id": user.telegram_id,
                     "platform": "gitlab",
                     "event_type": "pipeline_completed",
                     "project_name": project.get("name", ""),
-                    "message": message,
-                    "metadata": json.dumps({
-                        "pipeline_id": pipeline_id,
-                        "mr_iid": mr_iid,
-                        "project_id": project.get("id"),
-                        "status": status,
-                        "url": mr_url
-                    })
+                    "thread_key": make_thread_key("gitlab", project_id, "merge_request", mr_iid),
+                    **build_notification(
+                        "gitlab_pipeline", project.get("name"), mr_title, mr_url,
+                        status=status,
+                        iid=mr_iid,
+                        ref=ref,
+                        pipeline_id=pipeline_id
+                    )
                 })
                 logger.info(f"Created pipeline notification for user {user.telegram_id} (@{user.gitlab_username})")
 
     except Exception as e:
         logger.error(f"Ошибка при обработке GitLab Pipeline: {e}")
+        HANDLER_ERRORS.inc("handle_gitlab_pipeline")
         import traceback
         logger.error(traceback.format_exc())
 
     return notifications
 
 
+@observe_handler
 async def handle_gitlab_issue(data: Dict[str, Any], session: AsyncSession) -> List[Dict[str, Any]]:
     """ Issue в GitLab"""
     notifications = []
@@ -423,6 +386,7 @@ async def handle_gitlab_issue(data: Dict[str, Any], session: AsyncSession) -> Li
         labels = issue.get("labels", [])
 
         project_id = str(project.get("id"))
+        thread_key = make_thread_key("gitlab", project_id, "issue", issue.get("iid"))
 
         logger.info(f"Issue action: {action}")
         logger.info(f"Issue title: {issue_title}")
@@ -448,7 +412,7 @@ async def handle_gitlab_issue(data: Dict[str, Any], session: AsyncSession) -> Li
                 logger.warning(f"User {user.telegram_id} has no gitlab_username")
                 continue
 
-            settings = await get_or_create_settings(session, user.telegram_id)
+            settings = user.settings
             logger.info(f"Settings: issue_assignment_enabled={settings.issue_assignment_enabled}")
 
             # Проверяем является ли пользователь assignee
@@ -472,28 +436,19 @@ async def handle_gitlab_issue(data: Dict[str, Any], session: AsyncSession) -> Li
 
                 logger.info(f"Creating notification for user {user.telegram_id}")
 
-                message = (
-                    f"Новое событие в Issue\n\n"
-                    f"<b>Действие:</b> {action}\n"
-                    f"<b>Проект:</b> {project.get('name')}\n"
-                    f"<b>Issue:</b> {issue_title}\n"
-                    f"<b>Автор:</b> {issue_author_username}\n"
-                    f"<b>Assignees:</b> {', '.join([a.get('username', '') for a in assignees]) if assignees else 'Нет'}\n\n"
-                    f"<a href='{issue_url}'>Перейти к Issue</a>"
-                )
-
                 notifications.append({
                     "user_id": user.telegram_id,
                     "platform": "gitlab",
                     "event_type": "issue_assigned",
                     "project_name": project.get("name", ""),
-                    "message": message,
-                    "metadata": json.dumps({
-                        "issue_id": issue.get("id"),
-                        "issue_iid": issue.get("iid"),
-                        "project_id": project.get("id"),
-                        "url": issue_url
-                    })
+                    "thread_key": thread_key,
+                    **build_notification(
+                        "gitlab_issue", project.get("name"), issue_title, issue_url,
+                        status=action,
+                        iid=issue.get("iid"),
+                        author=issue_author_username,
+                        assignees=", ".join(a.get("username", "") for a in assignees)
+                    )
                 })
                 logger.info(f"Notification created!")
 
@@ -501,6 +456,7 @@ async def handle_gitlab_issue(data: Dict[str, Any], session: AsyncSession) -> Li
 
     except Exception as e:
         logger.error(f"Ошибка при обработке GitLab Issue: {e}")
+        HANDLER_ERRORS.inc("handle_gitlab_issue")
         import traceback
         logger.error(traceback.format_exc())
 
@@ -510,6 +466,7 @@ async def handle_gitlab_issue(data: Dict[str, Any], session: AsyncSession) -> Li
 # Аналогично GitHub Handlers
 
 
+@observe_handler
 async def handle_github_pull_request(data: Dict[str, Any], session: AsyncSession) -> List[Dict[str, Any]]:
     """
      Pull Request в GitHub
@@ -531,6 +488,7 @@ async def handle_github_pull_request(data: Dict[str, Any], session: AsyncSession
         requested_reviewers = pr.get("requested_reviewers", [])
 
         project_id = str(repo.get("id"))
+        thread_key = make_thread_key("github", project_id, "pull_request", pr.get("number"))
         project_name = repo.get("full_name", "")
 
         # Бреем подписанных пользователей
@@ -543,62 +501,50 @@ async def handle_github_pull_request(data: Dict[str, Any], session: AsyncSession
             if not user.github_username:
                 continue
 
-            settings = await get_or_create_settings(session, user.telegram_id)
+            settings = user.settings
 
             # Назначение ревьюером
             if settings.reviewer_assignment_enabled and action in ["opened", "synchronize"]:
                 for reviewer in requested_reviewers:
                     if user.github_username == reviewer.get("login"):
-                        message = (
-                            f"Вас назначили ревьюером\n\n"
-                            f"<b>Репозиторий:</b> {project_name}\n"
-                            f"<b>PR:</b> {pr_title}\n"
-                            f"<b>Автор:</b> {pr_author}\n\n"
-                            f"<a href='{pr_url}'>Перейти к PR</a>"
-                        )
-
                         notifications.append({
                             "user_id": user.telegram_id,
                             "platform": "github",
                             "event_type": "reviewer_assigned",
                             "project_name": project_name,
-                            "message": message,
-                            "metadata": json.dumps({
-                                "pr_number": pr.get("number"),
-                                "repo_id": project_id,
-                                "url": pr_url
-                            })
+                            "thread_key": thread_key,
+                            **build_notification(
+                                "github_pr_reviewer", project_name, pr_title, pr_url,
+                                status=action,
+                                iid=pr.get("number"),
+                                author=pr_author
+                            )
                         })
                         break
 
             #  Мердж своего PR
             if settings.merge_enabled and action == "closed" and pr.get("merged") and user.github_username == pr_author:
-                message = (
-                    f"Ваш PR был вмерджен!\n\n"
-                    f"<b>Репозиторий:</b> {project_name}\n"
-                    f"<b>PR:</b> {pr_title}\n\n"
-                    f"<a href='{pr_url}'>Перейти к PR</a>"
-                )
-
                 notifications.append({
                     "user_id": user.telegram_id,
                     "platform": "github",
                     "event_type": "pull_request_merged",
                     "project_name": project_name,
-                    "message": message,
-                    "metadata": json.dumps({
-                        "pr_number": pr.get("number"),
-                        "repo_id": project_id,
-                        "url": pr_url
-                    })
+                    "thread_key": thread_key,
+                    **build_notification(
+                        "github_pr_merged", project_name, pr_title, pr_url,
+                        status=action,
+                        iid=pr.get("number")
+                    )
                 })
 
     except Exception as e:
         logger.error(f"Ошибка при обработке GitHub PR: {e}")
+        HANDLER_ERRORS.inc("handle_github_pull_request")
 
     return notifications
 
 
+@observe_handler
 async def handle_github_issues(data: Dict[str, Any], session: AsyncSession) -> List[Dict[str, Any]]:
     """
     Issue в GitHub
@@ -618,6 +564,7 @@ async def handle_github_issues(data: Dict[str, Any], session: AsyncSession) -> L
         assignees = issue.get("assignees", [])
 
         project_id = str(repo.get("id"))
+        thread_key = make_thread_key("github", project_id, "issue", issue.get("number"))
         project_name = repo.get("full_name", "")
 
         # Пользователи подписанные на событие
@@ -630,39 +577,34 @@ async def handle_github_issues(data: Dict[str, Any], session: AsyncSession) -> L
             if not user.github_username:
                 continue
 
-            settings = await get_or_create_settings(session, user.telegram_id)
+            settings = user.settings
 
             # Назначение исполнителем
             if settings.issue_assignment_enabled and action in ["opened", "assigned"]:
                 for assignee in assignees:
                     if user.github_username == assignee.get("login"):
-                        message = (
-                            f"Вас назначили исполнителем Issue\n\n"
-                            f"<b>Репозиторий:</b> {project_name}\n"
-                            f"<b>Issue:</b> {issue_title}\n\n"
-                            f"<a href='{issue_url}'>Перейти к Issue</a>"
-                        )
-
                         notifications.append({
                             "user_id": user.telegram_id,
                             "platform": "github",
                             "event_type": "issue_assigned",
                             "project_name": project_name,
-                            "message": message,
-                            "metadata": json.dumps({
-                                "issue_number": issue.get("number"),
-                                "repo_id": project_id,
-                                "url": issue_url
-                            })
+                            "thread_key": thread_key,
+                            **build_notification(
+                                "github_issue_assigned", project_name, issue_title, issue_url,
+                                status=action,
+                                iid=issue.get("number")
+                            )
                         })
                         break
 
     except Exception as e:
         logger.error(f"Ошибка при обработке GitHub Issue: {e}")
+        HANDLER_ERRORS.inc("handle_github_issues")
 
     return notifications
 
 
+@observe_handler
 async def handle_github_issue_comment(data: Dict[str, Any], session: AsyncSession) -> List[Dict[str, Any]]:
     """
     Issue Comment в GitHub
@@ -687,6 +629,8 @@ async def handle_github_issue_comment(data: Dict[str, Any], session: AsyncSessio
         assignees = issue.get("assignees", [])
 
         project_id = str(repo.get("id"))
+        thread_kind = "pull_request" if issue.get("pull_request") else "issue"
+        thread_key = make_thread_key("github", project_id, thread_kind, issue.get("number"))
         project_name = repo.get("full_name", "")
 
         users = await get_subscribed_users(session, project_id, platform="github")
@@ -698,7 +642,7 @@ async def handle_github_issue_comment(data: Dict[str, Any], session: AsyncSessio
             if not user.github_username:
                 continue
 
-            settings = await get_or_create_settings(session, user.telegram_id)
+            settings = user.settings
 
             should_notify = False
             notification_reason = ""
@@ -722,36 +666,29 @@ async def handle_github_issue_comment(data: Dict[str, Any], session: AsyncSessio
                         break
 
             if should_notify:
-                message = (
-                    f"{notification_reason}\n\n"
-                    f"<b>Репозиторий:</b> {project_name}\n"
-                    f"<b>Issue:</b> {issue_title}\n"
-                    f"<b>Автор комментария:</b> {comment_author}\n\n"
-                    f"<b>Комментарий:</b>\n"
-                    f"<pre>{comment_text[:200]}</pre>\n\n"
-                    f"<a href='{comment_url}'>Перейти к комментарию</a>"
-                )
-
                 notifications.append({
                     "user_id": user.telegram_id,
                     "platform": "github",
                     "event_type": "issue_comment",
                     "project_name": project_name,
-                    "message": message,
-                    "metadata": json.dumps({
-                        "issue_number": issue.get("number"),
-                        "comment_id": comment.get("id"),
-                        "repo_id": project_id,
-                        "url": comment_url
-                    })
+                    "thread_key": thread_key,
+                    **build_notification(
+                        "github_comment", project_name, issue_title, comment_url,
+                        iid=issue.get("number"),
+                        reason=notification_reason,
+                        author=comment_author,
+                        text=comment_text[:200]
+                    )
                 })
 
     except Exception as e:
         logger.error(f"Ошибка при обработке GitHub Issue Comment: {e}")
+        HANDLER_ERRORS.inc("handle_github_issue_comment")
 
     return notifications
 
 
+@observe_handler
 async def handle_github_workflow_run(data: Dict[str, Any], session: AsyncSession) -> List[Dict[str, Any]]:
     """
     Workflow Run (Pipeline) в GitHub
@@ -794,42 +731,28 @@ async def handle_github_workflow_run(data: Dict[str, Any], session: AsyncSession
                 if user.github_username != pr_author:
                     continue
 
-                settings = await get_or_create_settings(session, user.telegram_id)
+                settings = user.settings
 
                 if not settings.pipeline_completion_enabled:
                     continue
 
-                status_text = {
-                    "success": "успешно завершен",
-                    "failure": "завершен с ошибкой",
-                    "cancelled": "отменен"
-                }.get(status, status)
-
-                message = (
-                    f"Workflow {status_text}\n\n"
-                    f"<b>Репозиторий:</b> {project_name}\n"
-                    f"<b>PR:</b> {pr_title}\n"
-                    f"<b>Workflow:</b> {workflow_name}\n"
-                    f"<b>Ветка:</b> {head_branch}\n\n"
-                    f"<a href='{workflow_url}'>Перейти к Workflow</a>"
-                )
-
                 notifications.append({
                     "user_id": user.telegram_id,
                     "platform": "github",
                     "event_type": "workflow_completed",
                     "project_name": project_name,
-                    "message": message,
-                    "metadata": json.dumps({
-                        "workflow_id": workflow_run.get("id"),
-                        "pr_number": pr_data.get("number"),
-                        "repo_id": project_id,
-                        "status": status,
-                        "url": workflow_url
-                    })
+                    "thread_key": make_thread_key("github", project_id, "pull_request", pr_data.get("number")),
+                    **build_notification(
+                        "github_workflow", project_name, pr_title, workflow_url,
+                        status=status,
+                        iid=pr_data.get("number"),
+                        workflow=workflow_name,
+                        branch=head_branch
+                    )
                 })
 
     except Exception as e:
         logger.error(f"Ошибка при обработке GitHub Workflow Run: {e}")
+        HANDLER_ERRORS.inc("handle_github_workflow_run")
 
     return notifications
@@ -0,0 +1,189 @@
+"""
+Очередь webhook событий с пулом обработчиков
+
+HTTP слой только кладет событие в очередь и сразу отвечает GitLab/GitHub,
+а работа с БД и отправка сообщений выполняются фоновыми воркерами.
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from loguru import logger
+
+
+@dataclass
+class WebhookEvent:
+    """Событие, принятое HTTP слоем"""
+
+    platform: str
+    event_type: str
+    data: Dict[str, Any]
+    received_at: float = field(default_factory=time.monotonic)
+    enqueued_at: float = 0.0
+    # ID записи в журнале на диске, если журнал включен
+    spool_id: Optional[int] = None
+
+
+class StageStats:
+    """Статистика задержек одного этапа обработки"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.last = seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def as_dict(self) -> Dict[str, float]:
+        avg = self.total / self.count if self.count else 0.0
+        return {
+            "count": self.count,
+            "avg_ms": round(avg * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+            "last_ms": round(self.last * 1000, 3),
+        }
+
+
+EventProcessor = Callable[[WebhookEvent], Awaitable[None]]
+
+
+class EventQueue:
+    """Ограниченная очередь событий с пулом воркеров"""
+
+    def __init__(self, processor: EventProcessor, maxsize: int = 1000, workers: int = 4):
+        """
+        Args:
+            processor: Корутина, обрабатывающая одно событие
+            maxsize: Максимальное число событий в очереди
+            workers: Количество воркеров
+        """
+        self.processor = processor
+        self.maxsize = maxsize
+        self.workers_count = workers
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+
+        self.accepted = 0
+        self.rejected = 0
+        self.processed = 0
+        self.failed = 0
+        self.stages: Dict[str, StageStats] = {
+            "ingest": StageStats(),
+            "queue_wait": StageStats(),
+            "process": StageStats(),
+        }
+
+    @property
+    def depth(self) -> int:
+        """Текущее количество событий в очереди"""
+        return self._queue.qsize() if self._queue else 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    def is_full(self) -> bool:
+        return self._queue is not None and self._queue.full()
+
+    def start(self) -> None:
+        """Запуск воркеров"""
+        if self._workers:
+            return
+
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.maxsize)
+
+        self._workers = [
+            asyncio.create_task(self._worker(i), name=f"webhook-worker-{i}")
+            for i in range(self.workers_count)
+        ]
+        logger.info(f"Webhook queue started: workers={self.workers_count}, maxsize={self.maxsize}")
+
+    def put_nowait(self, event: WebhookEvent) -> bool:
+        """
+        Добавление события без ожидания
+
+        Returns:
+            False, если очередь заполнена
+        """
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.maxsize)
+
+        event.enqueued_at = time.monotonic()
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return False
+
+        self.accepted += 1
+        self.stages["ingest"].observe(event.enqueued_at - event.received_at)
+        return True
+
+    async def put(self, event: WebhookEvent) -> None:
+        """Добавление события с ожиданием свободного места"""
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.maxsize)
+
+        event.enqueued_at = time.monotonic()
+        await self._queue.put(event)
+        self.accepted += 1
+
+    async def _worker(self, worker_id: int) -> None:
+        """Цикл воркера"""
+        while True:
+            event = await self._queue.get()
+            started = time.monotonic()
+            self.stages["queue_wait"].observe(started - event.enqueued_at)
+
+            try:
+                await self.processor(event)
+                self.processed += 1
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Worker {worker_id} failed to process {event.platform} {event.event_type}: {e}")
+            finally:
+                self.stages["process"].observe(time.monotonic() - started)
+                self._queue.task_done()
+
+    async def stop(self, timeout: float = 30.0) -> None:
+        """
+        Остановка с дожиданием обработки накопленных событий
+
+        Args:
+            timeout: Максимальное время ожидания опустошения очереди
+        """
+        if not self._workers:
+            return
+
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Webhook queue drain timed out, {self.depth} events left unprocessed")
+
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        logger.info("Webhook queue stopped")
+
+    def stats(self) -> Dict[str, Any]:
+        """Статистика очереди"""
+        return {
+            "depth": self.depth,
+            "maxsize": self.maxsize,
+            "workers": len(self._workers),
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "processed": self.processed,
+            "failed": self.failed,
+            "latency": {name: stage.as_dict() for name, stage in self.stages.items()},
+        }
@@ -0,0 +1,265 @@
+"""
+Индекс маршрутизации webhook событий по подпискам
+
+Подписки меняются несколько раз в день, а события приходят постоянно,
+поэтому подписчики проекта хранятся в памяти: (platform, project_id) ->
+[Subscriber]. Индекс строится при запуске бота, обновляется точечно из
+обработчиков бота после изменения данных пользователя и периодически
+пересобирается целиком из БД.
+"""
+
+import asyncio
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from loguru import logger
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database import User, Subscription, NotificationSettings, get_session
+
+# Флаги NotificationSettings, которые нужны обработчикам
+SETTINGS_FLAGS = (
+    "mentions_enabled",
+    "general_updates_enabled",
+    "reviewer_assignment_enabled",
+    "merge_enabled",
+    "pipeline_completion_enabled",
+    "issue_assignment_enabled",
+    "issue_mention_enabled",
+    "note_mention_enabled",
+    "label_changes_enabled",
+    "thread_updates_enabled",
+)
+
+
+class SettingsSnapshot(NamedTuple):
+    """Снимок настроек уведомлений пользователя"""
+
+    mentions_enabled: bool
+    general_updates_enabled: bool
+    reviewer_assignment_enabled: bool
+    merge_enabled: bool
+    pipeline_completion_enabled: bool
+    issue_assignment_enabled: bool
+    issue_mention_enabled: bool
+    note_mention_enabled: bool
+    label_changes_enabled: bool
+    thread_updates_enabled: bool
+
+
+class Subscriber(NamedTuple):
+    """Подписчик проекта: только поля, которые нужны обработчикам"""
+
+    telegram_id: int
+    first_name: Optional[str]
+    gitlab_username: Optional[str]
+    github_username: Optional[str]
+    event_types: str
+    settings: SettingsSnapshot
+
+
+# Колонки одного запроса Subscription + User + NotificationSettings
+SUBSCRIBER_COLUMNS = (
+    User.telegram_id,
+    User.first_name,
+    User.gitlab_username,
+    User.github_username,
+    Subscription.event_types,
+    NotificationSettings.id.label("settings_id"),
+    *(getattr(NotificationSettings, flag) for flag in SETTINGS_FLAGS),
+)
+
+
+# Настройки пользователя без строки в notification_settings: значения по умолчанию
+# из модели, строка в БД не создается
+DEFAULT_SETTINGS = SettingsSnapshot(
+    *(NotificationSettings.__table__.c[flag].default.arg for flag in SETTINGS_FLAGS)
+)
+
+
+def subscriber_from_row(row: Any) -> Subscriber:
+    """Преобразование строки результата в Subscriber"""
+    settings = DEFAULT_SETTINGS
+    if row.settings_id is not None:
+        settings = SettingsSnapshot(*(getattr(row, flag) for flag in SETTINGS_FLAGS))
+
+    return Subscriber(
+        telegram_id=row.telegram_id,
+        first_name=row.first_name,
+        gitlab_username=row.gitlab_username,
+        github_username=row.github_username,
+        event_types=row.event_types,
+        settings=settings,
+    )
+
+
+def subscribers_query():
+    """Запрос подписчиков без фильтра по проекту"""
+    return (
+        select(*SUBSCRIBER_COLUMNS)
+        .select_from(Subscription)
+        .join(User, User.telegram_id == Subscription.user_id)
+        .outerjoin(NotificationSettings, NotificationSettings.user_id == User.telegram_id)
+        .where(Subscription.is_active == True)
+    )
+
+
+RouteKey = Tuple[str, str]
+
+
+class SubscriptionIndex:
+    """Подписчики проектов в памяти"""
+
+    def __init__(self):
+        self._routes: Dict[RouteKey, List[Subscriber]] = {}
+        # Ключи маршрутов каждого пользователя для точечного обновления
+        self._user_routes: Dict[int, Set[RouteKey]] = {}
+        self._user_versions: Dict[int, int] = {}
+        self._touched: Set[int] = set()
+        self._rebuilding = False
+        self._resync_task: Optional[asyncio.Task] = None
+
+        self.ready = False
+        self.rebuilds = 0
+        self.refreshes = 0
+
+    def get(self, platform: str, project_id: str) -> Optional[List[Subscriber]]:
+        """
+        Подписчики проекта
+
+        Returns:
+            Список подписчиков или None, если индекс еще не построен
+        """
+        if not self.ready:
+            return None
+        return self._routes.get((platform, str(project_id)), [])
+
+    @staticmethod
+    def _group(rows: List[Any]) -> Tuple[Dict[RouteKey, List[Subscriber]], Dict[int, Set[RouteKey]]]:
+        routes: Dict[RouteKey, List[Subscriber]] = {}
+        user_routes: Dict[int, Set[RouteKey]] = {}
+        for row in rows:
+            key = (row.platform, str(row.project_id))
+            routes.setdefault(key, []).append(subscriber_from_row(row))
+            user_routes.setdefault(row.telegram_id, set()).add(key)
+        return routes, user_routes
+
+    async def rebuild(self, session: AsyncSession) -> None:
+        """Полная пересборка индекса из БД"""
+        self._rebuilding = True
+        self._touched.clear()
+        try:
+            result = await session.execute(
+                subscribers_query().add_columns(Subscription.platform, Subscription.project_id)
+            )
+            routes, user_routes = self._group(result.all())
+        finally:
+            self._rebuilding = False
+
+        # Замена без await, обработчики видят либо старый, либо новый индекс
+        self._routes = routes
+        self._user_routes = user_routes
+        self.ready = True
+        self.rebuilds += 1
+
+        # Изменения, сделанные во время чтения, могли не попасть в снимок
+        touched, self._touched = self._touched, set()
+        for telegram_id in touched:
+            await self.refresh_user(session, telegram_id)
+
+        logger.info(f"Subscription index rebuilt: {len(routes)} projects, {len(user_routes)} users")
+
+    async def refresh_user(self, session: AsyncSession, telegram_id: int) -> None:
+        """
+        Точечное обновление подписок и настроек пользователя
+
+        Вызывается после коммита изменений пользователя. Ошибки не пробрасываются,
+        расхождение исправит периодическая пересборка.
+        """
+        if self._rebuilding:
+            self._touched.add(telegram_id)
+        if not self.ready:
+            return
+
+        version = self._user_versions.get(telegram_id, 0) + 1
+        self._user_versions[telegram_id] = version
+
+        try:
+            result = await session.execute(
+                subscribers_query()
+                .add_columns(Subscription.platform, Subscription.project_id)
+                .where(Subscription.user_id == telegram_id)
+            )
+            rows = result.all()
+        except Exception as e:
+            logger.error(f"Failed to refresh subscription index for user {telegram_id}: {e}")
+            return
+
+        # Более поздний вызов для этого пользователя уже применил свежие данные
+        if self._user_versions.get(telegram_id) != version:
+            return
+
+        routes, user_routes = self._group(rows)
+        new_keys = user_routes.get(telegram_id, set())
+
+        # Списки не изменяются на месте: обработчик, получивший список ранее, дочитает его
+        for key in self._user_routes.get(telegram_id, set()) | new_keys:
+            subscribers = [s for s in self._routes.get(key, []) if s.telegram_id != telegram_id]
+            subscribers.extend(routes.get(key, []))
+            if subscribers:
+                self._routes[key] = subscribers
+            else:
+                self._routes.pop(key, None)
+
+        if new_keys:
+            self._user_routes[telegram_id] = new_keys
+        else:
+            self._user_routes.pop(telegram_id, None)
+        self.refreshes += 1
+
+    async def _resync_loop(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                async for session in get_session():
+                    await self.rebuild(session)
+            except Exception as e:
+                logger.error(f"Subscription index resync failed: {e}")
+
+    async def start(self, resync_interval: float = 300.0) -> None:
+        """Построение индекса и запуск периодической пересборки"""
+        async for session in get_session():
+            await self.rebuild(session)
+
+        if resync_interval > 0 and self._resync_task is None:
+            self._resync_task = asyncio.create_task(
+                self._resync_loop(resync_interval), name="subscription-index-resync"
+            )
+
+    async def stop(self) -> None:
+        """Остановка периодической пересборки"""
+        if self._resync_task:
+            self._resync_task.cancel()
+            await asyncio.gather(self._resync_task, return_exceptions=True)
+            self._resync_task = None
+
+    def clear(self) -> None:
+        """Сброс индекса, обработчики возвращаются к запросам в БД"""
+        self._routes = {}
+        self._user_routes = {}
+        self._user_versions = {}
+        self.ready = False
+
+    def stats(self) -> Dict[str, Any]:
+        """Статистика индекса"""
+        return {
+            "ready": self.ready,
+            "projects": len(self._routes),
+            "users": len(self._user_routes),
+            "subscriptions": sum(len(subscribers) for subscribers in self._routes.values()),
+            "rebuilds": self.rebuilds,
+            "refreshes": self.refreshes,
+        }
+
+
+subscription_index = SubscriptionIndex()
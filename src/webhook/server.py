@@ -2,15 +2,36 @@
 Webhook сервер для приема событий от GitLab и GitHub
 """
 
+import asyncio
 import hmac
 import hashlib
+import json
+import time
 from typing import Optional, Dict, Any
 
 from aiohttp import web
 from loguru import logger
 
 from src.webhook.handlers import handle_gitlab_event, handle_github_event
+from src.webhook.notifier import get_delivery_engine, history_writer
+from src.webhook.dedup import DeliveryDeduplicator, delivery_key
+from src.webhook.filters import HANDLED_EVENTS, EventFilter
+from src.webhook.queue import EventQueue, WebhookEvent
+from src.webhook.routing import subscription_index
+from src.webhook.spool import WebhookSpool
 from src.config import settings
+from src.http_client import rate_limiter, response_cache
+from src.database.retention import notification_retention
+from src.metrics import (
+    API_RATE_LIMIT_HEADROOM,
+    API_RATE_LIMIT_REMAINING,
+    CONTENT_TYPE,
+    EVENT_QUEUE_WAIT,
+    QUEUE_DEPTH,
+    WEBHOOKS_RECEIVED,
+    event_scope,
+    registry,
+)
 
 
 class WebhookServer:
@@ -23,6 +44,28 @@ class WebhookServer:
         self.host = host
         self.port = port
         self.app = web.Application()
+        self.runner: Optional[web.AppRunner] = None
+        self.queue = EventQueue(
+            processor=self._process_event,
+            maxsize=settings.webhook_queue_size,
+            workers=settings.webhook_workers
+        )
+        self.spool: Optional[WebhookSpool] = None
+        if settings.webhook_spool_path:
+            self.spool = WebhookSpool(
+                path=settings.webhook_spool_path,
+                flush_interval=settings.webhook_spool_flush_interval,
+                batch_size=settings.webhook_spool_batch_size,
+                retention=settings.webhook_spool_retention
+            )
+        self.dedup = DeliveryDeduplicator(
+            ttl=settings.webhook_dedup_ttl,
+            max_entries=settings.webhook_dedup_max_entries
+        )
+        # Правила собираются один раз, проверка - словарь и несколько сравнений
+        self.filter = EventFilter(enabled=settings.webhook_prefilter_enabled)
+        self._replay_task: Optional[asyncio.Task] = None
+        self._replay_needed = asyncio.Event()
         self._setup_routes()
 
     def _setup_routes(self) -> None:
@@ -30,10 +73,168 @@ class WebhookServer:
         self.app.router.add_post("/webhook/gitlab", self.handle_gitlab_webhook)
         self.app.router.add_post("/webhook/github", self.handle_github_webhook)
         self.app.router.add_get("/health", self.health_check)
+        if settings.metrics_enabled:
+            self.app.router.add_get("/metrics", self.metrics)
 
     async def health_check(self, request: web.Request) -> web.Response:
         """Проверка здоровья сервера"""
-        return web.json_response({"status": "ok", "service": "gitlab-assistant-webhook"})
+        engine = get_delivery_engine()
+        return web.json_response({
+            "status": "ok",
+            "service": "gitlab-assistant-webhook",
+            "queue": self.queue.stats(),
+            "spool": self.spool.stats() if self.spool else None,
+            "dedup": self.dedup.stats(),
+            "filter": self.filter.stats(),
+            "routing": subscription_index.stats(),
+            "delivery": engine.stats() if engine else None,
+            "history": history_writer.stats(),
+            "retention": notification_retention.stats(),
+            "http_cache": response_cache.stats(),
+            "api_limits": rate_limiter.stats()
+        })
+
+    async def metrics(self, request: web.Request) -> web.Response:
+        """Метрики в формате Prometheus"""
+        engine = get_delivery_engine()
+        QUEUE_DEPTH.set(self.queue.depth, "webhook")
+        QUEUE_DEPTH.set(self.spool.backlog if self.spool else 0, "spool")
+        QUEUE_DEPTH.set(engine.pending if engine else 0, "telegram_delivery")
+        QUEUE_DEPTH.set(history_writer.stats()["pending"], "notification_history")
+        QUEUE_DEPTH.set(rate_limiter.stats()["waiting"], "api_requests")
+
+        ratio, remaining = rate_limiter.headroom()
+        # Лимит неизвестен или сброшен - запас полный
+        API_RATE_LIMIT_HEADROOM.set(1.0 if ratio is None else ratio)
+        if remaining is not None:
+            API_RATE_LIMIT_REMAINING.set(remaining)
+
+        return web.Response(body=registry.render().encode(), headers={"Content-Type": CONTENT_TYPE})
+
+    @staticmethod
+    def _count_received(platform: str, event_type: str, result: str) -> None:
+        # Заголовок задает отправитель: неизвестные типы в одну метку
+        event = event_type if event_type in HANDLED_EVENTS[platform] else "other"
+        WEBHOOKS_RECEIVED.inc(platform, event, result)
+
+    async def _process_event(self, event: WebhookEvent) -> None:
+        """Обработка события из очереди"""
+        if event.enqueued_at:
+            EVENT_QUEUE_WAIT.observe(time.monotonic() - event.enqueued_at, event.platform)
+        try:
+            with event_scope(event.platform, event.event_type):
+                if event.platform == "gitlab":
+                    await handle_gitlab_event(event.event_type, event.data)
+                else:
+                    await handle_github_event(event.event_type, event.data)
+        finally:
+            if self.spool and event.spool_id is not None:
+                self.spool.ack(event.spool_id)
+
+    def _is_overloaded(self) -> bool:
+        if self.queue.is_full():
+            return True
+        return self.spool is not None and self.spool.backlog >= self.queue.maxsize
+
+    def _overloaded_response(self, platform: str, event_type: str) -> web.Response:
+        logger.warning(f"Webhook queue is full ({self.queue.depth}), rejecting {platform} {event_type}")
+        return web.Response(
+            status=503,
+            text="Queue is full",
+            headers={"Retry-After": str(settings.webhook_retry_after)}
+        )
+
+    @staticmethod
+    def _filtered_response() -> web.Response:
+        """Событие не приводит к уведомлениям: 200, чтобы платформа не повторяла доставку"""
+        return web.Response(status=200, text="Filtered")
+
+    async def _enqueue(
+            self,
+            platform: str,
+            event_type: str,
+            data: Dict[str, Any],
+            request: web.Request,
+            body: bytes,
+            received_at: float
+    ) -> web.Response:
+        """Запись события в журнал, постановка в очередь и формирование ответа"""
+        key = delivery_key(platform, request.headers, body)
+        # Проверка и запоминание без await между ними, поэтому одновременные копии не проходят
+        if self.dedup.check_and_remember(key):
+            logger.info(f"Duplicate {platform} delivery dropped: {key}")
+            self._count_received(platform, event_type, "duplicate")
+            return web.Response(status=200, text="Duplicate")
+
+        if self._is_overloaded():
+            self.dedup.forget(key)
+            self.queue.rejected += 1
+            self._count_received(platform, event_type, "rejected")
+            return self._overloaded_response(platform, event_type)
+
+        event = WebhookEvent(platform=platform, event_type=event_type, data=data, received_at=received_at)
+
+        if self.spool:
+            # Отвечаем только после того, как событие записано на диск
+            try:
+                event.spool_id = await self.spool.append(
+                    platform, event_type, dict(request.headers), body, delivery_key=key
+                )
+            except Exception:
+                self.dedup.forget(key)
+                raise
+
+        if not self.queue.put_nowait(event):
+            if self.spool:
+                # Событие уже в журнале, его доставит replay воркер
+                self.spool.release(event.spool_id)
+                self._replay_needed.set()
+                self._count_received(platform, event_type, "accepted")
+                return web.Response(status=202, text="Accepted")
+
+            self.dedup.forget(key)
+            self._count_received(platform, event_type, "rejected")
+            return self._overloaded_response(platform, event_type)
+
+        self._count_received(platform, event_type, "accepted")
+        return web.Response(status=202, text="Accepted")
+
+    async def _replay_loop(self) -> None:
+        """Передача в очередь событий из журнала, которые еще не обработаны"""
+        while True:
+            await self._replay_needed.wait()
+            self._replay_needed.clear()
+
+            after_id = 0
+            replayed = 0
+            while True:
+                pending = await self.spool.load_pending(after_id=after_id)
+                if not pending:
+                    break
+
+                for spooled in pending:
+                    after_id = max(after_id, spooled.id)
+                    if self.spool.is_inflight(spooled.id):
+                        continue
+
+                    try:
+                        data = json.loads(spooled.body)
+                    except ValueError:
+                        logger.error(f"Dropping unparsable spooled event {spooled.id}")
+                        self.spool.ack(spooled.id)
+                        continue
+
+                    self.spool.mark_inflight(spooled.id)
+                    await self.queue.put(WebhookEvent(
+                        platform=spooled.platform,
+                        event_type=spooled.event_type,
+                        data=data,
+                        spool_id=spooled.id
+                    ))
+                    replayed += 1
+
+            if replayed:
+                logger.info(f"Replayed {replayed} events from webhook spool")
 
     def _verify_gitlab_signature(self, request: web.Request, body: bytes) -> bool:
         """
@@ -60,6 +261,7 @@ class WebhookServer:
         """
         Обработка webhook от GitLab
         """
+        received_at = time.monotonic()
         try:
             body = await request.read()
 
@@ -75,15 +277,21 @@ class WebhookServer:
                 logger.warning("Missing X-Gitlab-Event header")
                 return web.Response(status=400, text="Missing event type")
 
+            if self.filter.check_event_type("gitlab", event_type):
+                self._count_received("gitlab", event_type, "filtered")
+                return self._filtered_response()
+
             # Парсим JSON
             data = await request.json()
 
-            logger.info(f"Received GitLab webhook: {event_type}")
+            if self.filter.check("gitlab", event_type, data):
+                self._count_received("gitlab", event_type, "filtered")
+                return self._filtered_response()
 
-            # Обрабатываем событие асинхронно
-            await handle_gitlab_event(event_type, data)
+            logger.info(f"Received GitLab webhook: {event_type}")
 
-            return web.Response(status=200, text="OK")
+            # Обработка выполняется воркерами очереди
+            return await self._enqueue("gitlab", event_type, data, request, body, received_at)
 
         except Exception as e:
             logger.error(f"Error handling GitLab webhook: {e}")
@@ -93,6 +301,7 @@ class WebhookServer:
         """
         Обработка webhook от GitHub
         """
+        received_at = time.monotonic()
         try:
             body = await request.read()
 
@@ -108,15 +317,21 @@ class WebhookServer:
                 logger.warning("Missing X-GitHub-Event header")
                 return web.Response(status=400, text="Missing event type")
 
+            if self.filter.check_event_type("github", event_type):
+                self._count_received("github", event_type, "filtered")
+                return self._filtered_response()
+
             # Парсим JSON
             data = await request.json()
 
-            logger.info(f"Received GitHub webhook: {event_type}")
+            if self.filter.check("github", event_type, data):
+                self._count_received("github", event_type, "filtered")
+                return self._filtered_response()
 
-            # Обрабатываем событие асинхронно
-            await handle_github_event(event_type, data)
+            logger.info(f"Received GitHub webhook: {event_type}")
 
-            return web.Response(status=200, text="OK")
+            # Обработка выполняется воркерами очереди
+            return await self._enqueue("github", event_type, data, request, body, received_at)
 
         except Exception as e:
             logger.error(f"Error handling GitHub webhook: {e}")
@@ -124,17 +339,45 @@ class WebhookServer:
 
     async def start(self) -> None:
         """Запуск сервера"""
-        runner = web.AppRunner(self.app)
-        await runner.setup()
+        self.queue.start()
+
+        if self.spool:
+            await self.spool.open()
+
+            if settings.webhook_dedup_persist:
+                entries = await self.spool.load_delivery_keys(since=time.time() - self.dedup.ttl)
+                loaded = self.dedup.load(entries)
+                logger.info(f"Restored {loaded} delivery keys for deduplication")
+            # Досылаем события, не обработанные до перезапуска
+            self._replay_needed.set()
+            self._replay_task = asyncio.create_task(self._replay_loop(), name="webhook-spool-replay")
+
+        self.runner = web.AppRunner(self.app)
+        await self.runner.setup()
 
-        site = web.TCPSite(runner, self.host, self.port)
+        site = web.TCPSite(self.runner, self.host, self.port)
         await site.start()
 
         logger.info(f"Webhook server started on {self.host}:{self.port}")
 
     async def stop(self) -> None:
         """Остановка сервера"""
-        await self.app.shutdown()
-        await self.app.cleanup()
+        # Сначала перестаем принимать запросы, затем дорабатываем очередь
+        if self.runner:
+            await self.runner.cleanup()
+            self.runner = None
+        else:
+            await self.app.shutdown()
+            await self.app.cleanup()
+
+        if self._replay_task:
+            self._replay_task.cancel()
+            await asyncio.gather(self._replay_task, return_exceptions=True)
+            self._replay_task = None
+
+        await self.queue.stop(timeout=settings.webhook_drain_timeout)
+
+        if self.spool:
+            await self.spool.close()
         logger.info("Webhook server stopped")
 
@@ -0,0 +1,321 @@
+"""
+Журнал принятых webhook событий на диске
+
+Тело и заголовки запроса записываются в SQLite (WAL) до ответа 2xx,
+поэтому событие, принятое во время перезапуска или во время обработки,
+не теряется. Записи группируются: несколько запросов подтверждаются
+одним коммитом (group commit), что держит пропускную способность на
+уровне тысяч событий в секунду.
+"""
+
+import asyncio
+import json
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from loguru import logger
+
+
+@dataclass
+class SpooledEvent:
+    """Событие, прочитанное из журнала"""
+
+    id: int
+    platform: str
+    event_type: str
+    headers: Dict[str, str]
+    body: bytes
+    received_at: float
+
+
+class WebhookSpool:
+    """Append-only журнал webhook событий с пакетной фиксацией"""
+
+    def __init__(
+            self,
+            path: str,
+            flush_interval: float = 0.005,
+            batch_size: int = 256,
+            retention: float = 3600.0
+    ):
+        """
+        Args:
+            path: Путь к файлу журнала
+            flush_interval: Время накопления пакета перед коммитом (сек)
+            batch_size: Максимальное количество записей в одном коммите
+            retention: Сколько хранить обработанные записи (сек)
+        """
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.retention = retention
+
+        # Все обращения к sqlite выполняются в одном потоке
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._conn: Optional[sqlite3.Connection] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._closing = False
+
+        self._pending: List[Tuple[Tuple[Any, ...], asyncio.Future]] = []
+        self._acks: List[int] = []
+        self._inflight: Set[int] = set()
+        self._last_purge = 0.0
+
+        self.appended = 0
+        self.acked = 0
+        self.commits = 0
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    def _open_sync(self) -> None:
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # В WAL режиме FULL синхронизирует каждый коммит, коммиты группируются выше
+        conn.execute("PRAGMA synchronous=FULL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS spool ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " platform TEXT NOT NULL,"
+            " event_type TEXT NOT NULL,"
+            " headers TEXT NOT NULL,"
+            " body BLOB NOT NULL,"
+            " received_at REAL NOT NULL,"
+            " processed INTEGER NOT NULL DEFAULT 0,"
+            " delivery_key TEXT"
+            ")"
+        )
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(spool)")}
+        if "delivery_key" not in columns:
+            conn.execute("ALTER TABLE spool ADD COLUMN delivery_key TEXT")
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_spool_pending ON spool (processed, id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_spool_received_at ON spool (received_at)")
+        self._conn = conn
+
+    async def open(self) -> None:
+        """Открытие журнала и запуск фоновой фиксации"""
+        if self._conn:
+            return
+
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="webhook-spool")
+        await self._run(self._open_sync)
+
+        self._closing = False
+        self._wakeup = asyncio.Event()
+        self._flusher = asyncio.create_task(self._flush_loop(), name="webhook-spool-flusher")
+        logger.info(f"Webhook spool opened: {self.path}")
+
+    async def append(
+            self,
+            platform: str,
+            event_type: str,
+            headers: Dict[str, str],
+            body: bytes,
+            delivery_key: Optional[str] = None
+    ) -> int:
+        """
+        Запись события в журнал
+
+        Возвращает управление только после того, как запись зафиксирована на диске.
+
+        Args:
+            platform: gitlab или github
+            event_type: Тип события из заголовка
+            headers: Заголовки запроса
+            body: Тело запроса
+            delivery_key: Ключ доставки для восстановления окна дедупликации
+
+        Returns:
+            ID записи в журнале
+        """
+        if not self._conn:
+            raise RuntimeError("Spool is not opened")
+
+        future = asyncio.get_running_loop().create_future()
+        record = (platform, event_type, json.dumps(headers), body, time.time(), delivery_key)
+        self._pending.append((record, future))
+        self._wakeup.set()
+        return await future
+
+    def mark_inflight(self, spool_id: int) -> None:
+        """Событие передано в очередь обработки"""
+        self._inflight.add(spool_id)
+
+    def release(self, spool_id: int) -> None:
+        """Событие не попало в очередь и будет прочитано replay воркером"""
+        self._inflight.discard(spool_id)
+
+    def is_inflight(self, spool_id: int) -> bool:
+        return spool_id in self._inflight
+
+    def ack(self, spool_id: int) -> None:
+        """Отметка об обработке, фиксируется вместе со следующим пакетом"""
+        # Запись остается "в работе", пока отметка не зафиксирована на диске
+        self._acks.append(spool_id)
+        self._wakeup.set()
+
+    async def _flush_loop(self) -> None:
+        while not self._closing:
+            await self._wakeup.wait()
+            # Копим пакет, если он еще не набрался
+            if len(self._pending) < self.batch_size and not self._closing:
+                await asyncio.sleep(self.flush_interval)
+            self._wakeup.clear()
+            await self._flush()
+
+        while self._pending or self._acks:
+            if not await self._flush():
+                break
+
+    async def _flush(self) -> bool:
+        if not self._pending and not self._acks:
+            return True
+
+        batch = self._pending[:self.batch_size]
+        self._pending = self._pending[self.batch_size:]
+        acks, self._acks = self._acks, []
+
+        if self._pending or self._acks:
+            self._wakeup.set()
+
+        purge_before = None
+        now = time.time()
+        if now - self._last_purge > min(self.retention, 60.0):
+            purge_before = now - self.retention
+            self._last_purge = now
+
+        try:
+            ids = await self._run(self._write_batch, [record for record, _ in batch], acks, purge_before)
+        except Exception as e:
+            logger.error(f"Webhook spool write failed: {e}")
+            self._acks.extend(acks)
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return False
+
+        self.commits += 1
+        self.appended += len(batch)
+        self.acked += len(acks)
+        self._inflight.difference_update(acks)
+        # Новые записи сразу считаются переданными в обработку вызывающей стороной
+        self._inflight.update(ids)
+        for (_, future), spool_id in zip(batch, ids):
+            if not future.done():
+                future.set_result(spool_id)
+        return True
+
+    def _write_batch(
+            self,
+            records: List[Tuple[Any, ...]],
+            acks: List[int],
+            purge_before: Optional[float]
+    ) -> List[int]:
+        """Запись пакета одной транзакцией (один fsync на пакет)"""
+        ids = []
+        conn = self._conn
+        conn.execute("BEGIN")
+        try:
+            for record in records:
+                cursor = conn.execute(
+                    "INSERT INTO spool (platform, event_type, headers, body, received_at, delivery_key)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    record
+                )
+                ids.append(cursor.lastrowid)
+
+            if acks:
+                conn.executemany("UPDATE spool SET processed = 1 WHERE id = ?", [(i,) for i in acks])
+
+            if purge_before is not None:
+                conn.execute("DELETE FROM spool WHERE processed = 1 AND received_at < ?", (purge_before,))
+
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return ids
+
+    def _load_pending_sync(self, after_id: int, limit: int) -> List[SpooledEvent]:
+        rows = self._conn.execute(
+            "SELECT id, platform, event_type, headers, body, received_at FROM spool"
+            " WHERE processed = 0 AND id > ? ORDER BY id LIMIT ?",
+            (after_id, limit)
+        ).fetchall()
+        return [
+            SpooledEvent(
+                id=row[0],
+                platform=row[1],
+                event_type=row[2],
+                headers=json.loads(row[3]),
+                body=bytes(row[4]),
+                received_at=row[5]
+            )
+            for row in rows
+        ]
+
+    async def load_pending(self, after_id: int = 0, limit: int = 500) -> List[SpooledEvent]:
+        """
+        Необработанные записи журнала
+
+        Args:
+            after_id: Читать записи с ID больше указанного
+            limit: Размер порции
+        """
+        return await self._run(self._load_pending_sync, after_id, limit)
+
+    def _load_delivery_keys_sync(self, since: float) -> List[Tuple[str, float]]:
+        return self._conn.execute(
+            "SELECT delivery_key, received_at FROM spool"
+            " WHERE received_at >= ? AND delivery_key IS NOT NULL ORDER BY received_at",
+            (since,)
+        ).fetchall()
+
+    async def load_delivery_keys(self, since: float) -> List[Tuple[str, float]]:
+        """
+        Ключи доставок, принятых начиная с указанного времени
+
+        Args:
+            since: Unix время начала окна
+        """
+        return await self._run(self._load_delivery_keys_sync, since)
+
+    @property
+    def backlog(self) -> int:
+        """Записи, ожидающие коммита или обработки"""
+        return len(self._pending) + len(self._inflight)
+
+    async def close(self) -> None:
+        """Фиксация оставшихся записей и закрытие журнала"""
+        if not self._conn:
+            return
+
+        # Поток фиксации дописывает накопленные записи и завершается сам
+        self._closing = True
+        self._wakeup.set()
+        if self._flusher:
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+
+        await self._run(self._conn.close)
+        self._conn = None
+        self._executor.shutdown(wait=True)
+        self._executor = None
+        logger.info("Webhook spool closed")
+
+    def stats(self) -> Dict[str, Any]:
+        """Статистика журнала"""
+        return {
+            "appended": self.appended,
+            "acked": self.acked,
+            "commits": self.commits,
+            "pending_commit": len(self._pending),
+            "inflight": len(self._inflight),
+        }
@@ -0,0 +1,220 @@
+"""
+Шаблоны уведомлений
+
+Уведомление хранится в истории не готовым HTML, а полями: ID шаблона,
+номер объекта (MR/PR/Issue), заголовок, ссылка, статус и компактный payload -
+JSON массив остальных полей шаблона в порядке Template.fields, без ключей.
+HTML собирается при отправке и заново - только при просмотре деталей в /history.
+"""
+
+import json
+from typing import Any, Callable, Dict, NamedTuple, Optional, Sequence, Tuple
+
+PIPELINE_STATUS_TEXT = {"success": "успешно завершен", "failed": "завершен с ошибкой", "canceled": "отменен"}
+WORKFLOW_STATUS_TEXT = {"success": "успешно завершен", "failure": "завершен с ошибкой", "cancelled": "отменен"}
+
+
+class Template(NamedTuple):
+    """Шаблон: поля payload и функция сборки HTML"""
+    id: str
+    fields: Tuple[str, ...]
+    render: Callable[[Dict[str, Any]], str]
+
+
+def _gitlab_note(f: Dict[str, Any]) -> str:
+    return (
+        f"{f['reason']}\n\n"
+        f"<b>Проект:</b> {f['project']}\n"
+        f"<b>{f['noteable_type']}:</b> {f['title']}\n"
+        f"<b>Автор комментария:</b> {f['author']}\n\n"
+        f"<b>Комментарий:</b>\n"
+        f"<code>{f['text']}</code>\n\n"
+        f" <a href='{f['url']}'>Перейти к обсуждению</a>"
+    )
+
+
+def _gitlab_mr_reviewer(f: Dict[str, Any]) -> str:
+    return (
+        f"Вас назначили ревьюером\n\n"
+        f"<b>Проект:</b> {f['project']}\n"
+        f"<b>MR:</b> {f['title']}\n"
+        f"<b>Автор:</b> {f['author']}\n"
+        f"<b>Ветка:</b> {f['source_branch']} → {f['target_branch']}\n\n"
+        f" <a href='{f['url']}'>Перейти к MR</a>"
+    )
+
+
+def _gitlab_mr_merged(f: Dict[str, Any]) -> str:
+    return (
+        f"Ваш MR был вмерджен!\n\n"
+        f"<b>Проект:</b> {f['project']}\n"
+        f"<b>MR:</b> {f['title']}\n"
+        f"<b>Ветка:</b> {f['source_branch']} → {f['target_branch']}\n\n"
+        f" <a href='{f['url']}'>Перейти к MR</a>"
+    )
+
+
+def _gitlab_mr_update(f: Dict[str, Any]) -> str:
+    return (
+        f"Обновление Merge Request\n\n"
+        f"<b>Проект:</b> {f['project']}\n"
+        f"<b>MR:</b> {f['title']}\n"
+        f"<b>Действие:</b> {f['status']}\n"
+        f"<b>Автор:</b> {f['author']}\n\n"
+        f" <a href='{f['url']}'>Перейти к MR</a>"
+    )
+
+
+def _gitlab_pipeline(f: Dict[str, Any]) -> str:
+    return (
+        f"Pipeline {PIPELINE_STATUS_TEXT.get(f['status'], f['status'])}\n\n"
+        f"<b>Проект:</b> {f['project']}\n"
+        f"<b>MR:</b> {f['title']}\n"
+        f"<b>Ветка:</b> {f['ref']}\n"
+        f"<b>Pipeline ID:</b> #{f['pipeline_id']}\n\n"
+        f"<a href='{f['url']}'>Перейти к MR</a>"
+    )
+
+
+def _gitlab_issue(f: Dict[str, Any]) -> str:
+    return (
+        f"Новое событие в Issue\n\n"
+        f"<b>Действие:</b> {f['status']}\n"
+        f"<b>Проект:</b> {f['project']}\n"
+        f"<b>Issue:</b> {f['title']}\n"
+        f"<b>Автор:</b> {f['author']}\n"
+        f"<b>Assignees:</b> {f['assignees'] or 'Нет'}\n\n"
+        f"<a href='{f['url']}'>Перейти к Issue</a>"
+    )
+
+
+def _github_pr_reviewer(f: Dict[str, Any]) -> str:
+    return (
+        f"Вас назначили ревьюером\n\n"
+        f"<b>Репозиторий:</b> {f['project']}\n"
+        f"<b>PR:</b> {f['title']}\n"
+        f"<b>Автор:</b> {f['author']}\n\n"
+        f"<a href='{f['url']}'>Перейти к PR</a>"
+    )
+
+
+def _github_pr_merged(f: Dict[str, Any]) -> str:
+    return (
+        f"Ваш PR был вмерджен!\n\n"
+        f"<b>Репозиторий:</b> {f['project']}\n"
+        f"<b>PR:</b> {f['title']}\n\n"
+        f"<a href='{f['url']}'>Перейти к PR</a>"
+    )
+
+
+def _github_issue_assigned(f: Dict[str, Any]) -> str:
+    return (
+        f"Вас назначили исполнителем Issue\n\n"
+        f"<b>Репозиторий:</b> {f['project']}\n"
+        f"<b>Issue:</b> {f['title']}\n\n"
+        f"<a href='{f['url']}'>Перейти к Issue</a>"
+    )
+
+
+def _github_comment(f: Dict[str, Any]) -> str:
+    return (
+        f"{f['reason']}\n\n"
+        f"<b>Репозиторий:</b> {f['project']}\n"
+        f"<b>Issue:</b> {f['title']}\n"
+        f"<b>Автор комментария:</b> {f['author']}\n\n"
+        f"<b>Комментарий:</b>\n"
+        f"<pre>{f['text']}</pre>\n\n"
+        f"<a href='{f['url']}'>Перейти к комментарию</a>"
+    )
+
+
+def _github_workflow(f: Dict[str, Any]) -> str:
+    return (
+        f"Workflow {WORKFLOW_STATUS_TEXT.get(f['status'], f['status'])}\n\n"
+        f"<b>Репозиторий:</b> {f['project']}\n"
+        f"<b>PR:</b> {f['title']}\n"
+        f"<b>Workflow:</b> {f['workflow']}\n"
+        f"<b>Ветка:</b> {f['branch']}\n\n"
+        f"<a href='{f['url']}'>Перейти к Workflow</a>"
+    )
+
+
+# ID шаблона хранится в БД: существующие ID и порядок полей не меняются
+TEMPLATES: Dict[str, Template] = {
+    template.id: template
+    for template in (
+        Template("gitlab_note", ("reason", "noteable_type", "author", "text"), _gitlab_note),
+        Template("gitlab_mr_reviewer", ("author", "source_branch", "target_branch"), _gitlab_mr_reviewer),
+        Template("gitlab_mr_merged", ("source_branch", "target_branch"), _gitlab_mr_merged),
+        Template("gitlab_mr_update", ("author",), _gitlab_mr_update),
+        Template("gitlab_pipeline", ("ref", "pipeline_id"), _gitlab_pipeline),
+        Template("gitlab_issue", ("author", "assignees"), _gitlab_issue),
+        Template("github_pr_reviewer", ("author",), _github_pr_reviewer),
+        Template("github_pr_merged", (), _github_pr_merged),
+        Template("github_issue_assigned", (), _github_issue_assigned),
+        Template("github_comment", ("reason", "author", "text"), _github_comment),
+        Template("github_workflow", ("workflow", "branch"), _github_workflow),
+    )
+}
+
+
+def encode_payload(values: Sequence[Any]) -> Optional[str]:
+    """Позиционные поля шаблона -> компактный JSON массив"""
+    if not values:
+        return None
+    return json.dumps(list(values), ensure_ascii=False, separators=(",", ":"))
+
+
+def render(
+        template_id: str,
+        project: str,
+        title: Optional[str],
+        url: Optional[str],
+        status: Optional[str] = None,
+        iid: Optional[int] = None,
+        payload: Optional[str] = None
+) -> str:
+    """Сборка HTML из сохраненных полей"""
+    template = TEMPLATES[template_id]
+    values = json.loads(payload) if payload else []
+    fields = dict(zip(template.fields, values))
+    fields.update(project=project, title=title, url=url, status=status, iid=iid)
+    return template.render(fields)
+
+
+def build_notification(
+        template_id: str,
+        project: str,
+        title: Optional[str],
+        url: Optional[str],
+        status: Optional[str] = None,
+        iid: Optional[int] = None,
+        **extra: Any
+) -> Dict[str, Any]:
+    """
+    Поля уведомления для отправки и записи в историю
+
+    Returns:
+        template, object_iid, title, url, status, payload и собранный message
+    """
+    template = TEMPLATES[template_id]
+    payload = encode_payload([extra[name] for name in template.fields])
+    return {
+        "template": template_id,
+        "object_iid": iid,
+        "title": title,
+        "url": url,
+        "status": status,
+        "payload": payload,
+        "message": render(template_id, project, title, url, status, iid, payload),
+    }
+
+
+def render_history(notification: Any) -> str:
+    """HTML уведомления из истории (старые строки хранят готовый message)"""
+    if notification.template:
+        return render(
+            notification.template, notification.project_name, notification.title, notification.url,
+            notification.status, notification.object_iid, notification.payload
+        )
+    return notification.message or ""
@@ -2,6 +2,7 @@
 Базовые mock-утилиты
 """
 
+from types import SimpleNamespace
 from typing import List, Dict, Any, Optional
 from unittest.mock import AsyncMock, MagicMock
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -27,6 +28,25 @@ class MockNotificationSettings:
         self.mention_enabled = kwargs.get("mention_enabled", False)
 
 
+def make_subscriber_row(user, settings=None, event_types: str = "") -> SimpleNamespace:
+    """Строка результата запроса подписчиков (Subscription + User + NotificationSettings)"""
+    from src.webhook.routing import SETTINGS_FLAGS
+
+    row = SimpleNamespace(
+        telegram_id=user.telegram_id,
+        first_name=user.first_name,
+        gitlab_username=user.gitlab_username,
+        github_username=user.github_username,
+        event_types=event_types,
+        settings_id=1 if settings is not None else None,
+    )
+    for flag in SETTINGS_FLAGS:
+        value = getattr(settings, flag, None) if settings is not None else None
+        # Незаданные в тестовых настройках флаги имеют значение по умолчанию
+        setattr(row, flag, True if value is None else value)
+    return row
+
+
 class MockResult:
     """Результат запроса SQLAlchemy"""
 
@@ -111,6 +131,12 @@ class MockGitLabClient:
         self.create_webhook = AsyncMock()
         self.get_current_user = AsyncMock(return_value={"username": "gitlab_test_user"})
 
+    async def iter_projects(self, **kwargs):
+        """Одна страница с результатом get_projects"""
+        projects = await self.get_projects(**kwargs)
+        if projects:
+            yield projects
+
     async def __aenter__(self):
         return self
 
@@ -126,6 +152,12 @@ class MockGitHubClient:
         self.create_webhook = AsyncMock()
         self.get_current_user = AsyncMock(return_value={"login": "github_test_user"})
 
+    async def iter_repositories(self, **kwargs):
+        """Одна страница с результатом get_repositories"""
+        repos = await self.get_repositories(**kwargs)
+        if repos:
+            yield repos
+
     async def __aenter__(self):
         return self
 
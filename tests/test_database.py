@@ -0,0 +1,83 @@
+"""
+Тесты для моделей и работы с БД (src/database)
+"""
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, select, text
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import selectinload
+
+from src.database import Base, User, Subscription, Notification, create_engine
+
+
+@pytest_asyncio.fixture
+async def engine():
+    """In-memory SQLite со схемой приложения"""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def session(engine):
+    """Сессия с пользователем, подпиской и историей уведомлений"""
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with session_factory() as session:
+        session.add(User(telegram_id=1, first_name="Alice"))
+        session.add(Subscription(user_id=1, platform="gitlab", project_id="42", project_name="g/p", event_types="issue"))
+        session.add_all([
+            Notification(user_id=1, platform="gitlab", event_type="issue", project_name="g/p", message="text")
+            for _ in range(20)
+        ])
+        await session.commit()
+        session.expunge_all()
+        yield session
+
+
+@pytest.mark.asyncio
+async def test_user_load_does_not_read_notification_history(engine, session):
+    """select(User) не загружает историю уведомлений"""
+    statements = []
+    event.listen(engine.sync_engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+
+    result = await session.execute(select(User).where(User.telegram_id == 1))
+    user = result.scalar_one()
+
+    assert len(statements) == 1
+    assert "notifications" not in statements[0]
+    with pytest.raises(InvalidRequestError):
+        user.notifications
+
+
+@pytest.mark.asyncio
+async def test_relationships_are_loaded_explicitly(session):
+    """Связи, нужные обработчику, загружаются через options"""
+    result = await session.execute(
+        select(User).options(selectinload(User.subscriptions)).where(User.telegram_id == 1)
+    )
+    user = result.scalar_one()
+
+    assert [sub.project_id for sub in user.subscriptions] == ["42"]
+
+
+@pytest.mark.asyncio
+async def test_sqlite_engine_uses_wal_and_persistent_pool(tmp_path):
+    """Файловая SQLite: WAL, synchronous=NORMAL и переиспользование соединений"""
+    engine = create_engine(f"sqlite+aiosqlite:///{tmp_path / 'app.db'}", echo=False)
+    connects = []
+    event.listen(engine.sync_engine, "connect", lambda *args: connects.append(1))
+    try:
+        for _ in range(3):
+            async with engine.connect() as conn:
+                journal_mode = (await conn.execute(text("PRAGMA journal_mode"))).scalar()
+                synchronous = (await conn.execute(text("PRAGMA synchronous"))).scalar()
+        assert journal_mode == "wal"
+        assert synchronous == 1
+        assert len(connects) == 1
+    finally:
+        await engine.dispose()
@@ -0,0 +1,43 @@
+"""
+Тесты для предварительной фильтрации webhook событий (src/webhook/filters.py)
+"""
+
+from src.webhook.filters import EventFilter, FilterRule, field_not_in
+
+
+def test_default_rules_drop_only_events_without_notifications():
+    """Промежуточные статусы отбрасываются, завершенные проходят"""
+    event_filter = EventFilter()
+
+    assert event_filter.check("github", "workflow_run", {"action": "requested"}) == "github_workflow_not_completed"
+    assert event_filter.check("github", "workflow_run", {"action": "completed"}) is None
+    assert event_filter.check("gitlab", "Pipeline Hook", {"object_attributes": {"status": "pending"}}) \
+        == "gitlab_pipeline_in_progress"
+    assert event_filter.check("gitlab", "Pipeline Hook", {"object_attributes": {"status": "success"}}) \
+        == "gitlab_pipeline_without_mr"
+    assert event_filter.check("gitlab", "Merge Request Hook", {}) is None
+    assert event_filter.check_event_type("github", "star") == "unhandled_event"
+    assert event_filter.check_event_type("github", "issues") is None
+
+    assert event_filter.stats() == {
+        "enabled": True,
+        "passed": 2,
+        "dropped": {
+            "github_workflow_not_completed": 1,
+            "gitlab_pipeline_in_progress": 1,
+            "gitlab_pipeline_without_mr": 1,
+            "unhandled_event": 1,
+        },
+    }
+
+
+def test_disabled_filter_passes_everything():
+    """Выключенный фильтр ничего не отбрасывает"""
+    event_filter = EventFilter(
+        rules=[FilterRule("any", "github", ("issues",), field_not_in(("action",), ()))],
+        enabled=False
+    )
+
+    assert event_filter.check_event_type("github", "star") is None
+    assert event_filter.check("github", "issues", {"action": "closed"}) is None
+    assert event_filter.dropped == {}
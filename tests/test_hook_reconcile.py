@@ -0,0 +1,162 @@
+"""
+Тесты для сверки webhooks (HookReconciler в src/webhook/manager.py)
+"""
+
+import pytest
+import pytest_asyncio
+from unittest.mock import create_autospec, patch
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from src.database import Base, User, Subscription, ProjectHook
+from src.gitlab_api import GitLabClient
+from src.webhook.manager import HookReconciler
+
+HOOK_URL = "https://bot.example/webhook/gitlab"
+
+
+class FakeGitLab:
+    """Webhooks проектов GitLab в памяти"""
+
+    def __init__(self, hooks):
+        self.hooks = hooks
+        self.calls = []
+        self.next_id = 100
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    async def get_project_hooks(self, project_id):
+        self.calls.append(("get", project_id))
+        if project_id not in self.hooks:
+            raise RuntimeError("404")
+        return [dict(hook) for hook in self.hooks[project_id]]
+
+    async def create_project_hook(self, project_id, url, token=None, **flags):
+        self.calls.append(("create", project_id))
+        self.next_id += 1
+        self.hooks[project_id].append({"id": self.next_id, "url": url, **flags})
+        return {"id": self.next_id}
+
+    async def update_project_hook(self, project_id, hook_id, url, token=None, **flags):
+        self.calls.append(("update", project_id, hook_id, token))
+        for hook in self.hooks[project_id]:
+            if hook["id"] == hook_id:
+                hook.update(url=url, **flags)
+
+    async def delete_project_hook(self, project_id, hook_id):
+        self.calls.append(("delete", project_id, hook_id))
+        self.hooks[project_id] = [hook for hook in self.hooks[project_id] if hook["id"] != hook_id]
+
+
+def autospec_client(fake):
+    """Фейк за спецификацией GitLabClient: метод, которого нет в клиенте, или чужая сигнатура роняют тест"""
+    client = create_autospec(GitLabClient, instance=True)
+    client.__aenter__.return_value = client
+    for name in ("get_project_hooks", "create_project_hook", "update_project_hook", "delete_project_hook"):
+        getattr(client, name).side_effect = getattr(fake, name)
+    return client
+
+
+@pytest_asyncio.fixture
+async def session_factory():
+    """In-memory SQLite с подписками на три проекта"""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with factory() as session:
+        session.add_all([
+            User(telegram_id=1, first_name="Alice", gitlab_token="alice"),
+            User(telegram_id=2, first_name="Bob", gitlab_token="bob"),
+            Subscription(user_id=1, platform="gitlab", project_id="1", project_name="g/a",
+                         event_types="merge_request"),
+            Subscription(user_id=2, platform="gitlab", project_id="1", project_name="g/a",
+                         event_types="pipeline"),
+            Subscription(user_id=1, platform="gitlab", project_id="2", project_name="g/b",
+                         event_types="issue"),
+            Subscription(user_id=2, platform="gitlab", project_id="3", project_name="g/c",
+                         event_types="note"),
+            ProjectHook(platform="gitlab", project_id="9", hook_id="90", event_types="issue", ref_count=0),
+        ])
+        await session.commit()
+    yield factory
+    await engine.dispose()
+
+
+@pytest.fixture
+def gitlab():
+    flags = HookReconciler.desired_events("gitlab", ["merge_request", "pipeline"])
+    fake = FakeGitLab({
+        # Верный webhook и его дубль
+        "1": [{"id": 10, "url": HOOK_URL, **flags}, {"id": 11, "url": HOOK_URL, **flags}],
+        # Webhook с устаревшими событиями и чужой webhook
+        "2": [{"id": 20, "url": HOOK_URL, "merge_requests_events": True}, {"id": 21, "url": "https://ci"}],
+        # Webhook отсутствует
+        "3": [],
+        # Проект без подписок
+        "9": [{"id": 90, "url": HOOK_URL, "issues_events": True}],
+    })
+    with patch("src.webhook.manager.settings") as settings:
+        settings.gitlab_webhook_url = HOOK_URL
+        settings.gitlab_webhook_secret = "s3cret"
+        settings.gitlab_private_token = "admin"
+        settings.webhook_reconcile_concurrency = 4
+        with patch.object(HookReconciler, "_client", lambda self, platform, token: autospec_client(fake)):
+            yield fake
+
+
+@pytest.mark.asyncio
+async def test_reconcile_applies_diff(session_factory, gitlab):
+    """Дубли и webhooks без подписок удаляются, недостающие создаются, устаревшие обновляются"""
+    report = await HookReconciler(session_factory).run()
+
+    assert (report.projects, report.unchanged) == (4, 0)
+    assert (report.created, report.updated, report.deleted, report.failed) == (1, 1, 2, 0)
+    # 4 чтения + создание + обновление + 2 удаления
+    assert report.api_calls == 8
+    assert [hook["id"] for hook in gitlab.hooks["1"]] == [10]
+    assert [hook["id"] for hook in gitlab.hooks["2"]] == [20, 21]
+    assert gitlab.hooks["2"][0]["issues_events"] is True
+    assert ("update", "2", 20, "s3cret") in gitlab.calls
+    assert gitlab.hooks["9"] == []
+
+    async with session_factory() as session:
+        hooks = {hook.project_id: hook for hook in (await session.execute(select(ProjectHook))).scalars()}
+        assert set(hooks) == {"1", "2", "3"}
+        assert (hooks["1"].hook_id, hooks["1"].event_types, hooks["1"].ref_count) == ("10", "merge_request,pipeline", 2)
+        assert hooks["3"].hook_id == "101"
+        webhook_ids = (await session.execute(select(Subscription.webhook_id))).scalars().all()
+        assert sorted(webhook_ids) == ["10", "10", "101", "20"]
+
+    # Повторная сверка только читает webhooks
+    report = await HookReconciler(session_factory).run()
+    assert (report.unchanged, report.api_calls) == (3, 3)
+
+
+@pytest.mark.asyncio
+async def test_dry_run_only_reads(session_factory, gitlab):
+    """dry-run считает изменения, но не вызывает изменяющие методы API и не пишет в БД"""
+    report = await HookReconciler(session_factory, dry_run=True).run()
+
+    assert (report.created, report.updated, report.deleted) == (1, 1, 2)
+    assert all(call[0] == "get" for call in gitlab.calls)
+    async with session_factory() as session:
+        assert (await session.execute(select(ProjectHook))).scalars().all()[0].project_id == "9"
+
+
+@pytest.mark.asyncio
+async def test_inaccessible_project_is_reported(session_factory, gitlab):
+    """Проект, недоступный ни одному токену, попадает в отчет, запись реестра сохраняется"""
+    del gitlab.hooks["9"]
+
+    report = await HookReconciler(session_factory).run()
+
+    assert report.failed == 1
+    assert report.errors[0].startswith("gitlab:9:")
+    async with session_factory() as session:
+        result = await session.execute(select(ProjectHook).where(ProjectHook.project_id == "9"))
+        assert result.scalar_one().hook_id == "90"
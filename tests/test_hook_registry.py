@@ -0,0 +1,121 @@
+"""
+Тесты для реестра webhooks проектов (src/webhook/hook_registry.py)
+"""
+
+import pytest
+import pytest_asyncio
+from unittest.mock import AsyncMock, patch
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from src.database import Base, User, Subscription, ProjectHook
+from src.webhook.hook_registry import sync_project_hook, merge_event_types
+
+
+@pytest_asyncio.fixture
+async def session():
+    """In-memory SQLite с двумя пользователями"""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with session_factory() as session:
+        session.add_all([User(telegram_id=1, first_name="Alice"), User(telegram_id=2, first_name="Bob")])
+        await session.commit()
+        yield session
+    await engine.dispose()
+
+
+@pytest.fixture
+def manager():
+    """WebhookManager без обращений к API"""
+    with patch("src.webhook.hook_registry.WebhookManager") as manager, \
+            patch("src.webhook.hook_registry.settings") as settings:
+        manager.setup_webhook = AsyncMock(return_value=777)
+        manager.update_webhook = AsyncMock(return_value=True)
+        manager.remove_webhook = AsyncMock(return_value=True)
+        settings.gitlab_private_token = ""
+        manager.settings = settings
+        yield manager
+
+
+async def subscribe(session, user_id, event_types):
+    subscription = Subscription(
+        user_id=user_id, platform="gitlab", project_id="42", project_name="g/p", event_types=event_types
+    )
+    session.add(subscription)
+    await session.commit()
+    return await sync_project_hook(session, "gitlab", "42", "token"), subscription
+
+
+def test_merge_event_types():
+    """Объединение событий подписок без дублей"""
+    assert merge_event_types(["merge_request,issue", "issue,note", ""]) == ["issue", "merge_request", "note"]
+
+
+@pytest.mark.asyncio
+async def test_second_subscriber_reuses_hook_and_widens_events(session, manager):
+    """Второй подписчик не создает webhook, а расширяет его события"""
+    hook, _ = await subscribe(session, 1, "merge_request")
+    assert hook.hook_id == "777"
+    assert hook.ref_count == 1
+
+    hook, _ = await subscribe(session, 2, "pipeline,merge_request")
+
+    manager.setup_webhook.assert_awaited_once()
+    assert manager.update_webhook.await_args[0][:5] == ("gitlab", "42", 777, "token", ["merge_request", "pipeline"])
+    assert hook.ref_count == 2
+    assert hook.event_types == "merge_request,pipeline"
+
+    # Повторная синхронизация без изменений не обращается к API
+    await sync_project_hook(session, "gitlab", "42", "token")
+    assert manager.update_webhook.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_hook_is_removed_with_last_subscription(session, manager):
+    """Отписка сужает события, последняя отписка удаляет webhook"""
+    _, first = await subscribe(session, 1, "merge_request")
+    _, second = await subscribe(session, 2, "pipeline")
+
+    await session.delete(second)
+    await session.commit()
+    hook = await sync_project_hook(session, "gitlab", "42", "token")
+    assert hook.ref_count == 1
+    assert hook.event_types == "merge_request"
+
+    await session.delete(first)
+    await session.commit()
+    assert await sync_project_hook(session, "gitlab", "42", "token") is None
+
+    manager.remove_webhook.assert_awaited_once()
+    assert (await session.execute(select(ProjectHook))).scalars().all() == []
+
+
+@pytest.mark.asyncio
+async def test_failed_removal_keeps_orphan_record(session, manager):
+    """Если webhook не удалось удалить, запись остается с ref_count=0"""
+    manager.remove_webhook.return_value = False
+    _, subscription = await subscribe(session, 1, "issue")
+
+    await session.delete(subscription)
+    await session.commit()
+    hook = await sync_project_hook(session, "gitlab", "42", "token")
+
+    assert hook.ref_count == 0
+    assert hook.hook_id == "777"
+
+
+@pytest.mark.asyncio
+async def test_removal_falls_back_to_admin_token(session, manager):
+    """Webhook, который не удалил токен последнего подписчика, удаляется токеном администратора"""
+    manager.settings.gitlab_private_token = "admin"
+    manager.remove_webhook.side_effect = [False, True]
+    _, subscription = await subscribe(session, 1, "issue")
+
+    await session.delete(subscription)
+    await session.commit()
+
+    assert await sync_project_hook(session, "gitlab", "42", "token") is None
+    assert [call.args[3] for call in manager.remove_webhook.await_args_list] == ["token", "admin"]
+    assert (await session.execute(select(ProjectHook))).scalars().all() == []
@@ -0,0 +1,358 @@
+"""
+Тесты для общего пула HTTP сессий (src/http_client)
+"""
+
+import asyncio
+import time
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from src.http_client import HttpSessionPool, Priority, RateLimitScheduler, ResponseCache
+from src.http_client.ratelimit import PrioritySemaphore, TokenBudget
+from src.gitlab_api import GitLabClient, GitLabActions
+from src.github_api import GitHubClient
+from src.metrics import API_REQUESTS
+
+
+@pytest_asyncio.fixture
+async def api_server():
+    """Локальный API, запоминающий заголовки и удаленные порты клиентов"""
+    seen = []
+
+    async def current_user(request):
+        seen.append((request.headers.get("PRIVATE-TOKEN"), request.transport.get_extra_info("peername")[1]))
+        return web.json_response({"username": "user"})
+
+    async def approve(request):
+        seen.append((request.headers.get("PRIVATE-TOKEN"), request.transport.get_extra_info("peername")[1]))
+        return web.json_response({"approved": True}, status=201)
+
+    app = web.Application()
+    app.router.add_get("/api/v4/user", current_user)
+    app.router.add_post("/api/v4/projects/1/merge_requests/2/approve", approve)
+
+    server = TestServer(app)
+    await server.start_server()
+    server.seen = seen
+    yield server
+    await server.close()
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    """Отдельный пул, подставленный вместо общего"""
+    pool = HttpSessionPool()
+    monkeypatch.setattr("src.http_client.pool.http_sessions", pool)
+    return pool
+
+
+@pytest.mark.asyncio
+async def test_clients_reuse_one_connection_per_host(api_server, pool):
+    """Повторные клиенты разных пользователей используют одно соединение"""
+    base_url = str(api_server.make_url("")).rstrip("/")
+
+    for token in ("token-a", "token-b"):
+        async with GitLabClient(base_url, token) as client:
+            assert await client.get_current_user() == {"username": "user"}
+
+    actions = GitLabActions("token-c", base_url=f"{base_url}/api/v4")
+    assert await actions.approve_merge_request("1", 2) == {"approved": True}
+
+    tokens = [token for token, _ in api_server.seen]
+    ports = {port for _, port in api_server.seen}
+    assert tokens == ["token-a", "token-b", "token-c"]
+    assert len(ports) == 1
+    assert pool.stats() == {"hosts": 1, "created": 1}
+
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_pool_keeps_separate_sessions_per_host(pool):
+    """GitLab и GitHub получают разные сессии, выход из клиента их не закрывает"""
+    async with GitLabClient("https://gitlab.example.com", "token") as gitlab:
+        gitlab_session = gitlab.session
+    async with GitHubClient("token") as github:
+        github_session = github.session
+
+    assert gitlab_session is not github_session
+    assert not gitlab_session.closed
+
+    await pool.close()
+    assert gitlab_session.closed and github_session.closed
+
+
+@pytest_asyncio.fixture
+async def etag_server():
+    """Локальный API с ETag: на совпадающий If-None-Match отвечает 304"""
+    requests = []
+
+    async def hooks(request):
+        requests.append(request.headers.get("If-None-Match"))
+        etag = f'"{request.headers.get("PRIVATE-TOKEN")}-v1"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.json_response([{"id": 1, "url": "https://example.com/hook"}], headers={"ETag": etag})
+
+    app = web.Application()
+    app.router.add_get("/api/v4/projects/1/hooks", hooks)
+
+    server = TestServer(app)
+    await server.start_server()
+    server.requests = requests
+    yield server
+    await server.close()
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    """Отдельный кэш ответов, подставленный в клиенты"""
+    cache = ResponseCache(max_entries=2)
+    monkeypatch.setattr("src.gitlab_api.client.response_cache", cache)
+    monkeypatch.setattr("src.github_api.client.response_cache", cache)
+    return cache
+
+
+@pytest.mark.asyncio
+async def test_not_modified_response_is_served_from_cache(etag_server, pool, cache):
+    """Повторный GET отправляет If-None-Match, а тело 304 берется из кэша"""
+    base_url = str(etag_server.make_url("")).rstrip("/")
+
+    async with GitLabClient(base_url, "token-a") as client:
+        first = await client.get_project_hooks("1")
+        first.append({"id": 2})
+        second = await client.get_project_hooks("1")
+
+    await pool.close()
+
+    assert second == [{"id": 1, "url": "https://example.com/hook"}]
+    assert etag_server.requests == [None, '"token-a-v1"']
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_cache_is_separated_by_token(etag_server, pool, cache):
+    """Ответ одного токена не используется для другого"""
+    base_url = str(etag_server.make_url("")).rstrip("/")
+
+    for token in ("token-a", "token-b"):
+        async with GitLabClient(base_url, token) as client:
+            await client.get_project_hooks("1")
+
+    await pool.close()
+
+    assert etag_server.requests == [None, None]
+    assert cache.stats()["entries"] == 2
+
+
+@pytest.mark.asyncio
+async def test_not_modified_with_evicted_entry_is_retried_outside_token_slot(etag_server, pool, cache, monkeypatch):
+    """304 на вытесненную запись повторяется без условий, не ожидая второй слот токена"""
+    base_url = str(etag_server.make_url("")).rstrip("/")
+    monkeypatch.setattr("src.gitlab_api.client.rate_limiter", RateLimitScheduler(concurrency_per_token=1))
+    revalidated = cache.revalidated
+
+    def evicted_before_revalidation(key):
+        cache.clear()
+        return revalidated(key)
+
+    async with GitLabClient(base_url, "token-a") as client:
+        await client.get_project_hooks("1")
+        monkeypatch.setattr(cache, "revalidated", evicted_before_revalidation)
+        hooks = await asyncio.wait_for(client.get_project_hooks("1"), timeout=2)
+
+    await pool.close()
+
+    assert hooks == [{"id": 1, "url": "https://example.com/hook"}]
+    assert etag_server.requests == [None, '"token-a-v1"', None]
+
+
+def test_cache_evicts_least_recently_used():
+    """При превышении лимита вытесняется самая старая запись"""
+    cache = ResponseCache(max_entries=2)
+    keys = [ResponseCache.make_key("token", f"https://api/{i}") for i in range(3)]
+
+    cache.store(keys[0], b"[0]", {"ETag": '"0"'})
+    cache.store(keys[1], b"[1]", {"ETag": '"1"'})
+    assert cache.revalidated(keys[0])[0] == [0]
+    cache.store(keys[2], b"[2]", {"ETag": '"2"'})
+
+    assert cache.conditional_headers(keys[1]) == {}
+    assert cache.conditional_headers(keys[0]) == {"If-None-Match": '"0"'}
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] == 6
+
+
+@pytest_asyncio.fixture
+async def flaky_server():
+    """Локальный API: сначала 429 / 503, затем успешный ответ с заголовками лимита"""
+    calls = {"limited": 0, "unavailable": 0, "merge": 0, "approve": 0}
+
+    async def limited(request):
+        calls["limited"] += 1
+        if calls["limited"] == 1:
+            return web.json_response({"message": "Too Many Requests"}, status=429, headers={"Retry-After": "0"})
+        return web.json_response({"username": "user"}, headers={
+            "RateLimit-Limit": "100",
+            "RateLimit-Remaining": "42",
+            "RateLimit-Reset": "9999999999",
+        })
+
+    async def unavailable(request):
+        calls["unavailable"] += 1
+        if calls["unavailable"] < 3:
+            return web.Response(status=503)
+        return web.json_response([])
+
+    async def merge(request):
+        calls["merge"] += 1
+        return web.Response(status=502)
+
+    async def approve(request):
+        calls["approve"] += 1
+        return web.Response(status=502)
+
+    app = web.Application()
+    app.router.add_get("/api/v4/user", limited)
+    app.router.add_post("/api/v4/projects/1/merge_requests/2/approve", approve)
+    app.router.add_get("/api/v4/projects/1/hooks", unavailable)
+    app.router.add_put("/api/v4/projects/1/merge_requests/2/merge", merge)
+
+    server = TestServer(app)
+    await server.start_server()
+    server.calls = calls
+    yield server
+    await server.close()
+
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    """Планировщик с короткими задержками, подставленный в клиенты"""
+    scheduler = RateLimitScheduler(max_retries=3, backoff_base=0.001)
+    monkeypatch.setattr("src.gitlab_api.client.rate_limiter", scheduler)
+    monkeypatch.setattr("src.gitlab_api.actions.rate_limiter", scheduler)
+    return scheduler
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_and_unavailable_responses_are_retried(flaky_server, pool, scheduler):
+    """429 и 503 повторяются, остаток лимита читается из заголовков"""
+    base_url = str(flaky_server.make_url("")).rstrip("/")
+    limited_before = API_REQUESTS.value(flaky_server.host, "GET", "429")
+
+    async with GitLabClient(base_url, "token") as client:
+        assert await client.get_current_user() == {"username": "user"}
+        assert await client.get_project_hooks("1") == []
+
+    await pool.close()
+
+    # Каждая попытка попадает в метрики со своим статусом
+    assert API_REQUESTS.value(flaky_server.host, "GET", "429") - limited_before == 1
+
+    assert flaky_server.calls["limited"] == 2
+    assert flaky_server.calls["unavailable"] == 3
+    assert scheduler.stats()["retries"] == 3
+    assert scheduler.stats()["throttled"] == 1
+    assert scheduler.budget("token").remaining == 42
+
+
+@pytest.mark.asyncio
+async def test_server_error_retries_are_bounded(flaky_server, pool, scheduler):
+    """5xx повторяется ограниченное число раз и только для идемпотентных методов"""
+    base_url = str(flaky_server.make_url("")).rstrip("/")
+    actions = GitLabActions("token", base_url=f"{base_url}/api/v4")
+
+    with pytest.raises(Exception):
+        await actions.merge_merge_request("1", 2)
+    with pytest.raises(Exception):
+        await actions.approve_merge_request("1", 2)
+
+    await pool.close()
+
+    # PUT идемпотентен: первая попытка и max_retries повторов; POST не повторяется
+    assert flaky_server.calls["merge"] == 4
+    assert flaky_server.calls["approve"] == 1
+
+
+@pytest.mark.asyncio
+async def test_interactive_requests_are_released_before_background():
+    """Освободившийся слот получает интерактивный запрос, даже если он встал в очередь позже"""
+    semaphore = PrioritySemaphore(1)
+    await semaphore.acquire(Priority.DEFAULT)
+    order = []
+
+    async def worker(priority, name):
+        await semaphore.acquire(priority)
+        order.append(name)
+        semaphore.release()
+
+    tasks = [asyncio.create_task(worker(Priority.BACKGROUND, f"background-{i}")) for i in range(3)]
+    await asyncio.sleep(0)
+    tasks.append(asyncio.create_task(worker(Priority.INTERACTIVE, "approve")))
+    await asyncio.sleep(0)
+
+    semaphore.release()
+    await asyncio.gather(*tasks)
+
+    assert order == ["approve", "background-0", "background-1", "background-2"]
+
+
+def test_background_requests_keep_budget_reserve():
+    """На исходе лимита фоновые запросы ждут сброса, а интерактивные идут сразу"""
+    budget = TokenBudget(concurrency=1)
+    budget.update({
+        "X-RateLimit-Limit": "5000",
+        "X-RateLimit-Remaining": "300",
+        "X-RateLimit-Reset": str(int(time.time()) + 60),
+    })
+
+    assert budget.delay(Priority.BACKGROUND, reserve=0.1) > 50
+    assert budget.delay(Priority.INTERACTIVE, reserve=0.1) == 0
+    assert budget.pace(Priority.INTERACTIVE, reserve=0.1) == 0
+
+    # Обычные запросы распределяются по окну до сброса
+    first = budget.pace(Priority.DEFAULT, reserve=0.1)
+    second = budget.pace(Priority.DEFAULT, reserve=0.1)
+    assert first == 0
+    assert second == pytest.approx(60 / 300, rel=0.1)
+
+
+def test_headroom_reports_most_loaded_token():
+    """Запас лимита берется по самому загруженному токену с несброшенным лимитом"""
+    scheduler = RateLimitScheduler()
+    assert scheduler.headroom() == (None, None)
+
+    reset = str(int(time.time()) + 60)
+    scheduler.budget("a").update({"RateLimit-Limit": "2000", "RateLimit-Remaining": "1500", "RateLimit-Reset": reset})
+    scheduler.budget("b").update({"RateLimit-Limit": "5000", "RateLimit-Remaining": "1000", "RateLimit-Reset": reset})
+    scheduler.budget("c").update({"RateLimit-Limit": "10", "RateLimit-Remaining": "0", "RateLimit-Reset": "0"})
+
+    assert scheduler.headroom() == (pytest.approx(0.2), 1000)
+
+
+@pytest.mark.asyncio
+async def test_token_slot_is_held_until_body_is_read(api_server, pool):
+    """Слот токена занят, пока тело ответа не прочитано"""
+    scheduler = RateLimitScheduler(concurrency_per_token=1)
+    session = pool.get(str(api_server.make_url("")))
+    url = str(api_server.make_url("/api/v4/user"))
+
+    async def second_request():
+        async with scheduler.request(session, "GET", url, token="token") as response:
+            return await response.json()
+
+    async with scheduler.request(session, "GET", url, token="token") as response:
+        second = asyncio.create_task(second_request())
+        await asyncio.sleep(0.05)
+        # Второй запрос ждет слот, пока первый ответ не дочитан
+        assert len(api_server.seen) == 1
+        assert scheduler.stats()["waiting"] == 1
+        assert await response.json() == {"username": "user"}
+
+    assert await asyncio.wait_for(second, timeout=1) == {"username": "user"}
+    assert len(api_server.seen) == 2
+    await pool.close()
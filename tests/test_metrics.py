@@ -0,0 +1,102 @@
+"""
+Тесты для метрик Prometheus (src/metrics.py)
+"""
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.metrics import (
+    DB_QUERIES,
+    HANDLER_DURATION,
+    HANDLER_ERRORS,
+    NOTIFICATIONS_GENERATED,
+    MetricsRegistry,
+    event_scope,
+    instrument_engine,
+    observe_handler,
+)
+
+
+def test_render_counter_and_histogram():
+    """Счетчики и накопленные корзины гистограммы в текстовом формате"""
+    registry = MetricsRegistry()
+    counter = registry.counter("events_total", "События", ("platform",))
+    histogram = registry.histogram("latency_seconds", "Задержка", ("stage",), buckets=(0.1, 1.0))
+
+    counter.inc("gitlab")
+    counter.inc("gitlab", amount=2)
+    counter.inc('git"hub')
+    histogram.observe(0.05, "process")
+    histogram.observe(0.5, "process")
+    histogram.observe(3.0, "process")
+
+    lines = registry.render().splitlines()
+    assert "# TYPE events_total counter" in lines
+    assert 'events_total{platform="gitlab"} 3' in lines
+    assert 'events_total{platform="git\\"hub"} 1' in lines
+    assert "# TYPE latency_seconds histogram" in lines
+    assert 'latency_seconds_bucket{stage="process",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{stage="process",le="1"} 2' in lines
+    assert 'latency_seconds_bucket{stage="process",le="+Inf"} 3' in lines
+    assert 'latency_seconds_sum{stage="process"} 3.55' in lines
+    assert 'latency_seconds_count{stage="process"} 3' in lines
+
+
+def test_duplicate_metric_name_is_rejected():
+    registry = MetricsRegistry()
+    registry.gauge("queue_depth", "Очередь")
+
+    with pytest.raises(ValueError):
+        registry.counter("queue_depth", "Очередь")
+
+
+@pytest.mark.asyncio
+async def test_observe_handler_counts_duration_and_notifications():
+    """Декоратор обработчика считает время, уведомления и исключения"""
+
+    @observe_handler
+    async def handle_test_event(data):
+        if data.get("fail"):
+            raise RuntimeError("boom")
+        return [{"platform": "gitlab", "event_type": "test_event"}] * 2
+
+    before = NOTIFICATIONS_GENERATED.value("gitlab", "test_event")
+
+    assert len(await handle_test_event({})) == 2
+    with pytest.raises(RuntimeError):
+        await handle_test_event({"fail": True})
+
+    assert handle_test_event.__name__ == "handle_test_event"
+    assert HANDLER_DURATION.count("handle_test_event") == 2
+    assert HANDLER_ERRORS.value("handle_test_event") == 1
+    assert NOTIFICATIONS_GENERATED.value("gitlab", "test_event") - before == 2
+
+
+@pytest_asyncio.fixture
+async def engine(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    instrument_engine(engine)
+    yield engine
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_db_queries_are_labelled_with_current_event(engine):
+    """Запросы к БД относятся к событию, внутри которого выполнены"""
+    label = "gitlab:Metrics Test Hook"
+
+    with event_scope("gitlab", "Metrics Test Hook"):
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            await conn.execute(text("SELECT 2"))
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 3"))
+        with pytest.raises(Exception):
+            await conn.execute(text("SELECT * FROM missing_table"))
+
+    assert DB_QUERIES.value(label) == 2
+    # Запрос с ошибкой не оставляет незакрытого времени начала
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 4"))
@@ -0,0 +1,74 @@
+"""
+Тесты для миграций схемы БД (src/database/migrations)
+"""
+
+import pytest
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from sqlalchemy import inspect, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.database import Base
+from src.database.migrate import alembic_config, upgrade_schema
+
+
+def schema_diff(connection):
+    context = MigrationContext.configure(connection)
+    return compare_metadata(context, Base.metadata)
+
+
+@pytest.mark.asyncio
+async def test_migrations_match_models(tmp_path):
+    """Схема после всех миграций совпадает с моделями"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'app.db'}")
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(upgrade_schema)
+            assert await conn.run_sync(schema_diff) == []
+            # Повторный запуск ничего не делает
+            await conn.run_sync(upgrade_schema)
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_legacy_database_is_stamped_and_upgraded(tmp_path):
+    """База без alembic_version получает индексы, дубли подписок удаляются"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'legacy.db'}")
+
+    def create_legacy(connection):
+        command.upgrade(alembic_config(connection), "0001")
+        connection.execute(text("DROP TABLE alembic_version"))
+        connection.execute(text(
+            "INSERT INTO users (id, telegram_id, is_active, created_at, updated_at) "
+            "VALUES (1, 100, 1, '2024-01-01', '2024-01-01')"
+        ))
+        for subscription_id, event_types in ((1, 'issue'), (2, 'issue,pipeline')):
+            connection.execute(text(
+                "INSERT INTO subscriptions (id, user_id, platform, project_id, project_name, event_types, "
+                f"is_active, created_at) VALUES ({subscription_id}, 100, 'gitlab', '42', 'g/p', "
+                f"'{event_types}', 1, '2024-01-01')"
+            ))
+
+    def indexes(connection):
+        inspector = inspect(connection)
+        return {
+            table: {index["name"] for index in inspector.get_indexes(table)}
+            for table in ("notifications", "subscriptions")
+        }
+
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(create_legacy)
+        async with engine.begin() as conn:
+            await conn.run_sync(upgrade_schema)
+            assert await conn.run_sync(schema_diff) == []
+            found = await conn.run_sync(indexes)
+            rows = (await conn.execute(text("SELECT id, event_types FROM subscriptions"))).all()
+
+        assert {"ix_notifications_user_thread", "ix_notifications_user_sent_at"} <= found["notifications"]
+        assert "ix_subscriptions_platform_project_active" in found["subscriptions"]
+        assert rows == [(2, "issue,pipeline")]
+    finally:
+        await engine.dispose()
@@ -0,0 +1,327 @@
+"""
+Тесты для отправки уведомлений (src/webhook/notifier.py)
+"""
+
+import asyncio
+import time
+
+import pytest
+import pytest_asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import SendMessage
+
+from src.database import Base, Notification
+from src.webhook.templates import build_notification, render_history
+from src.webhook.notifier import (
+    DeliveryEngine,
+    DeliveryDropped,
+    NotificationHistoryWriter,
+    send_personalized_notifications,
+    set_bot_instance,
+)
+from tests.mocks import MockAsyncSession, MockBot
+
+
+def retry_after(chat_id: int, seconds: int = 0) -> TelegramRetryAfter:
+    return TelegramRetryAfter(
+        method=SendMessage(chat_id=chat_id, text=""),
+        message="Too Many Requests",
+        retry_after=seconds
+    )
+
+
+@pytest.fixture
+def bot():
+    """Бот, запоминающий время и порядок отправки"""
+    bot = MockBot()
+    bot.calls = []
+
+    async def send_message(chat_id, text, **kwargs):
+        bot.calls.append((chat_id, text, time.monotonic()))
+        await asyncio.sleep(0.02)
+        return SimpleNamespace(message_id=len(bot.calls))
+
+    bot.send_message.side_effect = send_message
+    return bot
+
+
+@pytest.mark.asyncio
+async def test_messages_to_one_chat_are_ordered_and_rate_limited(bot):
+    """Сообщения в один чат уходят по порядку и не чаще chat_rate"""
+    engine = DeliveryEngine(bot, global_rate=1000, chat_rate=20)
+
+    await asyncio.gather(*[engine.send_message(1, f"msg-{i}") for i in range(3)])
+    await engine.stop(timeout=1)
+
+    assert [text for _, text, _ in bot.calls] == ["msg-0", "msg-1", "msg-2"]
+    times = [sent_at for _, _, sent_at in bot.calls]
+    assert all(b - a >= 0.045 for a, b in zip(times, times[1:]))
+
+
+@pytest.mark.asyncio
+async def test_messages_to_different_chats_are_sent_concurrently(bot):
+    """Разные чаты обрабатываются параллельно"""
+    engine = DeliveryEngine(bot, global_rate=1000, chat_rate=1, concurrency=20)
+
+    started = time.monotonic()
+    await asyncio.gather(*[engine.send_message(chat_id, "msg") for chat_id in range(20)])
+    elapsed = time.monotonic() - started
+    await engine.stop(timeout=1)
+
+    assert len(bot.calls) == 20
+    assert elapsed < 0.2
+    assert engine.stats()["sent"] == 20
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_chat_does_not_delay_other_chats(bot):
+    """Чат, ожидающий своего лимита, не задерживает сообщения в другие чаты"""
+    engine = DeliveryEngine(bot, global_rate=1000, chat_rate=1)
+
+    busy = asyncio.gather(engine.send_message(1, "first"), engine.send_message(1, "second"))
+    await asyncio.sleep(0.1)
+
+    started = time.monotonic()
+    await engine.send_message(2, "other chat")
+    elapsed = time.monotonic() - started
+
+    await busy
+    await engine.stop(timeout=1)
+
+    assert elapsed < 0.3
+    assert [text for _, text, _ in bot.calls] == ["first", "other chat", "second"]
+
+
+@pytest.mark.asyncio
+async def test_retry_after_reschedules_message(bot):
+    """После TelegramRetryAfter сообщение отправляется повторно, порядок в чате сохраняется"""
+    original = bot.send_message.side_effect
+    failures = [retry_after(1)]
+
+    async def send_message(chat_id, text, **kwargs):
+        if text == "first" and failures:
+            raise failures.pop()
+        return await original(chat_id, text, **kwargs)
+
+    bot.send_message.side_effect = send_message
+    engine = DeliveryEngine(bot, global_rate=1000, chat_rate=1000)
+
+    await asyncio.gather(engine.send_message(1, "first"), engine.send_message(1, "second"))
+    await engine.stop(timeout=1)
+
+    assert [text for _, text, _ in bot.calls] == ["first", "second"]
+    assert engine.retried == 1
+    assert engine.dropped == 0
+
+
+@pytest.mark.asyncio
+async def test_message_is_dropped_after_max_retries(bot):
+    """Сообщение отбрасывается после исчерпания повторов"""
+    bot.send_message.side_effect = retry_after(1)
+    engine = DeliveryEngine(bot, global_rate=1000, chat_rate=1000, max_retries=2)
+
+    with pytest.raises(DeliveryDropped):
+        await engine.send_message(1, "msg")
+    await engine.stop(timeout=1)
+
+    assert bot.send_message.await_count == 3
+    assert engine.stats()["dropped"] == 1
+
+
+@pytest.mark.asyncio
+async def test_submit_rejects_when_queue_is_full(bot):
+    """При переполнении очереди сообщение не принимается"""
+    engine = DeliveryEngine(bot, global_rate=1000, chat_rate=100, max_pending=2)
+
+    futures = [engine.submit(1, text="a"), engine.submit(1, text="b")]
+    with pytest.raises(DeliveryDropped):
+        engine.submit(2, text="c")
+
+    await asyncio.gather(*futures)
+    await engine.stop(timeout=1)
+    assert engine.dropped == 1
+
+
+@pytest_asyncio.fixture
+async def session_factory(tmp_path):
+    """Фабрика сессий SQLite со схемой приложения"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    await engine.dispose()
+
+
+def history_row(user_id: int, message_id: int) -> dict:
+    return {
+        "user_id": user_id,
+        "platform": "gitlab",
+        "event_type": "issue_assigned",
+        "project_name": "test/project",
+        "message": "Test",
+        "telegram_message_id": message_id,
+        "meta_data": '{"issue_iid": 1}',
+    }
+
+
+async def load_notifications(session_factory):
+    async with session_factory() as session:
+        result = await session.execute(select(Notification).order_by(Notification.id))
+        return result.scalars().all()
+
+
+@pytest.mark.asyncio
+async def test_history_writer_batches_concurrent_events(session_factory):
+    """Строки нескольких событий записываются одним пакетом"""
+    writer = NotificationHistoryWriter(session_factory, flush_interval=0.01)
+
+    results = await asyncio.gather(
+        writer.write([history_row(1, 10), history_row(2, 11)]),
+        writer.write([history_row(3, 12)])
+    )
+    await writer.stop()
+
+    assert results == [True, True]
+    assert writer.flushes == 1
+    notifications = await load_notifications(session_factory)
+    assert [n.telegram_message_id for n in notifications] == [10, 11, 12]
+    assert notifications[0].meta_data == '{"issue_iid": 1}'
+
+
+@pytest.mark.asyncio
+async def test_history_writer_retries_failed_flush(session_factory):
+    """Ошибка записи повторяется, строки сохраняются один раз"""
+    calls = 0
+
+    class FlakySession:
+        def __init__(self):
+            self.session = session_factory()
+
+        async def __aenter__(self):
+            nonlocal calls
+            calls += 1
+            if calls == 1:
+                raise OSError("database is locked")
+            return await self.session.__aenter__()
+
+        async def __aexit__(self, *args):
+            return await self.session.__aexit__(*args)
+
+    writer = NotificationHistoryWriter(FlakySession, flush_interval=0, retry_delay=0)
+
+    assert await writer.write([history_row(1, 10)]) is True
+    await writer.stop()
+
+    assert writer.retries == 1
+    assert len(await load_notifications(session_factory)) == 1
+
+
+@pytest.mark.asyncio
+async def test_history_writer_stop_during_flush_keeps_all_rows(session_factory):
+    """Остановка во время записи пакета не теряет строки и завершает все write()"""
+    flushing = asyncio.Event()
+
+    class SlowSession:
+        def __init__(self):
+            self.session = session_factory()
+
+        async def __aenter__(self):
+            flushing.set()
+            await asyncio.sleep(0.05)
+            return await self.session.__aenter__()
+
+        async def __aexit__(self, *args):
+            return await self.session.__aexit__(*args)
+
+    writer = NotificationHistoryWriter(SlowSession, flush_interval=0)
+
+    first = asyncio.create_task(writer.write([history_row(1, 10)]))
+    await flushing.wait()
+    second = asyncio.create_task(writer.write([history_row(2, 11)]))
+    await asyncio.sleep(0)
+    await writer.stop()
+
+    assert await asyncio.wait_for(asyncio.gather(first, second), timeout=1) == [True, True]
+    assert [n.telegram_message_id for n in await load_notifications(session_factory)] == [10, 11]
+
+
+@pytest.mark.asyncio
+async def test_send_personalized_notifications_saves_history_in_one_insert(bot, session_factory):
+    """Отправленные уведомления сохраняются в историю одним INSERT без повторной отправки"""
+    set_bot_instance(bot)
+    writer = NotificationHistoryWriter(session_factory, flush_interval=0)
+    notifications = [
+        {"user_id": chat_id, "message": "Test", "platform": "gitlab", "event_type": "issue_assigned",
+         "project_name": "test/project", "metadata": "{}"}
+        for chat_id in (1, 2, 3)
+    ]
+
+    with patch("src.webhook.notifier.history_writer", writer):
+        await send_personalized_notifications(notifications, MockAsyncSession())
+    await writer.stop()
+
+    assert len(bot.calls) == 3
+    assert writer.flushes == 1
+    assert sorted(n.user_id for n in await load_notifications(session_factory)) == [1, 2, 3]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("platform, event_type, thread_key", [
+    ("gitlab", "note", "gitlab:123:merge_request:7"),
+    ("github", "issue_comment", "github:456:pull_request:12"),
+])
+async def test_comment_is_sent_as_reply_in_thread(bot, session_factory, platform, event_type, thread_key):
+    """Комментарий отправляется ответом на последнее сообщение того же треда"""
+    set_bot_instance(bot)
+    async with session_factory() as session:
+        session.add_all([
+            Notification(user_id=1, platform=platform, event_type="opened", project_name="p",
+                         message="old", telegram_message_id=50, thread_key=thread_key),
+            Notification(user_id=1, platform=platform, event_type="opened", project_name="p",
+                         message="latest", telegram_message_id=77, thread_key=thread_key),
+            Notification(user_id=1, platform=platform, event_type="opened", project_name="p",
+                         message="other thread", telegram_message_id=90, thread_key=f"{thread_key}0"),
+        ])
+        await session.commit()
+
+    writer = NotificationHistoryWriter(session_factory, flush_interval=0)
+    notifications = [{"user_id": 1, "message": "Comment", "platform": platform, "event_type": event_type,
+                      "project_name": "p", "thread_key": thread_key, "metadata": "{}"}]
+
+    with patch("src.webhook.notifier.history_writer", writer):
+        async with session_factory() as session:
+            await send_personalized_notifications(notifications, session)
+    await writer.stop()
+
+    assert bot.send_message.await_args.kwargs["reply_to_message_id"] == 77
+    saved = (await load_notifications(session_factory))[-1]
+    assert saved.parent_notification_id == 2
+    assert saved.thread_key == thread_key
+
+
+@pytest.mark.asyncio
+async def test_templated_notification_is_stored_as_fields(bot, session_factory):
+    """Уведомление по шаблону хранится полями, HTML собирается из них заново"""
+    set_bot_instance(bot)
+    writer = NotificationHistoryWriter(session_factory, flush_interval=0)
+    notification = {
+        "user_id": 1, "platform": "gitlab", "event_type": "pipeline_completed", "project_name": "group/project",
+        **build_notification("gitlab_pipeline", "group/project", "Fix build", "https://example.com/mr/7",
+                             status="failed", iid=7, ref="main", pipeline_id=42)
+    }
+    legacy = {"user_id": 2, "message": "Test", "platform": "gitlab", "event_type": "issue_assigned",
+              "project_name": "test/project", "metadata": '{"issue_iid": 1}'}
+
+    with patch("src.webhook.notifier.history_writer", writer):
+        await send_personalized_notifications([notification, legacy], MockAsyncSession())
+    await writer.stop()
+
+    templated, plain = await load_notifications(session_factory)
+    assert templated.message is None and templated.meta_data is None
+    assert (templated.template, templated.object_iid, templated.status) == ("gitlab_pipeline", 7, "failed")
+    assert render_history(templated) == next(text for chat_id, text, _ in bot.calls if chat_id == 1)
+    assert plain.template is None and render_history(plain) == "Test"
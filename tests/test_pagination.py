@@ -0,0 +1,170 @@
+"""
+Тесты постраничной загрузки проектов (src/http_client/pagination.py)
+"""
+
+import asyncio
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from src.http_client import HttpSessionPool, iter_offset_pages, parse_link_header
+from src.gitlab_api import GitLabClient
+from src.github_api import GitHubClient
+
+TOTAL_PROJECTS = 250
+PER_PAGE = 100
+
+
+def page_slice(page: int):
+    start = (page - 1) * PER_PAGE
+    return [{"id": i} for i in range(start, min(start + PER_PAGE, TOTAL_PROJECTS))]
+
+
+@pytest_asyncio.fixture
+async def api_server():
+    """Локальный API с тремя вариантами пагинации"""
+    state = {"with_total": True, "in_flight": 0, "max_in_flight": 0, "requests": []}
+
+    async def track(request):
+        state["requests"].append(dict(request.query))
+        state["in_flight"] += 1
+        state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+        await asyncio.sleep(0.02)
+        state["in_flight"] -= 1
+
+    async def gitlab_projects(request):
+        await track(request)
+        if request.query.get("pagination") == "keyset":
+            id_after = int(request.query.get("id_after", -1))
+            items = [{"id": i} for i in range(id_after + 1, min(id_after + 1 + PER_PAGE, TOTAL_PROJECTS))]
+            headers = {}
+            if items and items[-1]["id"] < TOTAL_PROJECTS - 1:
+                next_url = request.url.update_query({"id_after": items[-1]["id"]})
+                headers["Link"] = f'<{next_url}>; rel="next"'
+            return web.json_response(items, headers=headers)
+
+        page = int(request.query["page"])
+        headers = {"X-Next-Page": str(page + 1) if page * PER_PAGE < TOTAL_PROJECTS else ""}
+        if state["with_total"]:
+            headers["X-Total-Pages"] = "3"
+        return web.json_response(page_slice(page), headers=headers)
+
+    async def github_repos(request):
+        await track(request)
+        page = int(request.query["page"])
+        base = request.url.with_query({"page": "1"})
+        links = [f'<{base.update_query({"page": "3"})}>; rel="last"']
+        if page < 3:
+            links.insert(0, f'<{base.update_query({"page": str(page + 1)})}>; rel="next"')
+        return web.json_response(page_slice(page), headers={"Link": ", ".join(links)})
+
+    app = web.Application()
+    app.router.add_get("/api/v4/projects", gitlab_projects)
+    app.router.add_get("/user/repos", github_repos)
+
+    server = TestServer(app)
+    await server.start_server()
+    server.state = state
+    yield server
+    await server.close()
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    """Отдельный пул, подставленный вместо общего"""
+    pool = HttpSessionPool()
+    monkeypatch.setattr("src.http_client.pool.http_sessions", pool)
+    return pool
+
+
+def test_parse_link_header():
+    """Разбор заголовка Link в формате GitHub/GitLab"""
+    links = parse_link_header(
+        '<https://api.github.com/user/repos?page=2>; rel="next", '
+        '<https://api.github.com/user/repos?page=5>; rel="last"'
+    )
+    assert links == {
+        "next": "https://api.github.com/user/repos?page=2",
+        "last": "https://api.github.com/user/repos?page=5",
+    }
+    assert parse_link_header(None) == {}
+
+
+@pytest.mark.asyncio
+async def test_gitlab_pages_are_fetched_concurrently_and_yielded_in_order(api_server, pool):
+    """При известном X-Total-Pages страницы 2..N загружаются параллельно"""
+    base_url = str(api_server.make_url("")).rstrip("/")
+
+    async with GitLabClient(base_url, "token") as client:
+        pages = [page async for page in client.iter_projects(per_page=PER_PAGE)]
+    await pool.close()
+
+    assert [len(page) for page in pages] == [100, 100, 50]
+    assert [p["id"] for page in pages for p in page] == list(range(TOTAL_PROJECTS))
+    assert api_server.state["max_in_flight"] == 2
+
+
+@pytest.mark.asyncio
+async def test_gitlab_follows_next_page_without_total(api_server, pool):
+    """Без X-Total-Pages страницы запрашиваются последовательно по X-Next-Page"""
+    api_server.state["with_total"] = False
+    base_url = str(api_server.make_url("")).rstrip("/")
+
+    async with GitLabClient(base_url, "token") as client:
+        pages = [page async for page in client.iter_projects(per_page=PER_PAGE)]
+    await pool.close()
+
+    assert [len(page) for page in pages] == [100, 100, 50]
+    assert api_server.state["max_in_flight"] == 1
+
+
+@pytest.mark.asyncio
+async def test_gitlab_keyset_pagination_follows_link(api_server, pool):
+    """Keyset-пагинация идет по ссылке rel="next" без номеров страниц"""
+    base_url = str(api_server.make_url("")).rstrip("/")
+
+    async with GitLabClient(base_url, "token") as client:
+        pages = [page async for page in client.iter_projects(per_page=PER_PAGE, keyset=True)]
+    await pool.close()
+
+    assert [p["id"] for page in pages for p in page] == list(range(TOTAL_PROJECTS))
+    assert all(query.get("pagination") == "keyset" for query in api_server.state["requests"])
+    assert all("page" not in query for query in api_server.state["requests"])
+
+
+@pytest.mark.asyncio
+async def test_github_total_is_taken_from_last_link(api_server, pool):
+    """Номер последней страницы GitHub берется из rel="last" """
+    async with GitHubClient("token") as client:
+        client.api_url = str(api_server.make_url("")).rstrip("/")
+        pages = [page async for page in client.iter_repositories(per_page=PER_PAGE)]
+    await pool.close()
+
+    assert [len(page) for page in pages] == [100, 100, 50]
+    assert api_server.state["max_in_flight"] == 2
+
+
+@pytest.mark.asyncio
+async def test_closing_iterator_cancels_pending_pages():
+    """Если потребитель остановился, незагруженные страницы отменяются"""
+    cancelled = []
+
+    async def fetch(page):
+        if page == 1:
+            return [{"id": 1}], {"X-Total-Pages": "5"}
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(page)
+            raise
+        return [], {}
+
+    pages = iter_offset_pages(fetch, concurrency=2)
+    assert await anext(pages) == [{"id": 1}]
+    await asyncio.sleep(0)
+    await pages.aclose()
+
+    # Страницы 2..5 создаются сразу и отменяются при закрытии
+    assert sorted(cancelled) == [2, 3]
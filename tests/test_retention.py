@@ -0,0 +1,95 @@
+"""
+Тесты для ограничения истории уведомлений (src/database/retention.py)
+"""
+
+import gzip
+import json
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from src.database import Base, User, Notification
+from src.database import retention
+from src.database.retention import NotificationRetention
+
+
+@pytest_asyncio.fixture
+async def session_factory(tmp_path):
+    """Файловая SQLite: два пользователя, у первого 30 свежих и 5 старых уведомлений"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'app.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    now = datetime.utcnow()
+    async with factory() as session:
+        session.add_all([User(telegram_id=1, first_name="Alice"), User(telegram_id=2, first_name="Bob")])
+        for i in range(30):
+            session.add(Notification(
+                user_id=1, platform="gitlab", event_type="issue", project_name="g/p",
+                message=f"<b>fresh {i}</b>", sent_at=now - timedelta(minutes=i)
+            ))
+        for i in range(5):
+            session.add(Notification(
+                user_id=1, platform="gitlab", event_type="issue", project_name="g/p",
+                message=f"<b>old {i}</b>", sent_at=datetime(2024, 1, 1 + i)
+            ))
+        session.add(Notification(user_id=2, platform="github", event_type="issue", project_name="o/r", message="x"))
+        await session.commit()
+    yield factory
+    await engine.dispose()
+
+
+async def messages(factory, user_id):
+    async with factory() as session:
+        result = await session.execute(
+            select(Notification.message).where(Notification.user_id == user_id).order_by(Notification.sent_at.desc())
+        )
+        return result.scalars().all()
+
+
+@pytest.mark.asyncio
+async def test_retention_deletes_old_and_over_cap_in_batches(session_factory):
+    """Старые удаляются по возрасту, остальные сверх лимита - начиная с самых старых"""
+    cleaner = NotificationRetention(
+        session_factory, max_age_days=30, max_per_user=10, batch_size=4, batch_pause=0, archive_dir=""
+    )
+
+    report = await cleaner.run_once()
+
+    assert (report.deleted_by_age, report.deleted_by_cap) == (5, 20)
+    # 5 = 4 + 1 по возрасту, 20 = 4 * 5 сверх лимита
+    assert report.batches == 2 + 5
+    assert report.row_bytes > 0
+    kept = await messages(session_factory, 1)
+    assert kept == [f"<b>fresh {i}</b>" for i in range(10)]
+    assert await messages(session_factory, 2) == ["x"]
+
+    # Повторный проход ничего не удаляет
+    assert (await cleaner.run_once()).deleted == 0
+
+
+@pytest.mark.asyncio
+async def test_deleted_rows_are_archived_by_day(session_factory, tmp_path, monkeypatch):
+    """Удаленные строки попадают в сжатые файлы по дню отправки"""
+    monkeypatch.setattr(retention, "zstandard", None)
+    archive_dir = tmp_path / "archive"
+    cleaner = NotificationRetention(
+        session_factory, max_age_days=30, max_per_user=0, batch_size=2, batch_pause=0, archive_dir=str(archive_dir)
+    )
+
+    report = await cleaner.run_once()
+
+    assert report.archived == 5
+    path = archive_dir / "2024" / "01" / "notifications-2024-01-03.jsonl.gz"
+    # Файл может состоять из нескольких gzip членов - по одному на пакет
+    records = [json.loads(line) for line in gzip.decompress(path.read_bytes()).splitlines()]
+    assert [record["message"] for record in records] == ["<b>old 2</b>"]
+    assert records[0]["sent_at"] == "2024-01-03T00:00:00"
+    assert report.archive_bytes == sum(p.stat().st_size for p in archive_dir.rglob("*.gz"))
+
+    async with session_factory() as session:
+        assert (await session.execute(select(func.count()).select_from(Notification))).scalar_one() == 31
@@ -0,0 +1,95 @@
+"""
+Тесты для индекса подписок в памяти (src/webhook/routing.py)
+"""
+
+import pytest
+import pytest_asyncio
+from unittest.mock import patch
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from src.database import Base, User, Subscription, NotificationSettings
+from src.webhook.routing import DEFAULT_SETTINGS, SubscriptionIndex
+from src.webhook.personalized_handlers import get_subscribed_users
+
+
+@pytest_asyncio.fixture
+async def session():
+    """Сессия in-memory SQLite с двумя подписчиками проекта 42"""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with session_factory() as session:
+        session.add_all([
+            User(telegram_id=1, first_name="Alice", gitlab_username="alice"),
+            User(telegram_id=2, first_name="Bob", gitlab_username="bob"),
+            Subscription(user_id=1, platform="gitlab", project_id="42", project_name="g/p", event_types="issue"),
+            Subscription(user_id=2, platform="gitlab", project_id="42", project_name="g/p", event_types="issue"),
+            NotificationSettings(user_id=1, mentions_enabled=False),
+        ])
+        await session.commit()
+        yield session
+
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_index_is_not_used_before_rebuild():
+    """До построения индекс не отвечает, обработчики идут в БД"""
+    index = SubscriptionIndex()
+    assert index.get("gitlab", "42") is None
+
+
+@pytest.mark.asyncio
+async def test_rebuild_groups_subscribers_by_project(session):
+    """Пересборка раскладывает подписчиков по (platform, project_id)"""
+    index = SubscriptionIndex()
+    await index.rebuild(session)
+
+    subscribers = {s.telegram_id: s for s in index.get("gitlab", "42")}
+    assert set(subscribers) == {1, 2}
+    assert subscribers[1].settings.mentions_enabled is False
+    assert subscribers[2].settings == DEFAULT_SETTINGS
+    assert index.get("github", "42") == []
+
+
+@pytest.mark.asyncio
+async def test_refresh_user_applies_subscription_and_settings_changes(session):
+    """Точечное обновление после изменения подписок и настроек"""
+    index = SubscriptionIndex()
+    await index.rebuild(session)
+    before = index.get("gitlab", "42")
+
+    result = await session.execute(select(Subscription).where(Subscription.user_id == 2))
+    await session.delete(result.scalar_one())
+    session.add(Subscription(user_id=1, platform="github", project_id="org/repo", project_name="org/repo", event_types="issues"))
+    await session.commit()
+    await index.refresh_user(session, 2)
+
+    settings = (await session.execute(select(NotificationSettings))).scalar_one()
+    settings.mentions_enabled = True
+    await session.commit()
+    await index.refresh_user(session, 1)
+
+    assert [s.telegram_id for s in index.get("gitlab", "42")] == [1]
+    assert index.get("gitlab", "42")[0].settings.mentions_enabled is True
+    assert [s.telegram_id for s in index.get("github", "org/repo")] == [1]
+    # Ранее выданный список не изменяется
+    assert {s.telegram_id for s in before} == {1, 2}
+    assert index.stats()["refreshes"] == 2
+
+
+@pytest.mark.asyncio
+async def test_get_subscribed_users_uses_index_without_queries(session):
+    """Когда индекс построен, подписчики определяются без запросов к БД"""
+    index = SubscriptionIndex()
+    await index.rebuild(session)
+
+    with patch('src.webhook.personalized_handlers.subscription_index', index), \
+            patch.object(session, 'execute') as mock_execute:
+        users = await get_subscribed_users(session, "42")
+
+    mock_execute.assert_not_called()
+    assert {user.telegram_id for user in users} == {1, 2}
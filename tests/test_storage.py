@@ -0,0 +1,68 @@
+"""
+Тесты для хранилищ состояния FSM (src/bot/storage.py)
+"""
+
+import importlib.util
+import sqlite3
+
+import pytest
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from src.bot.states import SubscriptionStates
+from src.bot.storage import SQLiteStorage, create_fsm_storage
+
+KEY = StorageKey(bot_id=1, chat_id=123456789, user_id=123456789)
+
+
+@pytest.fixture
+def storage_path(tmp_path):
+    """Путь к временной базе состояний"""
+    return str(tmp_path / "fsm.db")
+
+
+@pytest.mark.asyncio
+async def test_sqlite_storage_keeps_state_between_restarts(storage_path):
+    """Состояние и данные диалога переживают перезапуск бота"""
+    storage = SQLiteStorage(storage_path)
+    state = FSMContext(storage=storage, key=KEY)
+    await state.set_state(SubscriptionStates.choosing_project)
+    await state.update_data(platform="gitlab", projects=[("1", "group/project-a")])
+    await state.update_data(page=2)
+    await storage.close()
+
+    reopened = SQLiteStorage(storage_path)
+    state = FSMContext(storage=reopened, key=KEY)
+    assert await state.get_state() == SubscriptionStates.choosing_project.state
+    assert await state.get_data() == {"platform": "gitlab", "projects": [["1", "group/project-a"]], "page": 2}
+    await reopened.close()
+
+
+@pytest.mark.asyncio
+async def test_sqlite_storage_removes_finished_dialogs(storage_path):
+    """После state.clear() строка диалога удаляется"""
+    storage = SQLiteStorage(storage_path)
+    state = FSMContext(storage=storage, key=KEY)
+    await state.set_state(SubscriptionStates.choosing_platform)
+    await state.update_data(platform="github")
+    await state.clear()
+    await storage.close()
+
+    with sqlite3.connect(storage_path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM fsm").fetchone()[0] == 0
+
+
+def test_create_fsm_storage_by_backend(storage_path):
+    """Хранилище выбирается настройкой fsm_storage"""
+    assert isinstance(create_fsm_storage("memory", ""), MemoryStorage)
+    assert isinstance(create_fsm_storage("sqlite", storage_path), SQLiteStorage)
+    with pytest.raises(ValueError):
+        create_fsm_storage("postgres", "")
+
+
+@pytest.mark.skipif(importlib.util.find_spec("redis") is not None, reason="пакет redis установлен")
+def test_redis_backend_requires_redis_package():
+    """Без пакета redis понятная ошибка вместо ImportError при первом сообщении"""
+    with pytest.raises(RuntimeError):
+        create_fsm_storage("redis", "redis://localhost:6379/0")
@@ -2,9 +2,12 @@
 Тесты для src/bot/subscription_handlers.py
 """
 
+import asyncio
+
 import pytest
 from unittest.mock import AsyncMock, patch, MagicMock
-from aiogram.types import Message, CallbackQuery, User as TelegramUser
+from aiogram.filters import CommandObject
+from aiogram.types import Message, CallbackQuery, InlineQuery, User as TelegramUser
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.storage.memory import MemoryStorage
 
@@ -16,15 +19,29 @@ from src.bot.subscription_handlers import (
     process_project_choice,
     process_events_done,
     process_subscribe_confirmation,
-    process_unsubscribe_confirmation
+    process_unsubscribe_confirmation,
+    process_project_search,
+    process_page_navigation,
+    load_remaining_projects,
+    _background_tasks
 )
 from src.bot.states import SubscriptionStates
+from src.bot.project_catalog import project_catalog
+from src.bot.project_search import ProjectSearchIndex
 
 from tests.mocks import MockAsyncSession, MockResult, MockGitLabClient, MockGitHubClient
 
 
 # Фикстуры для мокирования:
 
+@pytest.fixture(autouse=True)
+def clear_project_catalog():
+    """Кэш списков проектов не переживает тест"""
+    project_catalog.clear()
+    yield
+    project_catalog.clear()
+
+
 @pytest.fixture
 def mock_db_session():
     """Сессия БД"""
@@ -182,26 +199,142 @@ async def test_process_platform_choice_github_success(mock_callback, mock_db_ses
         assert "Выберите проект из GitHub" in mock_callback.message.edit_text.call_args[0][0]
 
 
+@pytest.mark.asyncio
+async def test_process_platform_choice_uses_cached_projects(mock_callback, mock_db_session, mock_get_session_generator,
+                                                           user_data, state):
+    """Повторный выбор платформы показывает список из кэша без запросов к API"""
+    mock_callback.data = "platform:gitlab"
+    mock_db_session.execute.return_value = MockResult([user_data])
+
+    mock_gitlab_client = MockGitLabClient("http://gitlab.com", "fake_gitlab_token")
+    mock_gitlab_client.get_projects.return_value = [
+        {"id": 1, "name": "Project A", "name_with_namespace": "group / Project A", "description": "x" * 500}
+    ]
+
+    with patch('src.bot.subscription_handlers.get_session', new=mock_get_session_generator), \
+            patch('src.bot.subscription_handlers.GitLabClient', new=MagicMock(return_value=mock_gitlab_client)):
+        await process_platform_choice(mock_callback, state)
+        # Фоновая догрузка сохраняет полный список в кэш
+        await asyncio.gather(*_background_tasks)
+
+        await state.set_state(SubscriptionStates.choosing_platform)
+        await process_platform_choice(mock_callback, state)
+
+    mock_gitlab_client.get_projects.assert_awaited_once()
+    data = await state.get_data()
+    assert data["projects"] == [("1", "group / Project A")]
+    assert project_catalog.stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_stale_project_list_is_served_and_refreshed(mock_callback, mock_db_session, mock_get_session_generator,
+                                                         user_data, state, monkeypatch):
+    """Устаревший список показывается сразу, а свежий загружается в фоне"""
+    mock_callback.data = "platform:github"
+    mock_db_session.execute.return_value = MockResult([user_data])
+
+    key = project_catalog.make_key(user_data.telegram_id, "github", user_data.github_token)
+    project_catalog.store(key, [("user/old-repo", "user/old-repo")])
+    project_catalog._entries[key] = project_catalog._entries[key]._replace(fetched_at=0.0)
+    monkeypatch.setattr(project_catalog, "stale_ttl", float("inf"))
+
+    mock_github_client = MockGitHubClient("fake_github_token")
+    mock_github_client.get_repositories.return_value = [{"id": 1, "full_name": "user/new-repo", "private": False}]
+
+    with patch('src.bot.subscription_handlers.get_session', new=mock_get_session_generator), \
+            patch('src.bot.subscription_handlers.GitHubClient', new=MagicMock(return_value=mock_github_client)):
+        await process_platform_choice(mock_callback, state)
+        assert (await state.get_data())["projects"] == [("user/old-repo", "user/old-repo")]
+        await asyncio.gather(*project_catalog._tasks)
+
+    assert project_catalog.get(key).projects == [("user/new-repo", "user/new-repo")]
+    assert project_catalog.stats()["stale_hits"] == 1
+
+
+
+async def project_pages(*pages):
+    """Страницы проектов GitLab"""
+    for page in pages:
+        yield page
+
+
+@pytest.mark.asyncio
+async def test_stale_project_load_does_not_overwrite_new_flow(mock_callback, state):
+    """Догрузка прежнего показа не пишет в состояние нового /subscribe"""
+    key = project_catalog.make_key(123456789, "gitlab", "fake_gitlab_token")
+    await state.set_state(SubscriptionStates.choosing_project)
+    await state.update_data(platform="github", projects=[("user/repo", "user/repo")], projects_load=2)
+
+    await load_remaining_projects(
+        project_pages([{"id": 2, "name_with_namespace": "group / B"}]),
+        [("1", "group / A")], mock_callback.message, state, "gitlab", key, load_id=1
+    )
+
+    assert (await state.get_data())["projects"] == [("user/repo", "user/repo")]
+    mock_callback.message.edit_text.assert_not_called()
+    assert project_catalog.get(key).projects == [("1", "group / A"), ("2", "group / B")]
+
+
+@pytest.mark.asyncio
+async def test_project_load_keeps_page_user_moved_to(mock_callback, state):
+    """Конец догрузки не возвращает клавиатуру на первую страницу"""
+    key = project_catalog.make_key(123456789, "gitlab", "fake_gitlab_token")
+    projects = [(str(i), f"group / {i}") for i in range(20)]
+    await state.set_state(SubscriptionStates.choosing_project)
+    await state.update_data(platform="gitlab", projects=projects, projects_load=1)
+
+    mock_callback.data = "page:gitlab:1"
+    await process_page_navigation(mock_callback, state)
+    mock_callback.message.edit_text.reset_mock()
+
+    await load_remaining_projects(
+        project_pages([{"id": 20, "name_with_namespace": "group / 20"}]),
+        projects, mock_callback.message, state, "gitlab", key, load_id=1
+    )
+
+    assert len((await state.get_data())["projects"]) == 21
+    mock_callback.message.edit_text.assert_not_called()
+
+
+
+@pytest.mark.asyncio
+async def test_project_load_writes_state_every_few_pages(mock_callback, state):
+    """Догрузка не перезаписывает список в состоянии на каждой странице"""
+    key = project_catalog.make_key(123456789, "gitlab", "fake_gitlab_token")
+    await state.set_state(SubscriptionStates.choosing_project)
+    await state.update_data(platform="gitlab", projects=[("0", "group / 0")], projects_load=1)
+    pages = [[{"id": i, "name_with_namespace": f"group / {i}"}] for i in range(1, 13)]
+
+    with patch.object(state, "update_data", wraps=state.update_data) as update_data:
+        await load_remaining_projects(
+            project_pages(*pages), [("0", "group / 0")], mock_callback.message, state, "gitlab", key, load_id=1
+        )
+
+    # После 5 и 10 страниц и в конце
+    assert update_data.await_count == 3
+    assert len((await state.get_data())["projects"]) == 13
+    mock_callback.message.edit_text.assert_called_once()
+
+
 # Выбор проекта
 
 @pytest.mark.asyncio
 async def test_process_project_choice_gitlab(mock_callback, state):
     """Выбор проекта GitLab"""
 
-    gitlab_project = {"id": 1, "name": "Project A", "name_with_namespace": "group/project-a"}
-
     await state.update_data(
         platform="gitlab",
-        projects=[gitlab_project],
-        project_id="1"
+        projects=[["1", "group/project-a"], ["2", "group/project-b"]]
     )
     mock_callback.data = "project:gitlab:1"
 
     await process_project_choice(mock_callback, state)
 
     data = await state.get_data()
-    assert data["selected_project"] == gitlab_project
     assert data["project_id"] == "1"
+    assert data["project_name"] == "group/project-a"
+    # Список проектов после выбора из состояния удаляется
+    assert "projects" not in data
 
     current_state = await state.get_state()
     assert current_state == SubscriptionStates.choosing_events
@@ -227,12 +360,10 @@ async def test_process_events_done_no_events(mock_callback, state):
 async def test_process_events_done_success(mock_callback, state):
     """Успешное завершение выбора событий"""
 
-    gitlab_project = {"id": 1, "name": "Project A", "name_with_namespace": "group/project-a"}
-
     await state.update_data(
         platform="gitlab",
-        selected_project=gitlab_project,
         project_id="1",
+        project_name="group/project-a",
         selected_events=["merge_request", "issue"]
     )
     mock_callback.data = "events:done"
@@ -269,41 +400,170 @@ async def test_process_subscribe_confirmation_success(mock_callback, mock_db_ses
                                                       user_data, state):
     """Успешное подтверждение подписки"""
 
-    gitlab_project = {"id": 1, "name": "Project A", "path_with_namespace": "group/project-a"}
-
     await state.update_data(
         platform="gitlab",
-        selected_project=gitlab_project,
         project_id="1",
+        project_name="group/project-a",
         selected_events=["merge_request", "issue"]
     )
     mock_callback.data = "confirm:subscribe"
 
     # Мокируем execute для возврата разных результатов
     # Первый вызов - проверка существующей подписки (вернет пусто)
-    # Второй вызов - получение пользователя (вернет user_data)
+    # Второй вызов - получение пользователя для синхронизации webhook (вернет user_data)
     mock_db_session.execute.side_effect = [
         MockResult([]),
         MockResult([user_data])
     ]
 
-    # WebhookManager из mocks
-    mock_webhook_manager = MagicMock()
-    mock_webhook_manager.setup_gitlab_webhook = AsyncMock(return_value="123")
+    # Реестр webhooks возвращает общий webhook проекта
+    mock_sync = AsyncMock(return_value=MagicMock(hook_id="123"))
 
     with patch('src.bot.subscription_handlers.get_session', new=mock_get_session_generator), \
-            patch('src.bot.subscription_handlers.WebhookManager', mock_webhook_manager):
+            patch('src.bot.subscription_handlers.sync_project_hook', new=mock_sync):
         await process_subscribe_confirmation(mock_callback, state)
 
         # Проверяем, что подписка добавлена и сессия закоммичена
         mock_db_session.add.assert_called_once()
         assert mock_db_session.commit.call_count >= 1
 
-        # Проверяем, что WebhookManager был вызван
-        mock_webhook_manager.setup_gitlab_webhook.assert_called_once()
+        # Webhook синхронизирован с подписками проекта от имени пользователя
+        mock_sync.assert_awaited_once_with(mock_db_session, "gitlab", "1", "fake_gitlab_token")
+        assert mock_db_session.add.call_args[0][0].webhook_id == "123"
 
         current_state = await state.get_state()
         assert current_state is None
 
         mock_callback.message.edit_text.assert_called_once()
         assert "Подписка создана!" in mock_callback.message.edit_text.call_args[0][0]
+
+
+# Inline-поиск проектов
+
+@pytest.fixture
+def mock_inline_query():
+    """Объект InlineQuery"""
+    inline_query = MagicMock(spec=InlineQuery)
+    inline_query.from_user = TelegramUser(id=123456789, is_bot=False, first_name="Test")
+    inline_query.answer = AsyncMock()
+    return inline_query
+
+
+def test_project_search_index_ranks_name_prefix_first():
+    """Совпадение с началом имени проекта выше совпадения в середине пути"""
+    index = ProjectSearchIndex([
+        ("1", "backend / payment-gateway"),
+        ("2", "payments / api"),
+        ("3", "frontend / payment"),
+        ("4", "infra / terraform"),
+    ])
+
+    assert [ref_id for ref_id, _ in index.search("payment")] == ["3", "1", "2"]
+    assert [ref_id for ref_id, _ in index.search("pa")] == ["3", "1", "2"]
+    assert index.search("gateway") == [("1", "backend / payment-gateway")]
+    assert index.search("missing") == []
+
+
+@pytest.mark.asyncio
+async def test_inline_search_uses_local_index(mock_inline_query, mock_db_session, mock_get_session_generator,
+                                              user_data):
+    """При заполненном кэше поиск не обращается к API"""
+    user_data.github_token = None
+    mock_db_session.execute.return_value = MockResult([user_data])
+    key = project_catalog.make_key(user_data.telegram_id, "gitlab", user_data.gitlab_token)
+    project_catalog.store(key, [(str(i), f"group / project-{i}") for i in range(1000)])
+    mock_inline_query.query = "project-99"
+
+    mock_client_class = MagicMock()
+    with patch('src.bot.subscription_handlers.get_session', new=mock_get_session_generator), \
+            patch('src.bot.subscription_handlers.GitLabClient', new=mock_client_class):
+        await process_project_search(mock_inline_query)
+
+    mock_client_class.assert_not_called()
+    results = mock_inline_query.answer.call_args[0][0]
+    assert [result.title for result in results][:2] == ["group / project-99", "group / project-990"]
+    assert results[0].input_message_content.message_text == "/subscribe gitlab 99 group / project-99"
+
+
+@pytest.mark.asyncio
+async def test_inline_search_falls_back_to_server_when_index_is_cold(mock_inline_query, mock_db_session,
+                                                                     mock_get_session_generator, user_data):
+    """Без кэша используется поиск GitHub, а список проектов загружается в фоне"""
+    user_data.gitlab_token = None
+    mock_db_session.execute.return_value = MockResult([user_data])
+    mock_inline_query.query = "repo"
+
+    mock_github_client = MockGitHubClient("fake_github_token")
+    mock_github_client.search_repositories = AsyncMock(return_value=[{"id": 1, "full_name": "user/repo-a"}])
+    mock_github_client.get_repositories.return_value = [{"id": 1, "full_name": "user/repo-a"}]
+
+    with patch('src.bot.subscription_handlers.get_session', new=mock_get_session_generator), \
+            patch('src.bot.subscription_handlers.GitHubClient', new=MagicMock(return_value=mock_github_client)):
+        await process_project_search(mock_inline_query)
+        await asyncio.gather(*project_catalog._tasks)
+
+    mock_github_client.search_repositories.assert_awaited_once_with(
+        "repo", owner="github_test_user", per_page=50
+    )
+    assert [result.title for result in mock_inline_query.answer.call_args[0][0]] == ["user/repo-a"]
+    key = project_catalog.make_key(user_data.telegram_id, "github", user_data.github_token)
+    assert project_catalog.search(key, "repo") == [("user/repo-a", "user/repo-a")]
+
+
+@pytest.mark.asyncio
+async def test_cmd_subscribe_with_project_from_inline_search(mock_message, mock_db_session,
+                                                             mock_get_session_generator, user_data, state):
+    """Команда из inline-результата сразу переходит к выбору событий"""
+    mock_db_session.execute.return_value = MockResult([user_data])
+    mock_gitlab_client = MockGitLabClient("https://gitlab.com", "fake_gitlab_token")
+    mock_gitlab_client.get_project.return_value = {"id": 42, "name_with_namespace": "group / api"}
+
+    with patch('src.bot.subscription_handlers.get_session', new=mock_get_session_generator), \
+            patch('src.bot.subscription_handlers.GitLabClient', new=MagicMock(return_value=mock_gitlab_client)):
+        await cmd_subscribe(mock_message, state, CommandObject(command="subscribe", args="gitlab 42 renamed"))
+
+    mock_gitlab_client.get_project.assert_awaited_once_with("42")
+    assert await state.get_state() == SubscriptionStates.choosing_events
+    data = await state.get_data()
+    assert data["project_id"] == "42"
+    # Имя берется из ответа API, а не из аргумента команды
+    assert data["project_name"] == "group / api"
+    assert "Выбран проект: group / api" in mock_message.answer.call_args[0][0]
+
+
+@pytest.mark.asyncio
+async def test_cmd_subscribe_uses_fresh_project_catalog(mock_message, mock_db_session,
+                                                        mock_get_session_generator, user_data, state):
+    """Проект из свежего списка пользователя принимается без запроса к API"""
+    mock_db_session.execute.return_value = MockResult([user_data])
+    key = project_catalog.make_key(user_data.telegram_id, "gitlab", user_data.gitlab_token)
+    project_catalog.store(key, [("42", "group / api")])
+    client_factory = MagicMock()
+
+    with patch('src.bot.subscription_handlers.get_session', new=mock_get_session_generator), \
+            patch('src.bot.subscription_handlers.GitLabClient', new=client_factory):
+        await cmd_subscribe(mock_message, state, CommandObject(command="subscribe", args="gitlab 42"))
+
+    client_factory.assert_not_called()
+    assert (await state.get_data())["project_name"] == "group / api"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("args", ["gitlab 777 secret", "github someone/private-repo", "github ../../user"])
+async def test_cmd_subscribe_rejects_inaccessible_project(mock_message, mock_db_session,
+                                                          mock_get_session_generator, user_data, state, args):
+    """Проект, недоступный токену пользователя, не попадает в состояние подписки"""
+    mock_db_session.execute.return_value = MockResult([user_data])
+    mock_gitlab_client = MockGitLabClient("https://gitlab.com", "fake_gitlab_token")
+    mock_gitlab_client.get_project.side_effect = Exception("404 Project Not Found")
+    mock_github_client = MockGitHubClient("fake_github_token")
+    mock_github_client.get_repository.side_effect = Exception("404 Not Found")
+
+    with patch('src.bot.subscription_handlers.get_session', new=mock_get_session_generator), \
+            patch('src.bot.subscription_handlers.GitLabClient', new=MagicMock(return_value=mock_gitlab_client)), \
+            patch('src.bot.subscription_handlers.GitHubClient', new=MagicMock(return_value=mock_github_client)):
+        await cmd_subscribe(mock_message, state, CommandObject(command="subscribe", args=args))
+
+    assert await state.get_state() is None
+    assert await state.get_data() == {}
+    assert "недоступен" in mock_message.answer.call_args[0][0]
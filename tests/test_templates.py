@@ -0,0 +1,67 @@
+"""
+Тесты для шаблонов уведомлений (src/webhook/templates.py)
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from src.webhook.templates import TEMPLATES, build_notification, render, render_history
+
+
+def stored(notification: dict, project: str) -> SimpleNamespace:
+    """Строка истории, как ее сохраняет notifier"""
+    return SimpleNamespace(
+        project_name=project, message=None, template=notification["template"],
+        object_iid=notification["object_iid"], title=notification["title"], url=notification["url"],
+        status=notification["status"], payload=notification["payload"]
+    )
+
+
+@pytest.mark.parametrize("template_id, status, extra", [
+    ("gitlab_note", None, {"reason": "Вас упомянули", "noteable_type": "MergeRequest",
+                           "author": "Dev", "text": "<b>lgtm</b> & \"ok\""}),
+    ("gitlab_pipeline", "failed", {"ref": "main", "pipeline_id": 42}),
+    ("gitlab_issue", "open", {"author": "dev", "assignees": ""}),
+    ("github_pr_merged", "closed", {}),
+    ("github_workflow", "failure", {"workflow": "CI", "branch": "feature/x"}),
+])
+def test_history_renders_same_html_as_sent(template_id, status, extra):
+    """HTML из сохраненных полей совпадает с отправленным сообщением"""
+    notification = build_notification(
+        template_id, "group/project", "Fix build", "https://example.com/mr/7", status=status, iid=7, **extra
+    )
+
+    assert render_history(stored(notification, "group/project")) == notification["message"]
+
+
+def test_payload_stores_only_template_fields_without_keys():
+    """payload - JSON массив значений полей шаблона в их порядке"""
+    notification = build_notification(
+        "gitlab_mr_reviewer", "p", "MR", "u", iid=1, author="dev", source_branch="a", target_branch="b"
+    )
+
+    assert notification["payload"] == '["dev","a","b"]'
+    assert build_notification("github_issue_assigned", "p", "Issue", "u", status="assigned")["payload"] is None
+
+
+def test_status_text_and_empty_assignees():
+    assert render("gitlab_pipeline", "p", "MR", "u", "success", 1, '["main",5]').startswith(
+        "Pipeline успешно завершен"
+    )
+    assert "<b>Assignees:</b> Нет" in render("gitlab_issue", "p", "I", "u", "open", 1, '["dev",""]')
+
+
+def test_legacy_row_uses_stored_message():
+    """Строки до миграции хранят готовый HTML"""
+    legacy = SimpleNamespace(template=None, message="<b>old</b>")
+
+    assert render_history(legacy) == "<b>old</b>"
+
+
+def test_template_field_names_match_renderers():
+    """Каждый шаблон собирается из своих полей без KeyError"""
+    for template in TEMPLATES.values():
+        fields = {name: "x" for name in template.fields}
+        notification = build_notification(template.id, "p", "t", "u", status="s", iid=1, **fields)
+        assert notification["message"]
@@ -15,9 +15,10 @@ from src.webhook.personalized_handlers import (
     handle_gitlab_issue
 )
 from src.webhook.handlers import handle_gitlab_event
+from src.metrics import HANDLER_ERRORS
 from src.webhook.notifier import set_bot_instance, send_personalized_notifications
 
-from tests.mocks import MockAsyncSession, MockBot, MockResult
+from tests.mocks import MockAsyncSession, MockBot, MockResult, make_subscriber_row
 
 
 # Фикстуры
@@ -87,11 +88,9 @@ async def test_handle_gitlab_issue_assignment(mock_db_session, mock_bot, user_da
     mock_db_session.data["Subscription"] = [subscription_data]
     mock_db_session.data["NotificationSettings"] = [settings_data]
 
-    # Мокируем execute для возврата данных
+    # Один запрос возвращает подписчика вместе с настройками
     mock_db_session.execute.side_effect = [
-        MockResult([subscription_data]),  # Для запроса подписки
-        MockResult([user_data]),  # Для запроса пользователя
-        MockResult([settings_data])  # Для запроса настроек
+        MockResult([make_subscriber_row(user_data, settings_data, subscription_data.event_types)])
     ]
 
     # Мокируем get для возврата пользователя
@@ -134,6 +133,36 @@ async def test_handle_gitlab_issue_assignment(mock_db_session, mock_bot, user_da
     assert "Новое событие в Issue" in notifications[0]["message"]
 
 
+@pytest.mark.asyncio
+async def test_subscriber_without_settings_row_uses_defaults(mock_db_session, mock_bot, user_data, subscription_data):
+    """Без строки настроек используются значения по умолчанию без записи в БД"""
+    mock_db_session.execute.side_effect = [
+        MockResult([make_subscriber_row(user_data, None, subscription_data.event_types)])
+    ]
+
+    webhook_data = {
+        "object_kind": "issue",
+        "project": {"id": 123, "name": "Test Project", "path_with_namespace": "test/project"},
+        "object_attributes": {
+            "action": "update",
+            "title": "Test Issue",
+            "url": "http://gitlab.com/issue/1",
+            "assignees": [{"username": "gitlab_test_user"}],
+            "labels": [],
+            "iid": 1
+        },
+        "changes": {"assignees": {"previous": [], "current": [{"username": "gitlab_test_user"}]}}
+    }
+
+    notifications = await handle_gitlab_issue(webhook_data, mock_db_session)
+
+    assert len(notifications) == 1
+    # Один запрос подписчиков, никаких INSERT/COMMIT во время обработки события
+    assert mock_db_session.execute.await_count == 1
+    mock_db_session.add.assert_not_called()
+    mock_db_session.commit.assert_not_called()
+
+
 @pytest.mark.asyncio
 async def test_handle_gitlab_mr_reviewer_assignment(mock_db_session, mock_bot, user_data, subscription_data,
                                                     settings_data):
@@ -143,11 +172,9 @@ async def test_handle_gitlab_mr_reviewer_assignment(mock_db_session, mock_bot, u
     mock_db_session.data["Subscription"] = [subscription_data]
     mock_db_session.data["NotificationSettings"] = [settings_data]
 
-    # Мокируем execute для возврата данных
+    # Один запрос возвращает подписчика вместе с настройками
     mock_db_session.execute.side_effect = [
-        MockResult([subscription_data]),  # Для запроса подписки
-        MockResult([user_data]),  # Для запроса пользователя
-        MockResult([settings_data])  # Для запроса настроек
+        MockResult([make_subscriber_row(user_data, settings_data, subscription_data.event_types)])
     ]
 
     mock_db_session.get.side_effect = [user_data]
@@ -192,11 +219,9 @@ async def test_handle_gitlab_pipeline_success_for_author(mock_db_session, mock_b
     mock_db_session.data["Subscription"] = [subscription_data]
     mock_db_session.data["NotificationSettings"] = [settings_data]
 
-    # Мокируем execute для возврата данных
+    # Один запрос возвращает подписчика вместе с настройками
     mock_db_session.execute.side_effect = [
-        MockResult([subscription_data]),  # Для запроса подписки
-        MockResult([user_data]),  # Для запроса пользователя
-        MockResult([settings_data])  # Для запроса настроек
+        MockResult([make_subscriber_row(user_data, settings_data, subscription_data.event_types)])
     ]
 
     mock_db_session.get.side_effect = [user_data]
@@ -240,11 +265,9 @@ async def test_handle_gitlab_note_mention(mock_db_session, mock_bot, user_data,
     mock_db_session.data["Subscription"] = [subscription_data]
     mock_db_session.data["NotificationSettings"] = [settings_data]
 
-    # Мокируем execute для возврата подписки
+    # Один запрос возвращает подписчика вместе с настройками
     mock_db_session.execute.side_effect = [
-        MockResult([subscription_data]),  # Для запроса подписки
-        MockResult([user_data]),  # Для запроса пользователя
-        MockResult([settings_data])  # Для запроса настроек
+        MockResult([make_subscriber_row(user_data, settings_data, subscription_data.event_types)])
     ]
 
     mock_db_session.get.side_effect = [user_data]
@@ -266,6 +289,7 @@ async def test_handle_gitlab_note_mention(mock_db_session, mock_bot, user_data,
             "url": "http://gitlab.com/note/1"
         },
         "merge_request": {
+            "iid": 7,
             "title": "Test MR",
             "author": {"username": "mr_author"},
             "assignees": [],
@@ -279,6 +303,24 @@ async def test_handle_gitlab_note_mention(mock_db_session, mock_bot, user_data,
     assert len(notifications) == 1
     assert notifications[0]["event_type"] == "note"
     assert "Вас упомянули в комментарии" in notifications[0]["message"]
+    assert notifications[0]["thread_key"] == "gitlab:123:merge_request:7"
+
+
+@pytest.mark.asyncio
+async def test_handler_error_is_counted_in_metrics(mock_db_session):
+    """Ошибка, пойманная внутри обработчика, учитывается в webhook_handler_errors_total"""
+    mock_db_session.execute.side_effect = RuntimeError("database is locked")
+    before = HANDLER_ERRORS.value("handle_gitlab_pipeline")
+
+    notifications = await handle_gitlab_pipeline({
+        "object_kind": "pipeline",
+        "project": {"id": 123, "name": "Test Project"},
+        "object_attributes": {"id": 1, "status": "success", "ref": "main"},
+        "merge_requests": [{"iid": 1, "title": "MR"}]
+    }, mock_db_session)
+
+    assert notifications == []
+    assert HANDLER_ERRORS.value("handle_gitlab_pipeline") - before == 1
 
 
 # Тесты для handlers.py
@@ -292,11 +334,9 @@ async def test_handle_gitlab_event_calls_notifier(mock_db_session, mock_bot, use
     mock_db_session.data["Subscription"] = [subscription_data]
     mock_db_session.data["NotificationSettings"] = [settings_data]
 
-    # Мокируем execute для возврата данных
+    # Один запрос возвращает подписчика вместе с настройками
     mock_db_session.execute.side_effect = [
-        MockResult([subscription_data]),  # Для запроса подписки
-        MockResult([user_data]),  # Для запроса пользователя
-        MockResult([settings_data])  # Для запроса настроек
+        MockResult([make_subscriber_row(user_data, settings_data, subscription_data.event_types)])
     ]
 
     mock_db_session.get.side_effect = [user_data]
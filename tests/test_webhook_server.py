@@ -0,0 +1,273 @@
+"""
+Тесты для HTTP слоя webhook сервера (src/webhook/server.py)
+"""
+
+import asyncio
+
+import pytest
+from unittest.mock import AsyncMock, patch
+from aiohttp.test_utils import TestClient, TestServer
+
+from src.webhook.server import WebhookServer
+from src.webhook.queue import EventQueue, WebhookEvent
+from src.webhook.spool import WebhookSpool
+
+
+GITLAB_MR_PAYLOAD = {
+    "object_kind": "merge_request",
+    "project": {"id": 123, "name": "Test Project"},
+    "object_attributes": {"action": "open", "iid": 1}
+}
+
+
+@pytest.fixture
+def webhook_server():
+    """Webhook сервер без запуска TCP сайта и без журнала на диске"""
+    server = WebhookServer(host="127.0.0.1", port=0)
+    server.spool = None
+    return server
+
+
+@pytest.fixture
+def spool_path(tmp_path):
+    """Путь к временному журналу"""
+    return str(tmp_path / "spool.db")
+
+
+@pytest.mark.asyncio
+async def test_gitlab_webhook_is_accepted_and_processed_by_worker(webhook_server):
+    """Webhook подтверждается 202, а обработка выполняется воркером"""
+    handled = asyncio.Event()
+
+    async def fake_handler(event_type, data):
+        handled.set()
+
+    with patch('src.webhook.server.handle_gitlab_event', new=AsyncMock(side_effect=fake_handler)) as mock_handler:
+        webhook_server.queue.start()
+        async with TestClient(TestServer(webhook_server.app)) as client:
+            response = await client.post(
+                "/webhook/gitlab",
+                json=GITLAB_MR_PAYLOAD,
+                headers={"X-Gitlab-Event": "Merge Request Hook"}
+            )
+            assert response.status == 202
+
+            await asyncio.wait_for(handled.wait(), timeout=1)
+
+        await webhook_server.queue.stop(timeout=1)
+
+        mock_handler.assert_called_once_with("Merge Request Hook", GITLAB_MR_PAYLOAD)
+        assert webhook_server.queue.processed == 1
+
+
+@pytest.mark.asyncio
+async def test_webhook_returns_503_when_queue_is_full(webhook_server):
+    """При переполнении очереди возвращается 503 с Retry-After"""
+    webhook_server.queue = EventQueue(processor=AsyncMock(), maxsize=1, workers=1)
+
+    async with TestClient(TestServer(webhook_server.app)) as client:
+        first = await client.post(
+            "/webhook/github",
+            json={"action": "opened"},
+            headers={"X-GitHub-Event": "pull_request", "X-GitHub-Delivery": "delivery-1"}
+        )
+        second = await client.post(
+            "/webhook/github",
+            json={"action": "opened"},
+            headers={"X-GitHub-Event": "pull_request", "X-GitHub-Delivery": "delivery-2"}
+        )
+
+        assert first.status == 202
+        assert second.status == 503
+        assert "Retry-After" in second.headers
+        assert webhook_server.queue.rejected == 1
+
+
+@pytest.mark.asyncio
+async def test_event_queue_drains_on_stop():
+    """stop() дожидается обработки уже принятых событий"""
+    processed = []
+
+    async def slow_processor(event: WebhookEvent):
+        await asyncio.sleep(0.01)
+        processed.append(event.event_type)
+
+    queue = EventQueue(processor=slow_processor, maxsize=10, workers=2)
+    queue.start()
+    for i in range(5):
+        assert queue.put_nowait(WebhookEvent(platform="gitlab", event_type=f"event-{i}", data={}))
+
+    await queue.stop(timeout=1)
+
+    assert len(processed) == 5
+    assert queue.depth == 0
+    assert queue.stats()["latency"]["process"]["count"] == 5
+
+
+@pytest.mark.asyncio
+async def test_spool_keeps_unprocessed_events_between_restarts(spool_path):
+    """Необработанные записи журнала доступны после переоткрытия"""
+    spool = WebhookSpool(spool_path)
+    await spool.open()
+
+    ids = await asyncio.gather(*[
+        spool.append("gitlab", "Issue Hook", {"X-Gitlab-Event": "Issue Hook"}, b'{"n": %d}' % i)
+        for i in range(3)
+    ])
+    spool.ack(ids[0])
+    await spool.close()
+
+    # Все три записи зафиксированы одним групповым коммитом
+    assert spool.commits <= 2
+
+    reopened = WebhookSpool(spool_path)
+    await reopened.open()
+    pending = await reopened.load_pending()
+    await reopened.close()
+
+    assert [event.id for event in pending] == ids[1:]
+    assert pending[0].headers == {"X-Gitlab-Event": "Issue Hook"}
+    assert pending[0].body == b'{"n": 1}'
+
+
+@pytest.mark.asyncio
+async def test_server_replays_spooled_events_on_start(spool_path):
+    """При запуске сервер досылает в обработчики события из журнала"""
+    spool = WebhookSpool(spool_path)
+    await spool.open()
+    await spool.append("github", "issues", {}, b'{"action": "opened"}')
+    await spool.close()
+
+    server = WebhookServer(host="127.0.0.1", port=0)
+    server.spool = WebhookSpool(spool_path)
+
+    handled = asyncio.Event()
+
+    async def fake_handler(event_type, data):
+        handled.set()
+
+    with patch('src.webhook.server.handle_github_event', new=AsyncMock(side_effect=fake_handler)) as mock_handler:
+        await server.start()
+        await asyncio.wait_for(handled.wait(), timeout=1)
+        await server.stop()
+
+    mock_handler.assert_called_once_with("issues", {"action": "opened"})
+
+    check = WebhookSpool(spool_path)
+    await check.open()
+    assert await check.load_pending() == []
+    await check.close()
+
+
+@pytest.mark.asyncio
+async def test_duplicate_delivery_is_dropped_before_processing(webhook_server):
+    """Повторная доставка с тем же X-Gitlab-Event-UUID не попадает в обработку"""
+    with patch('src.webhook.server.handle_gitlab_event', new=AsyncMock()) as mock_handler:
+        webhook_server.queue.start()
+        async with TestClient(TestServer(webhook_server.app)) as client:
+            headers = {"X-Gitlab-Event": "Merge Request Hook", "X-Gitlab-Event-UUID": "uuid-1"}
+            first = await client.post("/webhook/gitlab", json=GITLAB_MR_PAYLOAD, headers=headers)
+            retry = await client.post("/webhook/gitlab", json=GITLAB_MR_PAYLOAD, headers=headers)
+
+            assert first.status == 202
+            assert retry.status == 200
+
+        await webhook_server.queue.stop(timeout=1)
+
+    mock_handler.assert_called_once()
+    assert webhook_server.dedup.stats()["duplicates"] == {"gitlab": 1}
+
+
+@pytest.mark.asyncio
+async def test_duplicate_without_delivery_id_is_detected_by_body_hash(webhook_server):
+    """Без ID доставки дубликат определяется по хэшу тела"""
+    webhook_server.queue = EventQueue(processor=AsyncMock(), maxsize=10, workers=1)
+
+    async with TestClient(TestServer(webhook_server.app)) as client:
+        headers = {"X-GitHub-Event": "issues"}
+        first = await client.post("/webhook/github", json={"action": "opened"}, headers=headers)
+        retry = await client.post("/webhook/github", json={"action": "opened"}, headers=headers)
+        other = await client.post("/webhook/github", json={"action": "assigned"}, headers=headers)
+
+    assert [first.status, retry.status, other.status] == [202, 200, 202]
+    assert webhook_server.dedup.hash_fallbacks == 2
+
+
+@pytest.mark.asyncio
+async def test_dedup_window_is_restored_from_spool(spool_path):
+    """Окно дедупликации восстанавливается из журнала после перезапуска"""
+    spool = WebhookSpool(spool_path)
+    await spool.open()
+    spool_id = await spool.append("github", "issues", {}, b"{}", delivery_key="github:delivery-1")
+    spool.ack(spool_id)
+    await spool.close()
+
+    server = WebhookServer(host="127.0.0.1", port=0)
+    server.spool = WebhookSpool(spool_path)
+    await server.start()
+    try:
+        assert server.dedup.check_and_remember("github:delivery-1") is True
+    finally:
+        await server.stop()
+
+
+@pytest.mark.asyncio
+async def test_noise_events_are_filtered_before_queue(webhook_server):
+    """Pipeline в процессе и события без обработчика отбрасываются до очереди и журнала"""
+    with patch('src.webhook.server.handle_gitlab_event', new=AsyncMock()) as mock_handler:
+        webhook_server.queue.start()
+        async with TestClient(TestServer(webhook_server.app)) as client:
+            running = await client.post(
+                "/webhook/gitlab",
+                json={"object_attributes": {"status": "running"}, "merge_requests": [{"iid": 1}]},
+                headers={"X-Gitlab-Event": "Pipeline Hook"}
+            )
+            push = await client.post("/webhook/gitlab", data=b"not json", headers={"X-Gitlab-Event": "Push Hook"})
+            finished = await client.post(
+                "/webhook/gitlab",
+                json={"object_attributes": {"status": "failed"}, "merge_requests": [{"iid": 1}]},
+                headers={"X-Gitlab-Event": "Pipeline Hook"}
+            )
+            health = await (await client.get("/health")).json()
+
+        await webhook_server.queue.stop(timeout=1)
+
+    assert [running.status, push.status, finished.status] == [200, 200, 202]
+    mock_handler.assert_called_once()
+    assert health["filter"]["dropped"] == {"gitlab_pipeline_in_progress": 1, "unhandled_event": 1}
+    assert health["filter"]["passed"] == 1
+    assert len(webhook_server.dedup) == 1
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_exports_pipeline_metrics(webhook_server):
+    """/metrics отдает счетчики приема, задержку очереди и глубину очередей"""
+    handled = asyncio.Event()
+
+    async def fake_handler(event_type, data):
+        handled.set()
+
+    with patch('src.webhook.server.handle_github_event', new=AsyncMock(side_effect=fake_handler)):
+        webhook_server.queue.start()
+        async with TestClient(TestServer(webhook_server.app)) as client:
+            await client.post(
+                "/webhook/github",
+                json={"action": "opened"},
+                headers={"X-GitHub-Event": "pull_request", "X-GitHub-Delivery": "metrics-1"}
+            )
+            await client.post("/webhook/github", json={}, headers={"X-GitHub-Event": "x" * 64})
+            await asyncio.wait_for(handled.wait(), timeout=1)
+
+            response = await client.get("/metrics")
+            body = await response.text()
+        await webhook_server.queue.stop(timeout=1)
+
+    assert response.status == 200
+    assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+    assert 'webhooks_received_total{platform="github",event="pull_request",result="accepted"}' in body
+    # Произвольный заголовок не порождает новую метку
+    assert 'webhooks_received_total{platform="github",event="other",result="filtered"}' in body
+    assert "x" * 64 not in body
+    assert 'webhook_queue_wait_seconds_count{platform="github"}' in body
+    assert 'queue_depth{queue="webhook"} 0' in body
+    assert "api_rate_limit_headroom_ratio 1" in body